@@ -0,0 +1,59 @@
+"""Smart home automation: devices, their central automation system, and tools around them.
+
+Public classes are importable from the package, such as ``from smart_home import
+CentralAutomationSystem``, but their modules are only imported on first use (PEP 562),
+so importing the package costs nothing and headless tools never load Qt or NumPy.
+"""
+import importlib
+import importlib.util
+
+# Public names and the modules defining them.
+_EXPORTS = {
+    "Device": "smart_home.device",
+    "SmartLight": "smart_home.smart_light",
+    "Thermostat": "smart_home.thermostat",
+    "SecurityCamera": "smart_home.security_camera",
+    "CentralAutomationSystem": "smart_home.central_automation_system",
+    "ChangeEvent": "smart_home.event_bus",
+    "EventBus": "smart_home.event_bus",
+    "Group": "smart_home.groups",
+    "Scene": "smart_home.groups",
+    "TransitionEngine": "smart_home.transition_engine",
+    "Simulation": "smart_home.simulation",
+    "RuleEngine": "smart_home.rules",
+    "Condition": "smart_home.rules",
+    "TimerWheel": "smart_home.timer_wheel",
+    "DeviceScheduler": "smart_home.timer_wheel",
+    "Journal": "smart_home.journal",
+    "ControlPlane": "smart_home.control_plane",
+    "LocalBroker": "smart_home.mqtt",
+    "MqttAdapter": "smart_home.mqtt",
+    "CameraPipeline": "smart_home.camera_stream",
+    "Instrumentation": "smart_home.instrumentation",
+    "FleetStore": "smart_home.fleet_store",
+    "TelemetryRecorder": "smart_home.telemetry",
+    "Snapshot": "smart_home.snapshot",
+    "ThermalModel": "smart_home.thermal",
+    "ThermostatControl": "smart_home.thermal",
+    "EnergyMeter": "smart_home.energy",
+    "SmartHomeGUI": "smart_home.monitoring_dashboard",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    """Import a public class, or a submodule, the first time it is accessed."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        if importlib.util.find_spec(f"{__name__}.{name}") is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        return importlib.import_module(f"{__name__}.{name}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the public names along with the names already loaded."""
+    return sorted(set(globals()) | set(_EXPORTS))
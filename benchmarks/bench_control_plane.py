@@ -0,0 +1,107 @@
+"""Load test of the control plane measuring request throughput and latency.
+
+A control plane serving a demo home runs in a child process, so the server and the
+load generator each get their own file descriptors. Feed subscribers stay connected
+while HTTP clients send brightness changes, and every change is streamed to them.
+Feed messages are counted but not decoded, to keep the load generator light.
+
+Run with ``python -m smart_home.benchmarks.bench_control_plane [subscribers]``.
+"""
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+
+from smart_home.control_plane import ControlPlaneClient, FeedClient
+
+
+def raise_file_limit():
+    """Raise the soft limit on open files to the hard limit."""
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def start_server(lights):
+    """Start a control plane in a child process and return it with its port."""
+    process = subprocess.Popen([sys.executable, "-m", "smart_home.control_plane", "--port", "0",
+                                "--lights", str(lights)], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def percentile(values, fraction):
+    """Get a percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(port, subscribers, connections, duration, lights):
+    """Connect feed subscribers, then send brightness changes for a duration.
+
+    Returns:
+        dict: The number of requests, their latencies in seconds and the number of feed
+        messages and bytes received.
+    """
+    feeds = []
+    for first in range(0, subscribers, 500):
+        batch = [FeedClient(port=port) for _ in range(min(500, subscribers - first))]
+        await asyncio.gather(*(feed.connect() for feed in batch))
+        feeds.extend(batch)
+    received = {"messages": 0, "bytes": 0}
+
+    async def listen(feed):
+        while True:
+            message = await feed.receive_raw()
+            if message is None:
+                return
+            received["messages"] += 1
+            received["bytes"] += len(message)
+
+    listeners = [asyncio.ensure_future(listen(feed)) for feed in feeds]
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def send(worker):
+        client = ControlPlaneClient(port=port)
+        step = worker
+        while time.perf_counter() < deadline:
+            path = f"/devices/light/light-{step % lights}"
+            started = time.perf_counter()
+            status, _ = await client.request("PATCH", path, {"brightness": step % 101})
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                raise RuntimeError(f"PATCH {path} failed with status {status}.")
+            step += connections
+        await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(worker) for worker in range(connections)))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.5)
+    for listener in listeners:
+        listener.cancel()
+    await asyncio.gather(*(feed.close() for feed in feeds))
+    return {"requests": len(latencies), "elapsed": elapsed, "latencies": latencies, **received}
+
+
+def main(subscribers=10_000, connections=50, duration=10.0, lights=1000):
+    """Print the throughput and latency of the control plane under load."""
+    raise_file_limit()
+    process, port = start_server(lights)
+    try:
+        results = asyncio.run(run_load(port, subscribers, connections, duration, lights))
+    finally:
+        process.terminate()
+        process.wait()
+    latencies = results["latencies"]
+    print(f"{subscribers:,} feed subscribers, {connections} HTTP connections, {results['elapsed']:.1f} s:")
+    print(f"  requests/s   {results['requests'] / results['elapsed']:10,.0f}")
+    print(f"  p50 latency  {percentile(latencies, 0.50) * 1000:10.2f} ms")
+    print(f"  p99 latency  {percentile(latencies, 0.99) * 1000:10.2f} ms")
+    print(f"  feed         {results['messages']:10,} messages, {results['bytes'] / 1e6:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
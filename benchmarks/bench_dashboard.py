@@ -0,0 +1,89 @@
+"""Benchmark of the dashboard refresh cost per fade tick.
+
+Runs Qt offscreen. Run with ``python -m smart_home.benchmarks.bench_dashboard [ticks]``.
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.monitoring_dashboard import SmartHomeGUI
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+# Stylesheet the dashboard used to apply to both enabled sliders on every refresh.
+LEGACY_SLIDER_STYLE = """
+    QSlider {
+        height: 20px;
+    }
+    QSlider::groove:horizontal {
+        background-color: #e0e0e0;
+        border: 1px solid #cccccc;
+        height: 4px;
+        margin: 2px 0;
+    }
+    QSlider::handle:horizontal {
+        background-color: green;
+        border: 1px solid #cccccc;
+        width: 16px;
+        margin: -7px 0;
+        border-radius: 8px;
+    }
+"""
+
+
+def legacy_refresh(gui):
+    """Refresh the dashboard the way it was done before styles were cached."""
+    gui.light_brightness_slider.setValue(int(gui.smart_light.get_brightness()))
+    gui.light_brightness_slider.setEnabled(True)
+    gui.light_brightness_slider.setStyleSheet(LEGACY_SLIDER_STYLE)
+    gui.thermostat_slider.setEnabled(True)
+    gui.thermostat_slider.setStyleSheet(LEGACY_SLIDER_STYLE)
+    gui.monitoring_status_text = None
+    gui.update_monitoring_text()
+
+
+def make_gui():
+    """Build a dashboard tracking one light and one thermostat that are switched on."""
+    automation_system = CentralAutomationSystem()
+    gui = SmartHomeGUI(automation_system)
+    gui.smart_light = SmartLight(id="light", status=True, brightness=0)
+    gui.thermostat = Thermostat(id="thermostat", status=True, temperature=20)
+    automation_system.add_devices([gui.smart_light, gui.thermostat])
+    gui.update_device_status()
+    return gui
+
+
+def time_per_tick(app, gui, refresh, ticks):
+    """Time a refresh, including the repaint it triggers, while the light fades one step per tick.
+
+    Returns:
+        float: The average refresh cost in microseconds.
+    """
+    start = time.perf_counter()
+    for tick in range(ticks):
+        gui.smart_light.brightness = tick % 101
+        refresh(gui)
+        app.processEvents()
+    return (time.perf_counter() - start) / ticks * 1e6
+
+
+def main(ticks=2000):
+    """Print the dashboard refresh cost per tick."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    gui = make_gui()
+    gui.show()
+    app.processEvents()
+    print(f"Dashboard refresh cost per tick over {ticks:,} ticks:")
+    print(f"  {'legacy stylesheet':<20} {time_per_tick(app, gui, legacy_refresh, ticks):8.1f} us")
+    print(f"  {'cached styles':<20} {time_per_tick(app, gui, SmartHomeGUI.update_device_status, ticks):8.1f} us")
+    gui.close()
+    app.processEvents()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
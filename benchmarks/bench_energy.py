@@ -0,0 +1,52 @@
+"""Energy meter benchmark reporting change throughput and top-N query latency.
+
+Run with ``python -m smart_home.benchmarks.bench_energy [devices]``.
+"""
+import random
+import sys
+import time
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.energy import EnergyMeter
+from smart_home.smart_light import SmartLight
+
+
+class ManualClock:
+    """Clock advanced by the benchmark, standing in for simulated time."""
+
+    def __init__(self):
+        """Initialize a ManualClock instance at time 0."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time, in seconds."""
+        return self.now
+
+
+def main(devices=100_000, changes=200_000, queries=1000, seed=0):
+    """Print the change throughput of a metered fleet and the latency of its top-N queries."""
+    rng = random.Random(seed)
+    clock = ManualClock()
+    automation_system = CentralAutomationSystem()
+    lights = [SmartLight(f"light-{index}", True, index % 100) for index in range(devices)]
+    automation_system.add_devices(lights)
+    meter = EnergyMeter(capacity=devices, clock=clock)
+    meter.attach(automation_system, "home")
+    started = time.perf_counter()
+    for _ in range(changes):
+        clock.now += 0.5
+        rng.choice(lights).set_brightness(rng.randrange(101))
+    elapsed = time.perf_counter() - started
+    print(f"{devices:,} devices over {clock.now / 3600:.1f} simulated hours: "
+          f"{changes / elapsed:,.0f} changes/s, fleet total {meter.total('fleet', 'fleet') / 1000:.1f} kWh")
+    for label, options in (("since start", {}), ("current hour", {"window": 3600.0}),
+                           ("previous minute", {"window": 60.0, "previous": True})):
+        started = time.perf_counter()
+        for _ in range(queries):
+            meter.top(10, **options)
+        elapsed = time.perf_counter() - started
+        print(f"  top 10 {label}: {elapsed / queries * 1000:.3f} ms per query")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,55 @@
+"""Frame-based motion detection benchmark reporting frames per second on one core.
+
+Run with ``python -m smart_home.benchmarks.bench_frames [cameras]``.
+"""
+import sys
+import time
+import tracemalloc
+
+from smart_home.frame_detection import SyntheticCameraRig
+from smart_home.security_camera import SecurityCamera
+
+RESOLUTIONS = ((240, 320), (480, 640))
+
+
+def frames_per_second(cameras, height, width, steps=300, step=1):
+    """Measure the detection throughput of a rig of synthetic cameras.
+
+    Args:
+        cameras (int): The number of cameras in the rig.
+        height (int): The height of the frames, in pixels.
+        width (int): The width of the frames, in pixels.
+        steps (int): The number of frames processed per camera.
+        step (int): The subsampling step of the motion detectors.
+
+    Returns:
+        tuple: The frames processed per second and the bytes allocated per frame.
+    """
+    rig = SyntheticCameraRig([SecurityCamera(f"camera-{index}", True, "SAFE") for index in range(cameras)],
+                             height, width, step=step)
+    for scene in rig.scenes[::2]:
+        scene.intruder = True
+    rig.step()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(steps):
+        rig.step()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frames = cameras * steps
+    return frames / elapsed, peak / frames
+
+
+def main(cameras=8):
+    """Print the frames processed per second for common resolutions."""
+    print(f"Motion detection with {cameras} cameras on one core:")
+    for height, width in RESOLUTIONS:
+        for step in (1, 2):
+            rate, allocated = frames_per_second(cameras, height, width, step=step)
+            print(f"  {width}x{height} step {step}: {rate:8,.0f} frames/s ({rate / 30:5.1f} cameras at 30 fps), "
+                  f"{allocated:6.1f} bytes allocated per frame")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
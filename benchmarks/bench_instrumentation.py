@@ -0,0 +1,54 @@
+"""Instrumentation benchmark reporting the cost of timing device commands.
+
+Run with ``python -m smart_home.benchmarks.bench_instrumentation [lights]``.
+"""
+import sys
+import time
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.instrumentation import Instrumentation
+from smart_home.smart_light import SmartLight
+
+
+def commands_per_second(lights, rounds=100):
+    """Measure how many brightness changes per second the lights of a home accept.
+
+    Args:
+        lights (list): The registered SmartLight instances.
+        rounds (int): The number of changes applied to every light.
+
+    Returns:
+        float: The number of changes per second.
+    """
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        brightness = round_index % 100 + 1
+        for light in lights:
+            light.set_brightness(brightness)
+    return rounds * len(lights) / (time.perf_counter() - started)
+
+
+def main(lights=1000):
+    """Print the command throughput without, with and after instrumentation."""
+    automation_system = CentralAutomationSystem()
+    devices = [SmartLight(f"light-{index}", True, 0) for index in range(lights)]
+    automation_system.add_devices(devices)
+    instrumentation = Instrumentation()
+    baseline = commands_per_second(devices)
+    print(f"Not installed: {baseline:12,.0f} commands/s")
+    instrumentation.install()
+    rate = commands_per_second(devices)
+    print(f"Installed:     {rate:12,.0f} commands/s ({1e9 / rate - 1e9 / baseline:+.0f} ns per command)")
+    instrumentation.tracing = True
+    rate = commands_per_second(devices)
+    print(f"Tracing:       {rate:12,.0f} commands/s ({1e9 / rate - 1e9 / baseline:+.0f} ns per command)")
+    instrumentation.uninstall()
+    rate = commands_per_second(devices)
+    print(f"Uninstalled:   {rate:12,.0f} commands/s ({1e9 / rate - 1e9 / baseline:+.0f} ns per command)")
+    histogram = instrumentation.histogram("call_duration", category="device", operation="SmartLight.set_brightness")
+    print(f"set_brightness: p50 {histogram.percentile(50)} ns, p99 {histogram.percentile(99)} ns, "
+          f"max {histogram.maximum} ns over {histogram.count:,} calls")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
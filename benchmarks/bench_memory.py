@@ -0,0 +1,79 @@
+"""Memory benchmark reporting the bytes used per device instance.
+
+Run with ``python -m smart_home.benchmarks.bench_memory [count]``.
+"""
+import sys
+import tracemalloc
+
+from smart_home.fleet_store import FleetStore
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+
+class DictSmartLight:
+    """Smart light laid out like the device classes before they used ``__slots__``."""
+
+    def __init__(self, id, status, brightness):
+        self.id = id
+        self.status = status
+        self.brightness = brightness
+        self.observer = None
+
+
+FACTORIES = {
+    "SmartLight (dict)": lambda device_id: DictSmartLight(device_id, False, 0.0),
+    "SmartLight": lambda device_id: SmartLight(device_id, False, 0.0),
+    "Thermostat": lambda device_id: Thermostat(device_id, False, 0.0),
+    "SecurityCamera": lambda device_id: SecurityCamera(device_id, False, "SAFE"),
+}
+
+
+def bytes_per_device(factory, count):
+    """Measure the memory allocated per device when creating many instances.
+
+    All instances share the same ID object, so only the device itself is counted.
+
+    Args:
+        factory (callable): Builds a device from an ID.
+        count (int): The number of devices to create.
+
+    Returns:
+        float: The number of bytes allocated per device.
+    """
+    devices = [None] * count
+    device_id = "device"
+    tracemalloc.start()
+    for index in range(count):
+        devices[index] = factory(device_id)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated / count
+
+
+def bytes_per_stored_device(count):
+    """Measure the memory used per device slot of a FleetStore holding many lights.
+
+    Args:
+        count (int): The number of lights to store.
+
+    Returns:
+        float: The number of bytes used per stored light.
+    """
+    store = FleetStore(capacity=count)
+    store.add_lights(["device"] * count)
+    columns = (store.kind, store.status, store.brightness, store.temperature, store.security)
+    used = sum(column.nbytes for column in columns) + sys.getsizeof(store.ids)
+    return used / count
+
+
+def main(count=1_000_000):
+    """Print the bytes used per device for every device class."""
+    print(f"Bytes per device at {count:,} instances:")
+    for name, factory in FACTORIES.items():
+        print(f"  {name:<20} {bytes_per_device(factory, count):8.1f}")
+    print(f"  {'FleetStore slot':<20} {bytes_per_stored_device(count):8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
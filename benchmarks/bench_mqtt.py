@@ -0,0 +1,56 @@
+"""Ingestion benchmark of the MQTT adapter over the local broker.
+
+Run with ``python -m smart_home.benchmarks.bench_mqtt [messages]``.
+"""
+import random
+import sys
+import time
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.mqtt import LocalBroker, Message, MqttAdapter
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+
+def messages_per_second(messages, qos=0, devices=10_000, batch_size=1000):
+    """Measure how many state reports per second reach the devices of an automation system.
+
+    Args:
+        messages (int): The number of reports to publish.
+        qos (int): The quality of service of the reports and of the subscription.
+        devices (int): The number of devices reporting, half lights and half thermostats.
+        batch_size (int): The number of reports published per batch.
+
+    Returns:
+        float: The number of reports ingested per second.
+    """
+    automation_system = CentralAutomationSystem()
+    automation_system.add_devices([SmartLight(f"light-{index}", True, 0) for index in range(devices // 2)])
+    automation_system.add_devices([Thermostat(f"thermostat-{index}", True, 20) for index in range(devices // 2)])
+    broker = LocalBroker(batch_size=batch_size)
+    adapter = MqttAdapter(automation_system, broker, qos=qos)
+    rng = random.Random(0)
+    reports = []
+    for _ in range(messages):
+        index = rng.randrange(devices // 2)
+        if rng.random() < 0.5:
+            reports.append(Message(f"home/light/light-{index}/brightness", str(rng.randrange(101)).encode(), qos))
+        else:
+            reports.append(Message(f"home/thermostat/thermostat-{index}/temperature", str(rng.randrange(16, 27)).encode(), qos))
+    started = time.perf_counter()
+    for first in range(0, messages, batch_size):
+        broker.publish_batch(reports[first:first + batch_size])
+    elapsed = time.perf_counter() - started
+    if adapter.ingested != messages:
+        raise RuntimeError(f"Only {adapter.ingested:,} of {messages:,} reports were ingested.")
+    return messages / elapsed
+
+
+def main(messages=1_000_000):
+    """Print the ingestion throughput for both qualities of service."""
+    for qos in (0, 1):
+        print(f"QoS {qos}: {messages_per_second(messages, qos):,.0f} messages/s ingested")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
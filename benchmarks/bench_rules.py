@@ -0,0 +1,48 @@
+"""Rule engine benchmark reporting event throughput with many rules.
+
+Run with ``python -m smart_home.benchmarks.bench_rules [rules]``.
+"""
+import sys
+import time
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.rules import Condition, RuleEngine, set_device
+from smart_home.thermostat import Thermostat
+
+
+def events_per_second(rules, changes=200_000):
+    """Measure how many thermostat changes per second are evaluated against many rules.
+
+    Every thermostat has one rule switching it on above 26 degrees, so most changes
+    only concern one rule among thousands.
+
+    Args:
+        rules (int): The number of rules, and of thermostats.
+        changes (int): The number of temperature changes to apply.
+
+    Returns:
+        float: The number of changes processed per second.
+    """
+    automation_system = CentralAutomationSystem()
+    thermostats = [Thermostat(f"thermostat-{index}", False, 20.0) for index in range(rules)]
+    automation_system.add_devices(thermostats)
+    engine = RuleEngine(automation_system)
+    for index, thermostat in enumerate(thermostats):
+        engine.add_rule(f"heat-{index}",
+                        [Condition("temperature", ">", 26, device_id=thermostat.get_id(), device_type=Thermostat)],
+                        [set_device(thermostat.get_id(), "turn_on", device_type=Thermostat)])
+    started = time.perf_counter()
+    for step in range(changes):
+        thermostats[step % rules].set_temperature(18.0 + step % 11)
+    elapsed = time.perf_counter() - started
+    engine.close()
+    return changes / elapsed
+
+
+def main(rules=10_000):
+    """Print the rule engine throughput."""
+    print(f"Changes evaluated per second with {rules:,} rules: {events_per_second(rules):,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
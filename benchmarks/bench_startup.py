@@ -0,0 +1,42 @@
+"""Startup benchmark reporting the time to import the package and parse each command.
+
+Run with ``python -m smart_home.benchmarks.bench_startup [runs]``.
+"""
+import subprocess
+import sys
+import time
+
+# Command lines timed, each ending right after argument parsing.
+COMMANDS = (
+    ("bare interpreter", ["-c", "pass"]),
+    ("import smart_home", ["-c", "import smart_home"]),
+    ("smart_home --help", ["-m", "smart_home", "--help"]),
+    ("simulate --help", ["-m", "smart_home", "simulate", "--help"]),
+    ("fleet --help", ["-m", "smart_home", "fleet", "--help"]),
+    ("serve --help", ["-m", "smart_home", "serve", "--help"]),
+)
+
+# Heavy modules headless commands must not import.
+HEAVY_MODULES = ("numpy", "PyQt5")
+
+
+def imported_modules(arguments):
+    """Run a command line with ``-X importtime`` and return the names of the modules it imported."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True)
+    return {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def main(runs=10):
+    """Print the best wall time of each command line and the heavy modules it imported."""
+    for label, arguments in COMMANDS:
+        best = float("inf")
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, *arguments], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - started)
+        heavy = sorted(name for name in imported_modules(arguments) if name in HEAVY_MODULES)
+        print(f"{label:<20} {best * 1000:7.1f} ms  heavy imports: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
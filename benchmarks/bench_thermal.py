@@ -0,0 +1,50 @@
+"""Thermal model benchmark stepping the zones of a whole city.
+
+Run with ``python -m smart_home.benchmarks.bench_thermal [zones]``.
+"""
+import sys
+import time
+
+import numpy as np
+
+from smart_home.thermal import HysteresisController, PIDController, ThermalModel
+
+ZONES_PER_BUILDING = 10
+
+
+def build_city(zones, seed=0):
+    """Create a model of buildings made of rows of zones sharing walls with their neighbours.
+
+    Args:
+        zones (int): The number of zones.
+        seed (int): The seed of the initial temperatures.
+
+    Returns:
+        ThermalModel: The model, with every zone controlled at 21 degrees.
+    """
+    rng = np.random.default_rng(seed)
+    model = ThermalModel(capacity=zones, outside_temperature=5.0)
+    indices = model.add_zones(zones, temperature=rng.uniform(15.0, 22.0, zones))
+    inner = indices[:-1][indices[:-1] % ZONES_PER_BUILDING != ZONES_PER_BUILDING - 1]
+    model.connect(inner, inner + 1)
+    model.setpoint[:zones] = 21.0
+    model.enabled[:zones] = True
+    return model
+
+
+def main(zones=100_000, steps=200):
+    """Print the time taken by a closed-loop step of a city of zones."""
+    for controller in (HysteresisController(), PIDController()):
+        model = build_city(zones)
+        started = time.perf_counter()
+        for _ in range(steps):
+            controller.update(model)
+            model.step()
+        elapsed = time.perf_counter() - started
+        print(f"{type(controller).__name__}: {zones:,} zones and {model.walls:,} walls, "
+              f"{elapsed / steps * 1000:.2f} ms per step of {model.dt:.0f} s "
+              f"({model.substeps()} substep), mean temperature {model.temperature[:zones].mean():.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
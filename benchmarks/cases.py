@@ -0,0 +1,187 @@
+"""Benchmarks of the device, registry, fleet and dashboard hot paths run by the suite.
+
+Benchmarks follow the asv layout: every ``time_*`` method of a class is timed after
+``setup`` ran with one value of ``params``, and ``setup`` raising NotImplementedError
+skips the benchmark. Run them with ``python -m smart_home.benchmarks.suite run``.
+"""
+import os
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.fleet_store import FleetStore
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+
+def lights(count, prefix="light"):
+    """Create numbered smart lights that are ON."""
+    return [SmartLight(f"{prefix}-{index}", True, 50) for index in range(count)]
+
+
+class DeviceSuite:
+    """Construction and setters of registered devices."""
+
+    params = [1_000]
+    param_names = ["devices"]
+
+    def setup(self, count):
+        """Register lights, thermostats and cameras that are ON."""
+        self.automation_system = CentralAutomationSystem()
+        self.lights = lights(count)
+        self.thermostats = [Thermostat(f"thermostat-{index}", True, 20.0) for index in range(count)]
+        self.cameras = [SecurityCamera(f"camera-{index}", True, "SAFE") for index in range(count)]
+        self.automation_system.add_devices(self.lights + self.thermostats + self.cameras)
+        self.value = 0
+
+    def time_construct_lights(self, count):
+        """Create lights."""
+        lights(count)
+
+    def time_set_status(self, count):
+        """Toggle every light."""
+        status = self.value % 2 == 0
+        self.value += 1
+        for light in self.lights:
+            light.set_status(status)
+
+    def time_set_brightness(self, count):
+        """Change the brightness of every light."""
+        brightness = self.value % 100 + 1
+        self.value += 1
+        for light in self.lights:
+            light.set_brightness(brightness)
+
+    def time_set_temperature(self, count):
+        """Change the temperature of every thermostat."""
+        temperature = 18.0 + self.value % 8
+        self.value += 1
+        for thermostat in self.thermostats:
+            thermostat.set_temperature(temperature)
+
+    def time_set_security_status(self, count):
+        """Change the security status of every camera."""
+        status = "UNSAFE" if self.value % 2 else "SAFE"
+        self.value += 1
+        for camera in self.cameras:
+            camera.set_security_status(status)
+
+
+class RegistrySuite:
+    """Adding, finding and removing devices in automation systems of growing size."""
+
+    params = [1_000, 10_000, 100_000, 1_000_000]
+    param_names = ["devices"]
+
+    def setup(self, count):
+        """Register numbered lights and keep a spare one."""
+        self.devices = lights(count)
+        self.ids = [device.get_id() for device in self.devices]
+        self.automation_system = CentralAutomationSystem()
+        self.automation_system.add_devices(self.devices)
+        self.spare = SmartLight("spare", True, 50)
+        self.middle = self.ids[count // 2]
+
+    def time_add_remove_device(self, count):
+        """Add and remove one device."""
+        self.automation_system.add_device(self.spare)
+        self.automation_system.remove_device("spare", SmartLight)
+
+    def time_get_device(self, count):
+        """Look a device up by type and ID."""
+        self.automation_system.get_device(self.middle, SmartLight)
+
+    def time_add_remove_devices(self, count):
+        """Register and unregister every device in bulk."""
+        automation_system = CentralAutomationSystem()
+        automation_system.add_devices(self.devices)
+        automation_system.remove_devices(self.ids, SmartLight)
+
+
+class BatchCommandSuite:
+    """Fleet-wide updates of registered devices through batch commands."""
+
+    params = [1_000, 10_000, 100_000]
+    param_names = ["devices"]
+
+    def setup(self, count):
+        """Register lights in a group covering all of them."""
+        self.automation_system = CentralAutomationSystem()
+        self.automation_system.add_devices(lights(count))
+        self.automation_system.add_group("lights", device_type=SmartLight)
+        self.value = 0
+
+    def time_set_attributes(self, count):
+        """Set the brightness of every light in one batch."""
+        self.value += 1
+        self.automation_system.set_attributes("lights", brightness=self.value % 100 + 1)
+
+    def time_set_status(self, count):
+        """Switch every light in one batch."""
+        self.value += 1
+        self.automation_system.set_attributes("lights", status=self.value % 2 == 0)
+
+
+class FleetStoreSuite:
+    """Fleet-wide updates and aggregates of the columnar device store."""
+
+    params = [10_000, 100_000, 1_000_000]
+    param_names = ["devices"]
+
+    def setup(self, count):
+        """Store lights that are ON."""
+        self.store = FleetStore(count)
+        self.store.add_lights([f"light-{index}" for index in range(count)], True, 50.0)
+        self.mask = self.store.mask(status=True)
+        self.value = 0
+
+    def time_set_brightness(self, count):
+        """Set the brightness of every light that is ON."""
+        self.value += 1
+        self.store.set_brightness(self.value % 100 + 1, self.mask)
+
+    def time_mean_brightness(self, count):
+        """Average the brightness of every light that is ON."""
+        self.store.mean("brightness", self.mask)
+
+
+class DashboardSuite:
+    """Dashboard refreshes on an offscreen Qt platform."""
+
+    params = [100, 10_000]
+    param_names = ["devices"]
+
+    def setup(self, count):
+        """Build a dashboard tracking a light and a thermostat among other devices."""
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PyQt5.QtWidgets import QApplication
+        except ImportError:
+            raise NotImplementedError("PyQt5 is not installed.")
+        from smart_home.monitoring_dashboard import SmartHomeGUI
+
+        self.app = QApplication.instance() or QApplication([])
+        automation_system = CentralAutomationSystem()
+        self.gui = SmartHomeGUI(automation_system)
+        self.gui.smart_light = SmartLight("light", True, 0)
+        self.gui.thermostat = Thermostat("thermostat", True, 20)
+        automation_system.add_devices([self.gui.smart_light, self.gui.thermostat] + lights(count, "extra"))
+        self.value = 0
+
+    def teardown(self, count):
+        """Close the dashboard."""
+        self.gui.event_bus.unsubscribe(self.gui.on_device_changes)
+        self.gui.close()
+        self.gui.deleteLater()
+        self.app.processEvents()
+
+    def time_update_device_status(self, count):
+        """Refresh the dashboard, repaint included, after a brightness step."""
+        self.value += 1
+        self.gui.smart_light.brightness = self.value % 101
+        self.gui.update_device_status()
+        self.app.processEvents()
+
+    def time_update_remove_device_dropdown(self, count):
+        """Resynchronize the remove device dropdown."""
+        self.gui.update_remove_device_dropdown()
+        self.app.processEvents()
@@ -0,0 +1,277 @@
+"""Benchmark suite runner storing results per commit and flagging regressions.
+
+Run with ``python -m smart_home.benchmarks.suite run [--quick] [--filter REGEX]``, then
+``python -m smart_home.benchmarks.suite compare [OLD [NEW]]`` after a later commit.
+"""
+import argparse
+import gc
+import importlib
+import inspect
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules holding the benchmark classes.
+CASE_MODULES = ("smart_home.benchmarks.cases",)
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIRECTORY = os.path.join(PACKAGE_DIRECTORY, ".benchmarks")
+
+# Largest parameter value run by ``--quick``.
+QUICK_LIMIT = 10_000
+
+
+def git(*args):
+    """Run a git command in the package directory and return its output, or None on failure."""
+    try:
+        result = subprocess.run(["git", *args], cwd=PACKAGE_DIRECTORY, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def current_commit():
+    """Get the commit being benchmarked, suffixed with ``-dirty`` for uncommitted changes."""
+    commit = git("rev-parse", "HEAD")
+    if commit is None:
+        return "unknown"
+    if git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def discover(modules=CASE_MODULES, pattern=None):
+    """Find the benchmarks of the case modules.
+
+    Args:
+        modules (iterable): The names of the modules holding benchmark classes.
+        pattern (str, optional): A regular expression the benchmark names must match.
+
+    Returns:
+        list: ``(name, class, method name, parameter)`` tuples, named like
+        ``cases.RegistrySuite.time_get_device(1000)``.
+    """
+    benchmarks = []
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            methods = sorted(name for name in vars(cls) if name.startswith("time_"))
+            for method_name in methods:
+                for parameter in getattr(cls, "params", [None]):
+                    suffix = "" if parameter is None else f"({parameter})"
+                    name = f"{module_name.rsplit('.', 1)[-1]}.{class_name}.{method_name}{suffix}"
+                    if pattern is None or re.search(pattern, name):
+                        benchmarks.append((name, cls, method_name, parameter))
+    return benchmarks
+
+
+def measure(cls, method_name, parameter, repeat=5, sample_time=0.05):
+    """Time one benchmark.
+
+    Setup runs once per benchmark and the method is called ``number`` times per sample,
+    with ``number`` calibrated so that a sample lasts about ``sample_time``. Garbage
+    collection is disabled while timing.
+
+    Args:
+        cls (type): The benchmark class.
+        method_name (str): The name of the ``time_*`` method.
+        parameter: The parameter passed to setup and the method, or None.
+        repeat (int): The number of samples.
+        sample_time (float): The target duration of a sample, in seconds.
+
+    Returns:
+        dict: The time per call of the fastest and median samples in seconds, the
+        interquartile range, the number of calls per sample and of samples, or None if
+        the benchmark was skipped.
+    """
+    args = () if parameter is None else (parameter,)
+    instance = cls()
+    try:
+        if hasattr(instance, "setup"):
+            instance.setup(*args)
+    except NotImplementedError:
+        return None
+    method = getattr(instance, method_name)
+    timer = time.perf_counter
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            started = timer()
+            for _ in range(number):
+                method(*args)
+            elapsed = timer() - started
+            if elapsed >= sample_time / 2 or number >= 1 << 20:
+                break
+            number *= 2 if elapsed <= 0 else max(2, min(10, int(sample_time / elapsed)))
+        samples = [elapsed / number]
+        for _ in range(repeat - 1):
+            started = timer()
+            for _ in range(number):
+                method(*args)
+            samples.append((timer() - started) / number)
+    finally:
+        if enabled:
+            gc.enable()
+        if hasattr(instance, "teardown"):
+            instance.teardown(*args)
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return {"min": min(samples), "median": statistics.median(samples), "iqr": quartiles[2] - quartiles[0],
+            "number": number, "repeat": len(samples)}
+
+
+def results_path(commit, directory=RESULTS_DIRECTORY):
+    """Get the file storing the results of a commit."""
+    return os.path.join(directory, f"{commit}.json")
+
+
+def load_results(commit, directory=RESULTS_DIRECTORY):
+    """Load the stored results of a commit, or None if it was never benchmarked."""
+    try:
+        with open(results_path(commit, directory)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def run(pattern=None, quick=False, repeat=5, sample_time=0.05, directory=RESULTS_DIRECTORY, output=sys.stdout):
+    """Run the benchmarks and store their results under the current commit.
+
+    Results are merged with those already stored for the commit, so a filtered run
+    only replaces the benchmarks it ran.
+
+    Args:
+        pattern (str, optional): A regular expression selecting the benchmarks.
+        quick (bool): Skip parameters larger than QUICK_LIMIT.
+        repeat (int): The number of samples per benchmark.
+        sample_time (float): The target duration of a sample, in seconds.
+        directory (str): The directory storing the results.
+        output: The stream progress is printed to.
+
+    Returns:
+        dict: The stored document.
+    """
+    commit = current_commit()
+    document = load_results(commit, directory) or {"commit": commit, "results": {}}
+    document.update({
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+    })
+    for name, cls, method_name, parameter in discover(pattern=pattern):
+        if quick and isinstance(parameter, int) and parameter > QUICK_LIMIT:
+            continue
+        result = measure(cls, method_name, parameter, repeat, sample_time)
+        if result is None:
+            print(f"{name:<60} skipped", file=output, flush=True)
+            continue
+        document["results"][name] = result
+        print(f"{name:<60} {format_time(result['median']):>10} ±{format_time(result['iqr'])}",
+              file=output, flush=True)
+    os.makedirs(directory, exist_ok=True)
+    with open(results_path(commit, directory), "w") as file:
+        json.dump(document, file, indent=1, sort_keys=True)
+    return document
+
+
+def format_time(seconds):
+    """Format a duration with a readable unit."""
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def previous_commit(commit, directory=RESULTS_DIRECTORY):
+    """Find the closest ancestor of a commit that has stored results."""
+    ancestors = git("rev-list", "--max-count=200", commit.replace("-dirty", "")) or ""
+    for ancestor in ancestors.split():
+        if ancestor != commit and os.path.exists(results_path(ancestor, directory)):
+            return ancestor
+    return None
+
+
+def compare(old, new, threshold=1.1):
+    """Compare the results of two commits.
+
+    A benchmark regressed when its median time grew by more than ``threshold`` times and
+    the growth exceeds the spread of both runs, so noisy benchmarks are not flagged for
+    moving within their own noise.
+
+    Args:
+        old (dict): The stored document of the baseline commit.
+        new (dict): The stored document of the commit to check.
+        threshold (float): The ratio of median times counted as a change.
+
+    Returns:
+        list: ``(name, old median, new median, ratio, verdict)`` tuples for the benchmarks
+        run on both commits, where the verdict is ``regressed``, ``improved`` or empty.
+    """
+    rows = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        before, after = old["results"][name], new["results"][name]
+        ratio = after["median"] / before["median"] if before["median"] else float("inf")
+        noise = before["iqr"] + after["iqr"]
+        verdict = ""
+        if ratio > threshold and after["median"] - before["median"] > noise:
+            verdict = "regressed"
+        elif ratio < 1 / threshold and before["median"] - after["median"] > noise:
+            verdict = "improved"
+        rows.append((name, before["median"], after["median"], ratio, verdict))
+    return rows
+
+
+def main(argv=None):
+    """Run or compare the benchmark suite from the command line.
+
+    Returns:
+        int: The exit status, 1 when ``compare`` found regressions.
+    """
+    parser = argparse.ArgumentParser(description="Run the smart home benchmark suite and track regressions.")
+    parser.add_argument("--results", default=RESULTS_DIRECTORY, help="directory storing the results")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and store the results of the current commit")
+    run_parser.add_argument("--filter", help="regular expression selecting the benchmarks")
+    run_parser.add_argument("--quick", action="store_true", help=f"skip parameters above {QUICK_LIMIT:,}")
+    run_parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark")
+    run_parser.add_argument("--sample-time", type=float, default=0.05, help="target seconds per sample")
+    list_parser = commands.add_parser("list", help="list the benchmarks")
+    list_parser.add_argument("--filter", help="regular expression selecting the benchmarks")
+    compare_parser = commands.add_parser("compare", help="compare the results of two commits")
+    compare_parser.add_argument("old", nargs="?", help="baseline commit, the closest benchmarked ancestor by default")
+    compare_parser.add_argument("new", nargs="?", help="commit to check, the current one by default")
+    compare_parser.add_argument("--threshold", type=float, default=1.1, help="ratio of median times flagged")
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for name, *_ in discover(pattern=args.filter):
+            print(name)
+        return 0
+    if args.command == "run":
+        run(args.filter, args.quick, args.repeat, args.sample_time, args.results)
+        return 0
+    new_commit = args.new or current_commit()
+    old_commit = args.old or previous_commit(new_commit, args.results)
+    new, old = load_results(new_commit, args.results), load_results(old_commit, args.results) if old_commit else None
+    if new is None or old is None:
+        print(f"No stored results for {new_commit if new is None else old_commit or 'any ancestor'}.", file=sys.stderr)
+        return 2
+    regressions = 0
+    print(f"{old_commit[:12]} -> {new_commit[:12]}")
+    for name, before, after, ratio, verdict in compare(old, new, args.threshold):
+        regressions += verdict == "regressed"
+        print(f"{name:<60} {format_time(before):>10} {format_time(after):>10} {ratio:6.2f}x {verdict}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+
+from smart_home.security_camera import SAFE, UNSAFE, SecurityCamera
+
+
+class SecurityEvent:
+    """Security status detected by a camera at a point in time."""
+
+    __slots__ = ("camera", "status", "timestamp")
+
+    def __init__(self, camera, status, timestamp):
+        """Initialize a SecurityEvent instance.
+
+        Args:
+            camera (SecurityCamera): The camera that detected the status.
+            status (str): The detected status (SAFE or UNSAFE).
+            timestamp (float): The time of the detection, in seconds.
+        """
+        self.camera = camera
+        self.status = status
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        """Return a readable description of the event."""
+        return f"SecurityEvent({self.camera.get_id()!r}, {self.status!r}, {self.timestamp:.3f})"
+
+
+class QueueFull(Exception):
+    """Raised by BoundedQueue.put_nowait when the queue blocks and is full."""
+
+
+class BoundedQueue:
+    """Asyncio queue holding at most ``maxsize`` items, with a policy for overflow.
+
+    Policies:
+        ``block``: ``put`` waits for room, pushing back on the producer.
+        ``drop_oldest``: the oldest item is discarded to make room.
+        ``drop_newest``: the new item is discarded.
+        ``latest``: only the latest item per ``key`` is kept, in the position of the
+        first one; a new key on a full queue discards the oldest item.
+
+    Discarded items are counted in ``dropped``.
+    """
+
+    POLICIES = ("block", "drop_oldest", "drop_newest", "latest")
+
+    def __init__(self, maxsize=1000, policy="drop_oldest", key=None):
+        """Initialize a BoundedQueue instance.
+
+        Args:
+            maxsize (int): The maximum number of items held.
+            policy (str): The overflow policy.
+            key (callable, optional): Gives the key of an item for the ``latest`` policy.
+
+        Raises:
+            ValueError: If the policy is unknown or ``latest`` lacks a key.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'.")
+        if policy == "latest" and key is None:
+            raise ValueError("The latest policy needs a key function.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.dropped = 0
+        self._items = OrderedDict() if policy == "latest" else deque()
+        self._getters = deque()
+        self._putters = deque()
+
+    def __len__(self):
+        """Return the number of items held."""
+        return len(self._items)
+
+    def full(self):
+        """Check whether the queue holds ``maxsize`` items."""
+        return len(self._items) >= self.maxsize
+
+    @staticmethod
+    def _wake(waiters):
+        """Wake the first waiter still waiting."""
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def put_nowait(self, item):
+        """Add an item, applying the overflow policy if the queue is full.
+
+        Returns:
+            bool: False if the item itself was discarded.
+
+        Raises:
+            QueueFull: If the policy is ``block`` and the queue is full.
+        """
+        items = self._items
+        if self.policy == "latest":
+            key = self.key(item)
+            if key in items:
+                items[key] = item
+                self.dropped += 1
+                return True
+            if len(items) >= self.maxsize:
+                items.popitem(last=False)
+                self.dropped += 1
+            items[key] = item
+        elif len(items) >= self.maxsize:
+            if self.policy == "block":
+                raise QueueFull()
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                return False
+            items.popleft()
+            items.append(item)
+        else:
+            items.append(item)
+        self._wake(self._getters)
+        return True
+
+    async def put(self, item):
+        """Add an item, waiting for room if the policy is ``block``."""
+        while self.policy == "block" and len(self._items) >= self.maxsize:
+            waiter = asyncio.get_running_loop().create_future()
+            self._putters.append(waiter)
+            await waiter
+        return self.put_nowait(item)
+
+    def get_nowait(self):
+        """Remove and return the oldest item.
+
+        Raises:
+            asyncio.QueueEmpty: If the queue is empty.
+        """
+        if not self._items:
+            raise asyncio.QueueEmpty()
+        if self.policy == "latest":
+            item = self._items.popitem(last=False)[1]
+        else:
+            item = self._items.popleft()
+        self._wake(self._putters)
+        return item
+
+    async def get(self):
+        """Remove and return the oldest item, waiting for one if the queue is empty."""
+        while not self._items:
+            waiter = asyncio.get_running_loop().create_future()
+            self._getters.append(waiter)
+            await waiter
+        return self.get_nowait()
+
+    def drain(self):
+        """Remove and return every item held."""
+        if self.policy == "latest":
+            items = list(self._items.values())
+        else:
+            items = list(self._items)
+        self._items.clear()
+        while self._putters:
+            self._wake(self._putters)
+        return items
+
+
+async def random_events(camera, rate=1.0, unsafe_probability=0.1, rng=None, limit=None, clock=time.monotonic):
+    """Generate random security detections for a camera.
+
+    Detections follow a Poisson process, which stands in for a real detector feed.
+
+    Args:
+        camera (SecurityCamera): The camera detecting.
+        rate (float): The average number of detections per second.
+        unsafe_probability (float): The probability that a detection is UNSAFE.
+        rng (random.Random, optional): The random number generator to use.
+        limit (int, optional): Stop after this many detections.
+        clock (callable): Returns the current time in seconds.
+
+    Yields:
+        SecurityEvent: The detections.
+    """
+    rng = rng or random.Random()
+    count = 0
+    while limit is None or count < limit:
+        await asyncio.sleep(rng.expovariate(rate))
+        status = UNSAFE if rng.random() < unsafe_probability else SAFE
+        count += 1
+        yield SecurityEvent(camera, status, clock())
+
+
+async def iterate(events):
+    """Turn an iterable of detections, such as a recorded feed, into a stream."""
+    for event in events:
+        yield event
+        await asyncio.sleep(0)
+
+
+async def debounce(events, hold):
+    """Only pass on a status once it has held for ``hold`` seconds.
+
+    A status flapping faster than ``hold`` is never passed on, and neither is a status
+    equal to the last one passed on. Detections repeating the pending status do not
+    restart the wait. While nothing is pending, detections are awaited directly, so a
+    steady stream costs no timers.
+
+    Args:
+        events: The async iterable of detections of one camera.
+        hold (float): The time a status must hold, in seconds.
+
+    Yields:
+        SecurityEvent: The first detection of every status that held.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending = None
+    passed = None
+    since = 0.0
+    next_event = None
+    try:
+        while True:
+            if next_event is None and pending is None:
+                try:
+                    event = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            else:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(iterator.__anext__())
+                timeout = None if pending is None else max(0.0, hold - (loop.time() - since))
+                done, _ = await asyncio.wait((next_event,), timeout=timeout)
+                if not done:
+                    yield pending
+                    passed = pending.status
+                    pending = None
+                    continue
+                task, next_event = next_event, None
+                try:
+                    event = task.result()
+                except StopAsyncIteration:
+                    if pending is not None:
+                        await asyncio.sleep(max(0.0, hold - (loop.time() - since)))
+                        yield pending
+                    return
+            if event.status == passed:
+                pending = None
+            elif pending is None or event.status != pending.status:
+                pending = event
+                since = loop.time()
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+
+
+class AlertHub:
+    """Fans alerts out to any number of consumers, each with its own bounded queue.
+
+    Publishing never waits, so a slow consumer only loses its own oldest alerts and
+    cannot stall the pipeline or the other consumers.
+    """
+
+    def __init__(self):
+        """Initialize an AlertHub instance without consumers."""
+        self._queues = []
+
+    def __len__(self):
+        """Return the number of consumers."""
+        return len(self._queues)
+
+    def publish(self, alert):
+        """Hand an alert to every consumer."""
+        for queue in self._queues:
+            queue.put_nowait(alert)
+
+    async def subscribe(self, maxsize=100, policy="drop_oldest"):
+        """Receive the alerts published from now on.
+
+        Args:
+            maxsize (int): The number of alerts buffered for this consumer.
+            policy (str): The overflow policy of the buffer, other than ``block``.
+
+        Yields:
+            SecurityEvent: The alerts.
+
+        Raises:
+            ValueError: If the policy is ``block``.
+        """
+        if policy == "block":
+            raise ValueError("Alert consumers cannot block the hub.")
+        queue = BoundedQueue(maxsize, policy, key=lambda alert: alert.camera)
+        self._queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.remove(queue)
+
+
+class CameraPipeline:
+    """Streams the security detections of cameras into an automation system.
+
+    Every camera stream is debounced on its own, which also drops repeats of the status
+    last passed on, then feeds a shared bounded queue. By default the queue keeps only
+    the latest detection per camera, so its size is bounded by the number of cameras
+    whatever the event rate. A consumer applies each drained batch to the cameras in one
+    automation system batch, and UNSAFE transitions are published as alerts on ``alerts``.
+    """
+
+    def __init__(self, automation_system, hold=1.0, maxsize=10000, policy="latest", alert_status=UNSAFE):
+        """Initialize a CameraPipeline instance.
+
+        Args:
+            automation_system (CentralAutomationSystem): The automation system of the cameras.
+            hold (float): The time a status must hold before it is applied, in seconds.
+            maxsize (int): The capacity of the shared queue.
+            policy (str): The overflow policy of the shared queue.
+            alert_status (str): The status published as an alert.
+        """
+        self.automation_system = automation_system
+        self.hold = hold
+        self.alert_status = alert_status
+        self.queue = BoundedQueue(maxsize, policy, key=lambda event: event.camera)
+        self.alerts = AlertHub()
+        self.received = 0
+        self.applied = 0
+        self._sources = {}
+        self._consumer = None
+
+    def add_source(self, camera, events):
+        """Start streaming the detections of a camera.
+
+        Args:
+            camera (SecurityCamera): The camera.
+            events: An async iterable of its SecurityEvent detections.
+        """
+        self.remove_source(camera)
+        self._sources[camera] = asyncio.ensure_future(self._pump(events))
+        if self._consumer is None:
+            self._consumer = asyncio.ensure_future(self._consume())
+
+    def remove_source(self, camera):
+        """Stop streaming the detections of a camera."""
+        task = self._sources.pop(camera, None)
+        if task is not None:
+            task.cancel()
+
+    def start(self, rate=1.0, unsafe_probability=0.1, rng=None):
+        """Stream random detections for every camera that is ON."""
+        rng = rng or random.Random()
+        for camera in self.automation_system.devices_of_type(SecurityCamera):
+            if camera.get_status():
+                self.add_source(camera, random_events(camera, rate, unsafe_probability, rng))
+
+    async def stop(self):
+        """Cancel every stream and apply the detections still queued."""
+        tasks = list(self._sources.values())
+        for task in tasks:
+            task.cancel()
+        self._sources.clear()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            tasks.append(self._consumer)
+            self._consumer = None
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._apply(self.queue.drain())
+
+    async def _pump(self, events):
+        """Move the debounced detections of one camera to the queue."""
+        async for event in debounce(self._count(events), self.hold):
+            await self.queue.put(event)
+
+    async def _count(self, events):
+        """Count the detections received."""
+        async for event in events:
+            self.received += 1
+            yield event
+
+    async def _consume(self):
+        """Apply queued detections in batches."""
+        while True:
+            batch = [await self.queue.get()]
+            batch.extend(self.queue.drain())
+            self._apply(batch)
+
+    def _apply(self, events):
+        """Apply detections to their cameras and publish the alerts."""
+        alerts = []
+        with self.automation_system.batch():
+            for event in events:
+                camera = event.camera
+                if camera not in self.automation_system:
+                    continue
+                if camera.get_security_status() != event.status:
+                    camera.set_security_status(event.status)
+                    self.applied += 1
+                    if event.status == self.alert_status:
+                        alerts.append(event)
+        for alert in alerts:
+            self.alerts.publish(alert)
@@ -1,17 +1,113 @@
+from contextlib import contextmanager
+
+from smart_home.event_bus import BRIGHTNESS, STATUS, EventBus
+from smart_home.groups import ATTRIBUTE_SETTERS, Group, Scene
+
+
+def registered_class(device):
+    """Get the class a device is registered under.
+
+    That is the class of the device, or the public class it stands in for when it sets
+    a ``device_class`` attribute, as the proxies of a FleetStore do.
+    """
+    return getattr(device, "device_class", None) or type(device)
+
+
 class CentralAutomationSystem:
-    """Class representing the central automation system for the smart home."""
+    """Class representing the central automation system for the smart home.
+
+    Devices are stored in a registry keyed by ``(device type, device id)`` so that the
+    same ID may be reused across device types, as the dashboard allows. Secondary
+    indexes by ID, by type and by status keep lookups, removals and filtered queries
+    constant time regardless of how many devices are registered.
+
+    State changes reported by registered devices are published on ``event_bus``, which
+    delivers them to subscribers such as the dashboard in coalesced batches. Devices
+    being added or removed are reported synchronously to registry listeners.
+
+    Devices can be gathered in named groups and scenes, and batch commands change many
+    devices at once while publishing their changes as a single batch.
+    """
 
     def __init__(self):
-        """Initialize a CentralAutomationSystem instance with an empty list of devices."""
-        self.devices = []
+        """Initialize a CentralAutomationSystem instance with an empty device registry."""
+        self._devices = {}
+        self._by_id = {}
+        self._by_type = {}
+        self._by_status = {True: {}, False: {}}
+        self.event_bus = EventBus()
+        self._listeners = []
+        self._groups = {}
+        self._scenes = {}
+        self._batch = None
+
+    @property
+    def devices(self):
+        """list: A list of devices in the automation system, in insertion order."""
+        return list(self._devices.values())
+
+    def __len__(self):
+        """Return the number of devices in the automation system."""
+        return len(self._devices)
+
+    def __contains__(self, device):
+        """Check whether the given device instance is registered."""
+        return self._devices.get(self._key(device)) is device
+
+    @staticmethod
+    def _key(device):
+        """Return the registry key of a device."""
+        return registered_class(device), device.get_id()
 
     def add_device(self, device):
         """Add a device to the automation system.
 
         Args:
             device: The device to be added to the automation system.
+
+        Raises:
+            ValueError: If a device of the same type with the same ID already exists.
         """
-        self.devices.append(device)
+        key = self._key(device)
+        if key in self._devices:
+            raise ValueError(f"{key[0].__name__} with ID '{key[1]}' already exists.")
+        self._register(key, device)
+        for listener in list(self._listeners):
+            listener.devices_added([device])
+
+    def _register(self, key, device):
+        """Store a device in the registry and its indexes."""
+        self._devices[key] = device
+        self._by_id.setdefault(key[1], {})[key[0]] = device
+        self._by_type.setdefault(key[0], {})[key[1]] = device
+        self._by_status[bool(device.get_status())][key] = device
+        device.observer = self
+
+    def add_devices(self, devices):
+        """Add several devices to the automation system.
+
+        The batch is validated before anything is registered, so either every device
+        is added or none is.
+
+        Args:
+            devices (iterable): The devices to be added to the automation system.
+
+        Raises:
+            ValueError: If a device clashes with a registered device or with another
+                device of the batch.
+        """
+        devices = list(devices)
+        keys = set()
+        for device in devices:
+            key = self._key(device)
+            if key in self._devices or key in keys:
+                raise ValueError(f"{key[0].__name__} with ID '{key[1]}' already exists.")
+            keys.add(key)
+        for device in devices:
+            self._register(self._key(device), device)
+        if devices:
+            for listener in list(self._listeners):
+                listener.devices_added(devices)
 
     def get_devices(self):
         """Get all devices in the automation system.
@@ -21,13 +117,345 @@ class CentralAutomationSystem:
         """
         return self.devices
 
-    def remove_device(self, device_id):
+    def get_device(self, device_id, device_type=None):
+        """Get a device by its ID.
+
+        Args:
+            device_id (str): The unique identifier of the device.
+            device_type (type, optional): The class of the device. When omitted, the
+                first registered device with the given ID is returned.
+
+        Returns:
+            The matching device, or None if there is none.
+        """
+        if device_type is not None:
+            return self._devices.get((device_type, device_id))
+        matches = self._by_id.get(device_id)
+        if not matches:
+            return None
+        return next(iter(matches.values()))
+
+    def has_device(self, device_id, device_type=None):
+        """Check whether a device with the given ID (and type) is registered.
+
+        Args:
+            device_id (str): The unique identifier of the device.
+            device_type (type, optional): The class of the device.
+
+        Returns:
+            bool: True if such a device is registered.
+        """
+        return self.get_device(device_id, device_type) is not None
+
+    def devices_of_type(self, device_type):
+        """Get all devices of the given type, including subclasses.
+
+        Args:
+            device_type (type): The device class to filter on.
+
+        Returns:
+            list: A list of matching devices.
+        """
+        devices = []
+        for registered_type, by_id in self._by_type.items():
+            if issubclass(registered_type, device_type):
+                devices.extend(by_id.values())
+        return devices
+
+    def devices_with_status(self, status):
+        """Get all devices that are currently ON or OFF.
+
+        Args:
+            status (bool): True for devices that are ON, False for devices that are OFF.
+
+        Returns:
+            list: A list of matching devices.
+        """
+        return list(self._by_status[bool(status)].values())
+
+    def remove_device(self, device_id, device_type=None):
         """Remove a device from the automation system by its ID.
 
         Args:
             device_id (str): The unique identifier of the device to be removed.
+            device_type (type, optional): The class of the device. When omitted, the
+                first registered device with the given ID is removed.
+
+        Returns:
+            The removed device, or None if no device matched.
+        """
+        device = self._unregister(device_id, device_type)
+        if device is not None:
+            for listener in list(self._listeners):
+                listener.devices_removed([device])
+        return device
+
+    def _unregister(self, device_id, device_type):
+        """Drop a device from the registry and its indexes and return it."""
+        device = self.get_device(device_id, device_type)
+        if device is None:
+            return None
+        self._unindex(self._key(device))
+        for group in self._groups.values():
+            group.discard(device)
+        device.observer = None
+        return device
+
+    def _unindex(self, key):
+        """Drop the device stored under a key from the registry and its indexes."""
+        del self._devices[key]
+        by_id = self._by_id[key[1]]
+        del by_id[key[0]]
+        if not by_id:
+            del self._by_id[key[1]]
+        by_type = self._by_type[key[0]]
+        del by_type[key[1]]
+        if not by_type:
+            del self._by_type[key[0]]
+        self._by_status[True].pop(key, None)
+        self._by_status[False].pop(key, None)
+
+    def rename_device(self, device, device_id):
+        """Change the ID of a registered device, keeping its groups.
+
+        Called by ``Device.set_id``. Registry listeners see the device removed under its
+        old ID and added again under the new one.
+
+        Args:
+            device: The registered device.
+            device_id (str): The new ID of the device.
+
+        Raises:
+            ValueError: If a device of the same type already has the new ID.
+        """
+        key = self._key(device)
+        new_key = (key[0], device_id)
+        if new_key == key:
+            return
+        if new_key in self._devices:
+            raise ValueError(f"{key[0].__name__} with ID '{device_id}' already exists.")
+        for listener in list(self._listeners):
+            listener.devices_removed([device])
+        self._unindex(key)
+        device.id = device_id
+        self._register(new_key, device)
+        for listener in list(self._listeners):
+            listener.devices_added([device])
+
+    def remove_devices(self, device_ids, device_type=None):
+        """Remove several devices from the automation system by their IDs.
+
+        Args:
+            device_ids (iterable): The unique identifiers of the devices to be removed.
+            device_type (type, optional): The class of the devices.
+
+        Returns:
+            list: The devices that were removed.
+        """
+        removed = []
+        for device_id in device_ids:
+            device = self._unregister(device_id, device_type)
+            if device is not None:
+                removed.append(device)
+        if removed:
+            for listener in list(self._listeners):
+                listener.devices_removed(removed)
+        return removed
+
+    def add_listener(self, listener):
+        """Register a listener notified when devices are added or removed.
+
+        Args:
+            listener: An object with ``devices_added(devices)`` and
+                ``devices_removed(devices)`` methods, each receiving a list of devices.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop notifying a registry listener.
+
+        Args:
+            listener: A listener previously passed to add_listener.
+        """
+        self._listeners.remove(listener)
+
+    def device_changed(self, device, attribute):
+        """Handle a state change reported by a registered device.
+
+        Keeps the status index current and publishes the change on the event bus.
+
+        Args:
+            device: The device whose state changed.
+            attribute (str): The name of the attribute that changed.
+        """
+        value = getattr(device, attribute)
+        if attribute == STATUS:
+            key = self._key(device)
+            status = bool(value)
+            self._by_status[not status].pop(key, None)
+            self._by_status[status][key] = device
+        if self._batch is not None:
+            self._batch.append((device, attribute, value))
+        else:
+            self.event_bus.publish(device, attribute, value)
+
+    @contextmanager
+    def batch(self):
+        """Publish the changes made within the block as one batch when it exits.
+
+        Taps such as the journal receive a single list of events, and subscribers a
+        single delivery. Nested blocks join the outermost batch.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+        finally:
+            changes, self._batch = self._batch, None
+            if changes:
+                self.event_bus.publish_batch(changes)
+
+    def add_group(self, name, devices=(), device_type=None, groups=()):
+        """Create a named group of devices.
+
+        Args:
+            name (str): The unique name of the group, such as ``"kitchen"``.
+            devices (iterable): The devices explicitly in the group.
+            device_type (type, optional): Include every registered device of this type,
+                as in an "all cameras" group.
+            groups (iterable): The names of nested groups, such as the rooms of a floor.
+
+        Returns:
+            Group: The new group.
+
+        Raises:
+            ValueError: If a group with the same name exists.
+        """
+        if name in self._groups:
+            raise ValueError(f"Group '{name}' already exists.")
+        group = self._groups[name] = Group(name, devices, device_type, groups)
+        return group
+
+    def remove_group(self, name):
+        """Remove a group; its devices stay registered.
+
+        Args:
+            name (str): The name of the group.
+
+        Returns:
+            Group: The removed group, or None if there was none.
+        """
+        return self._groups.pop(name, None)
+
+    def group(self, name):
+        """Get a group by its name.
+
+        Raises:
+            KeyError: If no group has that name.
+        """
+        try:
+            return self._groups[name]
+        except KeyError:
+            raise KeyError(f"No group named '{name}'.") from None
+
+    def group_names(self):
+        """Get the names of every group, in creation order."""
+        return list(self._groups)
+
+    def group_devices(self, name):
+        """Get the registered devices of a group, nested groups included.
+
+        Raises:
+            KeyError: If no group has that name.
+        """
+        return list(self.group(name).resolve(self))
+
+    def add_scene(self, name, settings):
+        """Create a named scene.
+
+        Args:
+            name (str): The unique name of the scene, such as ``"movie night"``.
+            settings (dict): The attribute values to apply to each group, such as
+                ``{"living room": {"status": True, "brightness": 20}}``.
+
+        Returns:
+            Scene: The new scene.
+
+        Raises:
+            ValueError: If a scene with the same name exists or an attribute cannot be set.
+        """
+        if name in self._scenes:
+            raise ValueError(f"Scene '{name}' already exists.")
+        scene = self._scenes[name] = Scene(name, settings)
+        return scene
+
+    def remove_scene(self, name):
+        """Remove a scene and return it, or None if there was none."""
+        return self._scenes.pop(name, None)
+
+    def scene_names(self):
+        """Get the names of every scene, in creation order."""
+        return list(self._scenes)
+
+    def apply_scene(self, name):
+        """Apply every setting of a scene in one batch.
+
+        Args:
+            name (str): The name of the scene.
+
+        Returns:
+            int: The number of attribute changes made.
+
+        Raises:
+            KeyError: If the scene or one of its groups does not exist.
+        """
+        scene = self._scenes.get(name)
+        if scene is None:
+            raise KeyError(f"No scene named '{name}'.")
+        groups = [(self.group_devices(group), attributes) for group, attributes in scene.settings.items()]
+        changes = 0
+        with self.batch():
+            for devices, attributes in groups:
+                changes += self.set_attributes(devices, **attributes)
+        return changes
+
+    def set_attributes(self, targets, **attributes):
+        """Set attributes on many devices in one batch.
+
+        Devices without an attribute are left alone, so ``set_attributes("upstairs",
+        status=False)`` switches every device of the group off. Setting the status or
+        brightness of a light cancels its fade.
+
+        Args:
+            targets: A group name or an iterable of devices.
+            **attributes: The values to set, by attribute name (status, brightness,
+                temperature or security_status).
+
+        Returns:
+            int: The number of attribute changes made.
+
+        Raises:
+            KeyError: If the group does not exist.
+            ValueError: If an attribute cannot be set by a batch command.
         """
-        for device in self.devices:
-            if device.get_id() == device_id:
-                self.devices.remove(device)
-                break
+        unknown = set(attributes) - set(ATTRIBUTE_SETTERS)
+        if unknown:
+            raise ValueError(f"Cannot set unknown attributes: {', '.join(sorted(unknown))}.")
+        devices = self.group_devices(targets) if isinstance(targets, str) else targets
+        setters = [(attribute, ATTRIBUTE_SETTERS[attribute], value) for attribute, value in attributes.items()]
+        cancel_fades = STATUS in attributes or BRIGHTNESS in attributes
+        changes = 0
+        with self.batch():
+            batch = self._batch
+            for device in devices:
+                engine = getattr(device, "transition_engine", None) if cancel_fades else None
+                if engine is not None:
+                    engine.cancel(device)
+                for attribute, setter, value in setters:
+                    if hasattr(device, attribute):
+                        before = len(batch)
+                        getattr(device, setter)(value)
+                        changes += len(batch) > before
+        return changes
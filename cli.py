@@ -0,0 +1,55 @@
+import argparse
+import importlib
+import sys
+
+# Subcommands: (module, function, help). Modules are imported only when their command
+# runs, so headless commands never load Qt or NumPy.
+COMMANDS = {
+    "dashboard": ("smart_home.cli", "run_dashboard", "open the monitoring dashboard (requires PyQt5)"),
+    "simulate": ("smart_home.simulation", "main", "simulate homes in discrete time without the dashboard"),
+    "fleet": ("smart_home.multi_home", "main", "simulate many homes across worker processes"),
+    "serve": ("smart_home.control_plane", "main", "serve the HTTP and WebSocket control plane"),
+    "bench": ("smart_home.benchmarks.suite", "main", "run the benchmark suite or compare commits"),
+}
+
+
+def run_dashboard(argv=None):
+    """Open the monitoring dashboard over an empty automation system.
+
+    Args:
+        argv (list, optional): The arguments passed on to Qt.
+
+    Returns:
+        int: The exit status of the Qt event loop.
+    """
+    from PyQt5.QtWidgets import QApplication
+
+    from smart_home.central_automation_system import CentralAutomationSystem
+    from smart_home.monitoring_dashboard import SmartHomeGUI
+
+    app = QApplication([sys.argv[0], *(argv or [])])
+    smart_home_gui = SmartHomeGUI(CentralAutomationSystem())
+    smart_home_gui.show()
+    return app.exec_()
+
+
+def main(argv=None):
+    """Run a subcommand from the command line.
+
+    Every argument after the command is handed to it, so ``python -m smart_home
+    simulate --help`` lists the options of the simulation.
+
+    Returns:
+        int: The exit status of the command.
+    """
+    parser = argparse.ArgumentParser(prog="smart_home", description="Smart home automation tools.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (_, _, help) in COMMANDS.items():
+        commands.add_parser(name, help=help, add_help=False)
+    args, remaining = parser.parse_known_args(argv)
+    module_name, function_name, _ = COMMANDS[args.command]
+    # Commands build their own parser, whose usage line then names the command.
+    sys.argv[0] = f"{parser.prog} {args.command}"
+    function = getattr(importlib.import_module(module_name), function_name)
+    status = function(remaining)
+    return status if isinstance(status, int) else 0
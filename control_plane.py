@@ -0,0 +1,808 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from smart_home.central_automation_system import CentralAutomationSystem, registered_class
+from smart_home.event_bus import BRIGHTNESS, SECURITY_STATUS, STATUS, TEMPERATURE
+from smart_home.instrumentation import Instrumentation
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+# Device types as named in URLs and JSON documents, with the attribute holding their level.
+DEVICE_TYPES = {"light": SmartLight, "thermostat": Thermostat, "camera": SecurityCamera}
+LEVEL_ATTRIBUTES = {"light": BRIGHTNESS, "thermostat": TEMPERATURE, "camera": SECURITY_STATUS}
+DEFAULT_LEVELS = {"light": 0, "thermostat": 20.0, "camera": "SAFE"}
+ATTRIBUTE_TYPES = {STATUS: (bool,), BRIGHTNESS: (int, float), TEMPERATURE: (int, float), SECURITY_STATUS: (str,)}
+
+REASONS = {
+    101: "Switching Protocols",
+    200: "OK",
+    201: "Created",
+    202: "Accepted",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT, CLOSE, PING, PONG = 0x1, 0x8, 0x9, 0xA
+MAX_FRAME_SIZE = 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Raised by request handlers to answer with an error status."""
+
+    def __init__(self, status, message):
+        """Initialize an HTTPError instance.
+
+        Args:
+            status (int): The HTTP status code.
+            message (str): The error message sent to the client.
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def type_name(device):
+    """Get the URL name of the type of a device."""
+    for name, device_class in DEVICE_TYPES.items():
+        if isinstance(device, device_class):
+            return name
+    return type(device).__name__
+
+
+def device_document(device):
+    """Describe a device as a JSON-serializable dictionary."""
+    name = type_name(device)
+    document = {"type": name, "id": device.get_id(), "status": bool(device.get_status())}
+    attribute = LEVEL_ATTRIBUTES.get(name)
+    if attribute is not None:
+        document[attribute] = getattr(device, attribute)
+    return document
+
+
+def websocket_accept(key):
+    """Compute the Sec-WebSocket-Accept value answering a handshake key."""
+    return base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+
+
+def _mask(payload, key):
+    """Apply a WebSocket masking key to a payload."""
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "little") ^ int.from_bytes(repeated, "little")).to_bytes(len(payload), "little")
+
+
+def encode_frame(payload, opcode=TEXT, mask=False):
+    """Encode a final WebSocket frame.
+
+    Args:
+        payload (bytes): The payload of the frame.
+        opcode (int): The frame type.
+        mask (bool): Mask the payload, as clients must.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _mask(payload, key)
+    return header + payload
+
+
+async def read_frame(reader, max_size=MAX_FRAME_SIZE):
+    """Read one WebSocket frame, unmasking its payload.
+
+    Fragmented messages are not supported; every frame is returned as it arrives.
+
+    Args:
+        reader (asyncio.StreamReader): The stream to read from.
+        max_size (int): The largest payload accepted, in bytes.
+
+    Returns:
+        tuple: The opcode and payload of the frame.
+
+    Raises:
+        ValueError: If the frame is larger than ``max_size``.
+        asyncio.IncompleteReadError: If the connection closes mid-frame.
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > max_size:
+        raise ValueError(f"WebSocket frame of {length} bytes exceeds {max_size} bytes.")
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key is not None:
+        payload = _mask(payload, key)
+    return first & 0x0F, payload
+
+
+async def read_message(reader, max_size):
+    """Read an HTTP request or response head and body.
+
+    Args:
+        reader (asyncio.StreamReader): The stream to read from.
+        max_size (int): The largest body accepted, in bytes.
+
+    Returns:
+        tuple: The start line, a dict of lower-cased header names to values, and the
+        body, or None if the connection closed cleanly.
+
+    Raises:
+        HTTPError: If the head or body is too large or malformed.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if not error.partial:
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Request head is too large.") from None
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length header.") from None
+    if length > max_size:
+        raise HTTPError(413, f"Request body exceeds {max_size} bytes.")
+    body = await reader.readexactly(length) if length else b""
+    return lines[0], headers, body
+
+
+class FeedBatch:
+    """Changes delivered by the event bus, encoded once for every subscriber sharing it."""
+
+    __slots__ = ("changes", "_frame")
+
+    def __init__(self, changes):
+        """Initialize a FeedBatch instance.
+
+        Args:
+            changes (dict): The ``[type, id, attribute, value]`` lists of the changes, keyed
+                by (type, id, attribute).
+        """
+        self.changes = changes
+        self._frame = None
+
+    def frame(self):
+        """Get the WebSocket frame carrying the changes."""
+        if self._frame is None:
+            self._frame = encode_changes(self.changes)
+        return self._frame
+
+
+def encode_changes(changes):
+    """Encode changes keyed by (type, id, attribute) as a WebSocket text frame."""
+    return encode_frame(json.dumps({"changes": list(changes.values())}, separators=(",", ":")).encode())
+
+
+class FeedSubscriber:
+    """WebSocket client of the change feed.
+
+    Batches are written straight to the socket while its send buffer stays under
+    ``high_water`` bytes, and subscribers with the same filter share one encoded frame.
+    Once the buffer fills up the client is blocked: later batches are merged into
+    ``pending``, keeping the latest value of every device attribute, until the buffer
+    drains. A slow client therefore receives fewer, larger messages, and the memory
+    held for it is bounded by the number of device attributes rather than by the
+    event rate.
+    """
+
+    __slots__ = ("writer", "attributes", "high_water", "blocked", "pending", "wake", "messages", "coalesced")
+
+    def __init__(self, writer, attributes=None, high_water=64 * 1024):
+        """Initialize a FeedSubscriber instance.
+
+        Args:
+            writer (asyncio.StreamWriter): The stream of the client.
+            attributes (frozenset, optional): Only send changes of these attributes.
+            high_water (int): The send buffer size blocking the client, in bytes.
+        """
+        self.writer = writer
+        self.attributes = attributes
+        self.high_water = high_water
+        self.blocked = False
+        self.pending = None
+        self.wake = asyncio.Event()
+        self.messages = 0
+        self.coalesced = 0
+        writer.transport.set_write_buffer_limits(high=high_water)
+
+    def offer(self, batch):
+        """Send a batch of changes to the client, or merge it into the pending changes."""
+        if not self.blocked:
+            self._send(batch.frame())
+            return
+        if self.pending is None:
+            self.pending = dict(batch.changes)
+            return
+        before = len(self.pending)
+        self.pending.update(batch.changes)
+        self.coalesced += len(batch.changes) - (len(self.pending) - before)
+
+    def _send(self, frame):
+        """Write a frame and block the client if its send buffer is full."""
+        if self.writer.is_closing():
+            return
+        self.writer.write(frame)
+        self.messages += 1
+        if self.writer.transport.get_write_buffer_size() > self.high_water:
+            self.blocked = True
+            self.wake.set()
+
+    async def run(self):
+        """Unblock the client whenever its send buffer drains, until the connection fails."""
+        try:
+            while True:
+                await self.wake.wait()
+                self.wake.clear()
+                await self.writer.drain()
+                self.blocked = False
+                if self.pending is not None:
+                    pending, self.pending = self.pending, None
+                    self._send(encode_changes(pending))
+        except ConnectionError:
+            pass
+
+
+class ControlPlane:
+    """HTTP and WebSocket server controlling a CentralAutomationSystem.
+
+    Built on asyncio streams only. The HTTP API offers device CRUD under ``/devices``,
+    batch commands and scenes under ``/commands``, and lists groups and scenes; the
+    ``/feed`` WebSocket streams change events, optionally filtered by attribute with
+    ``/feed?attributes=status,brightness``. Requests on a connection are handled one
+    at a time, and feed clients are served through FeedSubscriber, so slow clients
+    are throttled instead of buffering without bound.
+
+    Routes:
+        GET /devices[?type=light&offset=0&limit=100]
+        POST /devices with a device document, or ``{"devices": [...]}``
+        GET|PATCH|DELETE /devices/<type>/<id>
+        POST /commands with ``{"targets": group or [{"type", "id"}], "attributes": {...}}``
+            or ``{"scene": name}``
+        GET /groups, GET /scenes
+        GET /feed (WebSocket)
+        GET /metrics[?format=json] with an Instrumentation, in the Prometheus text format
+        POST /profile with ``{"mode": "cprofile" or "sampling"}``, DELETE /profile for the report
+    """
+
+    def __init__(self, automation_system, host="127.0.0.1", port=8080, max_body=1024 * 1024, backlog=4096,
+                 instrumentation=None):
+        """Initialize a ControlPlane instance.
+
+        Args:
+            automation_system (CentralAutomationSystem): The automation system to control.
+            host (str): The interface to listen on.
+            port (int): The port to listen on; 0 picks a free port.
+            max_body (int): The largest request body accepted, in bytes.
+            backlog (int): The number of pending connections the listening socket queues.
+            instrumentation (Instrumentation, optional): Metrics served under ``/metrics``.
+        """
+        self.automation_system = automation_system
+        self.instrumentation = instrumentation
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.backlog = backlog
+        self.requests = 0
+        self._server = None
+        self._feeds = {}
+        self._connections = set()
+
+    async def start(self):
+        """Start listening and following the event bus.
+
+        Returns:
+            int: The port the server listens on.
+        """
+        self._server = await asyncio.start_server(self._serve, self.host, self.port, backlog=self.backlog)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.automation_system.event_bus.subscribe(self.on_device_changes)
+        return self.port
+
+    async def close(self):
+        """Stop listening and close the open connections, feeds included."""
+        self.automation_system.event_bus.unsubscribe(self.on_device_changes)
+        if self._server is not None:
+            self._server.close()
+            connections = list(self._connections)
+            for task in connections:
+                task.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def subscribers(self):
+        """int: The number of connected feed clients."""
+        return sum(len(subscribers) for subscribers in self._feeds.values())
+
+    def on_device_changes(self, events):
+        """Hand a batch of change events from the event bus to the feed clients."""
+        for attributes, subscribers in self._feeds.items():
+            changes = {}
+            for event in events:
+                if attributes is None or event.attribute in attributes:
+                    name = type_name(event.device)
+                    device_id = event.device.get_id()
+                    changes[(name, device_id, event.attribute)] = [name, device_id, event.attribute, event.value]
+            if changes:
+                batch = FeedBatch(changes)
+                for subscriber in subscribers:
+                    subscriber.offer(batch)
+
+    async def _serve(self, reader, writer):
+        """Handle the requests of one connection."""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    message = await read_message(reader, self.max_body)
+                except HTTPError as error:
+                    await self._respond(writer, error.status, {"error": error.message}, keep_alive=False)
+                    return
+                if message is None:
+                    return
+                start_line, headers, body = message
+                method, target, version = (start_line.split(" ") + ["", ""])[:3]
+                url = urlsplit(target)
+                if url.path == "/feed" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_feed(reader, writer, headers, parse_qs(url.query))
+                    return
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                self.requests += 1
+                try:
+                    status, document = self.handle(method, url.path, parse_qs(url.query), body)
+                except HTTPError as error:
+                    status, document = error.status, {"error": error.message}
+                except Exception:
+                    status, document = 500, {"error": f"Internal error handling {method} {url.path}."}
+                await self._respond(writer, status, document, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Cancelled by close(). Ending normally keeps the stream machinery from
+            # reporting the cancellation as an error of the connection callback.
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status, document, keep_alive=True):
+        """Send a JSON response, or a plain text one for a string document."""
+        content_type = "application/json"
+        if isinstance(document, str):
+            body = document.encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"" if document is None else json.dumps(document, separators=(",", ":")).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _serve_feed(self, reader, writer, headers, query):
+        """Upgrade a connection to the WebSocket change feed and serve it."""
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._respond(writer, 400, {"error": "Missing Sec-WebSocket-Key header."}, keep_alive=False)
+            return
+        attributes = None
+        if "attributes" in query:
+            attributes = frozenset(",".join(query["attributes"]).split(","))
+        writer.write((f"HTTP/1.1 101 {REASONS[101]}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n").encode())
+        subscriber = FeedSubscriber(writer, attributes)
+        self._feeds.setdefault(attributes, set()).add(subscriber)
+        sender = asyncio.ensure_future(subscriber.run())
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == CLOSE:
+                    writer.write(encode_frame(payload[:2], CLOSE))
+                    break
+                if opcode == PING:
+                    writer.write(encode_frame(payload, PONG))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            subscribers = self._feeds[attributes]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._feeds[attributes]
+
+    def handle(self, method, path, query, body):
+        """Answer an HTTP request.
+
+        Args:
+            method (str): The request method.
+            path (str): The request path.
+            query (dict): The query parameters, as returned by ``urllib.parse.parse_qs``.
+            body (bytes): The request body.
+
+        Returns:
+            tuple: The status code and the JSON document of the response, a string for a
+            plain text response, or None for no body.
+
+        Raises:
+            HTTPError: If the request cannot be served.
+        """
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts[0] == "devices" and len(parts) == 1:
+            if method == "GET":
+                return 200, self.list_devices(query)
+            if method == "POST":
+                return 201, self.create_devices(self._json(body))
+        elif parts[0] == "devices" and len(parts) == 3:
+            device = self._device(parts[1], parts[2])
+            if method == "GET":
+                return 200, device_document(device)
+            if method == "PATCH":
+                self._set_attributes([device], self._json(body))
+                return 200, device_document(device)
+            if method == "DELETE":
+                engine = getattr(device, "transition_engine", None)
+                if engine is not None:
+                    engine.cancel(device)
+                self.automation_system.remove_device(device.get_id(), registered_class(device))
+                return 204, None
+        elif parts == ["commands"]:
+            if method == "POST":
+                return 200, self.run_command(self._json(body))
+        elif parts == ["groups"]:
+            if method == "GET":
+                return 200, {"groups": {name: len(self.automation_system.group_devices(name))
+                                        for name in self.automation_system.group_names()}}
+        elif parts == ["scenes"]:
+            if method == "GET":
+                return 200, {"scenes": self.automation_system.scene_names()}
+        elif parts[0] in ("metrics", "profile") and len(parts) == 1 and self.instrumentation is not None:
+            return self._instrumentation(method, parts[0], query, body)
+        else:
+            raise HTTPError(404, f"No resource at '{path}'.")
+        raise HTTPError(405, f"Method {method} is not allowed on '{path}'.")
+
+    def _instrumentation(self, method, resource, query, body):
+        """Serve the metrics and the profiler of the instrumentation."""
+        instrumentation = self.instrumentation
+        if resource == "metrics" and method == "GET":
+            if query.get("format", [""])[0] == "json":
+                return 200, instrumentation.snapshot()
+            return 200, instrumentation.prometheus()
+        if resource == "profile" and method == "POST":
+            document = self._json(body) or {}
+            try:
+                instrumentation.profiler.start(document.get("mode", "cprofile"), document.get("interval", 0.005))
+            except (ValueError, RuntimeError) as error:
+                raise HTTPError(409 if isinstance(error, RuntimeError) else 400, str(error))
+            return 202, {"mode": instrumentation.profiler.mode}
+        if resource == "profile" and method == "DELETE":
+            try:
+                return 200, {"report": instrumentation.profiler.stop()}
+            except RuntimeError as error:
+                raise HTTPError(409, str(error))
+        raise HTTPError(405, f"Method {method} is not allowed on '/{resource}'.")
+
+    @staticmethod
+    def _json(body):
+        """Decode a JSON request body."""
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON.") from None
+
+    @staticmethod
+    def _device_class(name):
+        """Get the device class named in a URL or document."""
+        device_class = DEVICE_TYPES.get(name)
+        if device_class is None:
+            raise HTTPError(404, f"Unknown device type '{name}'.")
+        return device_class
+
+    def _device(self, name, device_id):
+        """Get a registered device by type name and ID."""
+        device = self.automation_system.get_device(device_id, self._device_class(name))
+        if device is None:
+            raise HTTPError(404, f"No {name} with ID '{device_id}'.")
+        return device
+
+    def list_devices(self, query):
+        """List the registered devices, optionally of one type and one page at a time."""
+        if "type" in query:
+            devices = self.automation_system.devices_of_type(self._device_class(query["type"][0]))
+        else:
+            devices = self.automation_system.get_devices()
+        try:
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query["limit"][0]) if "limit" in query else len(devices)
+        except ValueError:
+            raise HTTPError(400, "offset and limit must be integers.") from None
+        if offset < 0 or limit < 0:
+            raise HTTPError(400, "offset and limit must not be negative.")
+        page = devices[offset:offset + limit]
+        return {"total": len(devices), "devices": [device_document(device) for device in page]}
+
+    def create_devices(self, document):
+        """Register the devices described by a request body."""
+        documents = document.get("devices") if isinstance(document, dict) and "devices" in document else [document]
+        if not isinstance(documents, list):
+            raise HTTPError(400, "devices must be a list.")
+        devices = []
+        for item in documents:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+                raise HTTPError(400, "Every device needs a type and a string id.")
+            name = item.get("type")
+            if name not in DEVICE_TYPES:
+                raise HTTPError(400, f"Unknown device type '{name}'.")
+            device_class = self._device_class(name)
+            level = item.get(LEVEL_ATTRIBUTES[name], DEFAULT_LEVELS[name])
+            attributes = self._validated({STATUS: item.get(STATUS, False), LEVEL_ATTRIBUTES[name]: level})
+            devices.append(device_class(item["id"], attributes[STATUS], attributes[LEVEL_ATTRIBUTES[name]]))
+        try:
+            self.automation_system.add_devices(devices)
+        except ValueError as error:
+            raise HTTPError(409, str(error)) from None
+        return {"devices": [device_document(device) for device in devices]}
+
+    @staticmethod
+    def _validated(attributes):
+        """Check the names and value types of attributes sent by a client."""
+        if not isinstance(attributes, dict) or not attributes:
+            raise HTTPError(400, "attributes must be a non-empty object.")
+        for attribute, value in attributes.items():
+            types = ATTRIBUTE_TYPES.get(attribute)
+            if types is None:
+                raise HTTPError(400, f"Unknown attribute '{attribute}'.")
+            if not isinstance(value, types) or (bool not in types and isinstance(value, bool)):
+                raise HTTPError(400, f"Invalid value for '{attribute}'.")
+        return attributes
+
+    def _set_attributes(self, targets, attributes):
+        """Set validated attributes on devices or a group in one batch.
+
+        Devices named explicitly must have every attribute, while the devices of a group
+        without one are left alone, as by ``CentralAutomationSystem.set_attributes``.
+        """
+        attributes = self._validated(attributes)
+        if not isinstance(targets, str):
+            for device in targets:
+                for attribute in attributes:
+                    if not hasattr(device, attribute):
+                        raise HTTPError(400, f"A {type_name(device)} has no attribute '{attribute}'.")
+        try:
+            return self.automation_system.set_attributes(targets, **attributes)
+        except KeyError as error:
+            raise HTTPError(404, error.args[0]) from None
+
+    def run_command(self, document):
+        """Run a batch command or apply a scene."""
+        if not isinstance(document, dict):
+            raise HTTPError(400, "A command must be an object.")
+        if "scene" in document:
+            try:
+                return {"changes": self.automation_system.apply_scene(document["scene"])}
+            except KeyError as error:
+                raise HTTPError(404, error.args[0]) from None
+        targets = document.get("targets")
+        if isinstance(targets, list):
+            if not all(isinstance(item, dict) and isinstance(item.get("type"), str)
+                       and isinstance(item.get("id"), str) for item in targets):
+                raise HTTPError(400, "Every target needs a string type and id.")
+            targets = [self._device(item["type"], item["id"]) for item in targets]
+        elif not isinstance(targets, str):
+            raise HTTPError(400, "targets must be a group name or a list of devices.")
+        return {"changes": self._set_attributes(targets, document.get("attributes"))}
+
+
+class ControlPlaneClient:
+    """Minimal HTTP/1.1 keep-alive client for a ControlPlane."""
+
+    def __init__(self, host="127.0.0.1", port=8080):
+        """Initialize a ControlPlaneClient instance.
+
+        Args:
+            host (str): The host of the server.
+            port (int): The port of the server.
+        """
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        """Open the connection."""
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        """Close the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def request(self, method, path, document=None):
+        """Send a request and wait for its response.
+
+        Args:
+            method (str): The request method.
+            path (str): The request path, with its query string.
+            document (optional): A JSON-serializable request body.
+
+        Returns:
+            tuple: The status code and the decoded JSON response, the text of a plain text
+            response, or None without a body.
+        """
+        if self._writer is None:
+            await self.connect()
+        body = b"" if document is None else json.dumps(document).encode()
+        self._writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body)
+        message = await read_message(self._reader, 1 << 30)
+        if message is None:
+            raise ConnectionError("The server closed the connection.")
+        status_line, headers, body = message
+        status = int(status_line.split(" ")[1])
+        if not body:
+            return status, None
+        if headers.get("content-type", "").startswith("text/plain"):
+            return status, body.decode()
+        return status, json.loads(body)
+
+
+class FeedClient:
+    """Minimal WebSocket client of the change feed of a ControlPlane."""
+
+    def __init__(self, host="127.0.0.1", port=8080, attributes=None):
+        """Initialize a FeedClient instance.
+
+        Args:
+            host (str): The host of the server.
+            port (int): The port of the server.
+            attributes (iterable, optional): Only receive changes of these attributes.
+        """
+        self.host = host
+        self.port = port
+        self.attributes = attributes
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        """Open the connection and perform the WebSocket handshake.
+
+        Raises:
+            ConnectionError: If the server refuses the upgrade.
+        """
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = "/feed" if self.attributes is None else f"/feed?attributes={','.join(self.attributes)}"
+        self._writer.write((f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nUpgrade: websocket\r\n"
+                            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                            f"Sec-WebSocket-Version: 13\r\n\r\n").encode())
+        message = await read_message(self._reader, 0)
+        if message is None or message[1].get("sec-websocket-accept") != websocket_accept(key):
+            raise ConnectionError("The server refused the WebSocket upgrade.")
+
+    async def receive(self):
+        """Wait for the next batch of changes.
+
+        Returns:
+            list: The ``[type, id, attribute, value]`` lists of the changes, or None once
+            the server closed the feed.
+        """
+        payload = await self.receive_raw()
+        return None if payload is None else json.loads(payload)["changes"]
+
+    async def receive_raw(self):
+        """Wait for the next batch of changes without decoding it.
+
+        Returns:
+            bytes: The JSON message, or None once the server closed the feed.
+        """
+        while True:
+            try:
+                opcode, payload = await read_frame(self._reader, max_size=1 << 30)
+            except asyncio.IncompleteReadError:
+                return None
+            if opcode == TEXT:
+                return payload
+            if opcode == CLOSE:
+                return None
+            if opcode == PING:
+                self._writer.write(encode_frame(payload, PONG, mask=True))
+
+    async def close(self):
+        """Close the feed."""
+        if self._writer is not None:
+            try:
+                self._writer.write(encode_frame(struct.pack("!H", 1000), CLOSE, mask=True))
+                await self._writer.drain()
+            except ConnectionError:
+                pass
+            self._writer.close()
+            self._writer = None
+
+
+def demo_system(lights=1000, thermostats=100, cameras=100):
+    """Create an automation system holding numbered devices of every type."""
+    automation_system = CentralAutomationSystem()
+    devices = [SmartLight(f"light-{index}", False, 0) for index in range(lights)]
+    devices += [Thermostat(f"thermostat-{index}", False, 20.0) for index in range(thermostats)]
+    devices += [SecurityCamera(f"camera-{index}", True, "SAFE") for index in range(cameras)]
+    automation_system.add_devices(devices)
+    automation_system.add_group("lights", device_type=SmartLight)
+    automation_system.add_group("cameras", device_type=SecurityCamera)
+    return automation_system
+
+
+async def serve(automation_system, host="127.0.0.1", port=8080, instrumentation=None):
+    """Serve a control plane until cancelled, printing the port once listening."""
+    control_plane = ControlPlane(automation_system, host, port, instrumentation=instrumentation)
+    port = await control_plane.start()
+    print(f"Listening on http://{host}:{port}", flush=True)
+    try:
+        if instrumentation is not None:
+            instrumentation.install()
+        await asyncio.Event().wait()
+    finally:
+        if instrumentation is not None:
+            instrumentation.uninstall()
+        await control_plane.close()
+
+
+def main(argv=None):
+    """Serve a control plane over a demo home from the command line."""
+    parser = argparse.ArgumentParser(description="Serve the smart home HTTP and WebSocket control plane.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on, 0 for any free port")
+    parser.add_argument("--lights", type=int, default=1000, help="number of demo lights")
+    parser.add_argument("--thermostats", type=int, default=100, help="number of demo thermostats")
+    parser.add_argument("--cameras", type=int, default=100, help="number of demo cameras")
+    parser.add_argument("--instrument", action="store_true", help="time requests and device commands under /metrics")
+    args = parser.parse_args(argv)
+    instrumentation = Instrumentation() if args.instrument else None
+    try:
+        asyncio.run(serve(demo_system(args.lights, args.thermostats, args.cameras), args.host, args.port,
+                          instrumentation))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
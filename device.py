@@ -0,0 +1,94 @@
+class Device:
+    """Class representing a device in the smart home system.
+
+    Devices use ``__slots__`` rather than a per-instance ``__dict__`` so that large
+    simulated homes only pay for the attributes a device actually has.
+    """
+
+    __slots__ = ("id", "status", "observer")
+
+    def __init__(self, id, status):
+        """Initialize a Device instance.
+
+        Args:
+            id (str): The unique identifier for the device.
+            status (bool): The current status of the device (True if ON, False if OFF).
+        """
+        self.id = id
+        self.status = status
+        # Set by the automation system the device is registered with.
+        self.observer = None
+
+    def get_id(self):
+        """Get the ID of the device."""
+        return self.id
+
+    def set_id(self, id):
+        """Set the ID of the device.
+
+        A registered device is renamed through its automation system, so it stays
+        reachable under the new ID.
+
+        Args:
+            id (str): The new ID for the device.
+
+        Returns:
+            str: The new ID of the device.
+
+        Raises:
+            ValueError: If another registered device of the same type has the new ID.
+        """
+        if self.observer is not None:
+            self.observer.rename_device(self, id)
+        else:
+            self.id = id
+        return self.id
+
+    def get_status(self):
+        """Get the status of the device (ON or OFF)."""
+        return self.status
+
+    def set_status(self, status):
+        """Set the status of the device.
+
+        Args:
+            status (bool): The new status for the device (True if ON, False if OFF).
+
+        Returns:
+            bool: The new status of the device.
+        """
+        if status != self.status:
+            self.status = status
+            self.notify_change("status")
+        return self.status
+
+    def turn_off(self):
+        """Turn off the device.
+
+        Returns:
+            bool: The new status of the device (False).
+        """
+        if self.status:
+            self.status = False
+            self.notify_change("status")
+        return self.status
+
+    def turn_on(self):
+        """Turn on the device.
+
+        Returns:
+            bool: The new status of the device (True).
+        """
+        if not self.status:
+            self.status = True
+            self.notify_change("status")
+        return self.status
+
+    def notify_change(self, attribute):
+        """Report a state change to the automation system the device is registered with.
+
+        Args:
+            attribute (str): The name of the attribute that changed.
+        """
+        if self.observer is not None:
+            self.observer.device_changed(self, attribute)
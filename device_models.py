@@ -0,0 +1,342 @@
+from PyQt5.QtCore import QAbstractListModel, QAbstractTableModel, QModelIndex, Qt
+
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+DEVICE_TYPE_NAMES = (
+    (SmartLight, "Smart Light"),
+    (Thermostat, "Thermostat"),
+    (SecurityCamera, "Security Camera"),
+)
+
+
+def device_type_name(device):
+    """Get the display name of the type of a device."""
+    for device_class, name in DEVICE_TYPE_NAMES:
+        if isinstance(device, device_class):
+            return name
+    return type(device).__name__
+
+
+def device_label(device):
+    """Get the label identifying a device in lists, such as ``SmartLight#kitchen``."""
+    for device_class, _ in DEVICE_TYPE_NAMES:
+        if isinstance(device, device_class):
+            return f"{device_class.__name__}#{device.get_id()}"
+    return str(device.get_id())
+
+
+class DeviceTableModel(QAbstractTableModel):
+    """Table model listing every device registered with the automation system.
+
+    Rows follow the registry through its add/remove notifications, and cells are
+    refreshed from the batched change events of the event bus, with ``dataChanged``
+    emitted only for the rows of devices that changed. Views only query the rows
+    they display, so the cost of a refresh does not grow with the size of the fleet.
+    """
+
+    TYPE, ID, STATUS, LEVEL, SECURITY_STATUS = range(5)
+    HEADERS = ("Type", "ID", "Status", "Brightness / Temperature", "Security Status")
+    # Removals spanning more row ranges than this reset the model instead.
+    MAX_REMOVED_RANGES = 32
+
+    def __init__(self, automation_system, parent=None):
+        """Initialize a DeviceTableModel instance.
+
+        Args:
+            automation_system: The central automation system whose devices are listed.
+            parent (QObject, optional): The parent object of the model.
+        """
+        super().__init__(parent)
+        self.automation_system = automation_system
+        self._devices = automation_system.get_devices()
+        self._rows = {device: row for row, device in enumerate(self._devices)}
+        automation_system.add_listener(self)
+        automation_system.event_bus.subscribe(self.on_device_changes)
+
+    def detach(self):
+        """Stop following the automation system."""
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.unsubscribe(self.on_device_changes)
+
+    def device(self, row):
+        """Get the device displayed in a row."""
+        return self._devices[row]
+
+    def row_of(self, device):
+        """Get the row displaying a device, or -1 if it is not listed."""
+        return self._rows.get(device, -1)
+
+    def rowCount(self, parent=QModelIndex()):
+        """Return the number of listed devices."""
+        return 0 if parent.isValid() else len(self._devices)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Return the column titles."""
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Return the value of a cell for the given role."""
+        if not index.isValid():
+            return None
+        device = self._devices[index.row()]
+        column = index.column()
+        if role == Qt.CheckStateRole and column == self.STATUS:
+            return Qt.Checked if device.get_status() else Qt.Unchecked
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        if column == self.TYPE:
+            return device_type_name(device)
+        if column == self.ID:
+            return str(device.get_id())
+        if column == self.STATUS:
+            return "ON" if device.get_status() else "OFF"
+        if column == self.LEVEL:
+            if isinstance(device, SmartLight):
+                return int(device.get_brightness())
+            if isinstance(device, Thermostat):
+                return int(device.get_temperature())
+            return None
+        if column == self.SECURITY_STATUS and isinstance(device, SecurityCamera):
+            return device.get_security_status() if device.get_status() else "N/A"
+        return None
+
+    def flags(self, index):
+        """Return the item flags of a cell; status is checkable and levels are editable."""
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.STATUS:
+            flags |= Qt.ItemIsUserCheckable
+        elif index.column() == self.LEVEL and isinstance(self._devices[index.row()], (SmartLight, Thermostat)):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Apply an edit made in the view to the device of the row."""
+        if not index.isValid():
+            return False
+        device = self._devices[index.row()]
+        if index.column() == self.STATUS and role == Qt.CheckStateRole:
+            if value == Qt.Checked:
+                device.turn_on()
+            else:
+                device.turn_off()
+        elif index.column() == self.LEVEL and role == Qt.EditRole:
+            try:
+                level = max(0, min(100, int(value)))
+            except (TypeError, ValueError):
+                return False
+            if isinstance(device, SmartLight):
+                device.set_brightness(level)
+            elif isinstance(device, Thermostat):
+                device.set_temperature(level)
+            else:
+                return False
+        else:
+            return False
+        self.dataChanged.emit(self.index(index.row(), 0), self.index(index.row(), len(self.HEADERS) - 1))
+        return True
+
+    def devices_added(self, devices):
+        """Append rows for devices added to the automation system."""
+        first = len(self._devices)
+        self.beginInsertRows(QModelIndex(), first, first + len(devices) - 1)
+        for row, device in enumerate(devices, first):
+            self._rows[device] = row
+        self._devices.extend(devices)
+        self.endInsertRows()
+
+    def devices_removed(self, devices):
+        """Drop the rows of devices removed from the automation system."""
+        rows = sorted((self._rows[device] for device in devices if device in self._rows), reverse=True)
+        if not rows:
+            return
+        ranges = _ranges(rows)
+        if len(ranges) > self.MAX_REMOVED_RANGES:
+            # Scattered bulk removals are cheaper as one reset than as many row moves.
+            removed = set(devices)
+            self.beginResetModel()
+            self._devices = [device for device in self._devices if device not in removed]
+            self._rows = {device: row for row, device in enumerate(self._devices)}
+            self.endResetModel()
+            return
+        for first, last in ranges:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._devices[first:last + 1]
+            self.endRemoveRows()
+        for device in devices:
+            self._rows.pop(device, None)
+        for row in range(rows[-1], len(self._devices)):
+            self._rows[self._devices[row]] = row
+
+    def on_device_changes(self, events):
+        """Emit dataChanged for the rows of the devices in a batch of change events.
+
+        Args:
+            events (list): The ChangeEvent instances delivered by the event bus.
+        """
+        rows = {self._rows[event.device] for event in events if event.device in self._rows}
+        last_column = len(self.HEADERS) - 1
+        for first, last in _ranges(sorted(rows, reverse=True)):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+
+
+class DeviceListModel(QAbstractListModel):
+    """List model backing the remove-device dropdown.
+
+    The first row is a placeholder prompting for a selection; the following rows list
+    the registered devices matching the current filter text, with the device itself
+    available under ``Qt.UserRole``. Rows follow the registry through its add/remove
+    notifications and are populated lazily, ``FETCH_SIZE`` at a time, as the view
+    scrolls, so very large fleets never materialize a row per device up front.
+    """
+
+    FETCH_SIZE = 256
+    # Removals spanning more row ranges than this reset the model instead.
+    MAX_REMOVED_RANGES = 32
+
+    def __init__(self, automation_system, placeholder="Select Device to Remove", parent=None):
+        """Initialize a DeviceListModel instance.
+
+        Args:
+            automation_system: The central automation system whose devices are listed.
+            placeholder (str): The text of the first row.
+            parent (QObject, optional): The parent object of the model.
+        """
+        super().__init__(parent)
+        self.automation_system = automation_system
+        self.placeholder = placeholder
+        self.filter_text = ""
+        self._devices = []
+        self._rows = {}
+        self._loaded = 0
+        self._load()
+        automation_system.add_listener(self)
+
+    def detach(self):
+        """Stop following the automation system."""
+        self.automation_system.remove_listener(self)
+
+    def _matches(self, device):
+        """Check whether a device matches the filter text."""
+        return not self.filter_text or self.filter_text in device_label(device).lower()
+
+    def _load(self):
+        """Rebuild the list of matching devices from the automation system."""
+        self._devices = [device for device in self.automation_system.get_devices() if self._matches(device)]
+        self._rows = {device: row for row, device in enumerate(self._devices)}
+        self._loaded = min(self.FETCH_SIZE, len(self._devices))
+
+    def reload(self):
+        """Rebuild every row from the automation system."""
+        self.beginResetModel()
+        self._load()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Only list devices whose label contains the given text, ignoring case.
+
+        Args:
+            text (str): The text to look for; an empty string lists every device.
+        """
+        text = text.strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self.reload()
+
+    def device(self, row):
+        """Get the device displayed in a row, or None for the placeholder row."""
+        return self._devices[row - 1] if row > 0 else None
+
+    def rowCount(self, parent=QModelIndex()):
+        """Return the number of rows populated so far, including the placeholder."""
+        return 0 if parent.isValid() else 1 + self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        """Check whether matching devices remain to be populated."""
+        return not parent.isValid() and self._loaded < len(self._devices)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Populate the next batch of rows."""
+        if parent.isValid():
+            return
+        count = min(self.FETCH_SIZE, len(self._devices) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), 1 + self._loaded, self._loaded + count)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Return the label of a row, or its device for ``Qt.UserRole``."""
+        if not index.isValid():
+            return None
+        device = self.device(index.row())
+        if role == Qt.DisplayRole:
+            return self.placeholder if device is None else device_label(device)
+        if role == Qt.UserRole:
+            return device
+        return None
+
+    def devices_added(self, devices):
+        """Append rows for matching devices added to the automation system."""
+        devices = [device for device in devices if self._matches(device)]
+        if not devices:
+            return
+        first = len(self._devices)
+        for row, device in enumerate(devices, first):
+            self._rows[device] = row
+        self._devices.extend(devices)
+        if self._loaded == first:
+            count = min(len(devices), self.FETCH_SIZE)
+            self.beginInsertRows(QModelIndex(), 1 + first, first + count)
+            self._loaded += count
+            self.endInsertRows()
+
+    def devices_removed(self, devices):
+        """Drop the rows of devices removed from the automation system."""
+        rows = sorted((self._rows[device] for device in devices if device in self._rows), reverse=True)
+        if not rows:
+            return
+        ranges = _ranges(rows)
+        if len(ranges) > self.MAX_REMOVED_RANGES:
+            removed = set(devices)
+            self.beginResetModel()
+            loaded = self._devices[:self._loaded]
+            self._devices = [device for device in self._devices if device not in removed]
+            self._rows = {device: row for row, device in enumerate(self._devices)}
+            self._loaded = sum(1 for device in loaded if device not in removed)
+            self.endResetModel()
+            return
+        for first, last in ranges:
+            if first < self._loaded:
+                shown = min(last, self._loaded - 1)
+                self.beginRemoveRows(QModelIndex(), 1 + first, 1 + shown)
+                del self._devices[first:last + 1]
+                self._loaded -= shown - first + 1
+                self.endRemoveRows()
+            else:
+                del self._devices[first:last + 1]
+        for device in devices:
+            self._rows.pop(device, None)
+        for row in range(rows[-1], len(self._devices)):
+            self._rows[self._devices[row]] = row
+
+
+def _ranges(rows):
+    """Group rows sorted in descending order into contiguous (first, last) ranges."""
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1][0] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(entry) for entry in ranges]
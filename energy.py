@@ -0,0 +1,499 @@
+import time
+
+import numpy as np
+
+from smart_home.event_bus import BRIGHTNESS, STATUS
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.telemetry import RingBuffer
+from smart_home.thermostat import Thermostat
+
+# Power draw of the devices, in W: an LED light at full brightness, the HVAC unit run by
+# a thermostat that is ON, a camera that is ON, and what every device draws when OFF.
+LIGHT_WATTS = 9.0
+THERMOSTAT_WATTS = 2000.0
+CAMERA_WATTS = 4.5
+STANDBY_WATTS = 0.5
+
+# Aggregation levels of an EnergyMeter, from the finest to the coarsest.
+LEVELS = ("device", "room", "home", "fleet")
+
+# Widths of the default aggregation windows: a minute, an hour and a day.
+DEFAULT_WINDOWS = (60.0, 3600.0, 86400.0)
+
+
+def device_power(device):
+    """Estimate the power drawn by a device from its state.
+
+    Args:
+        device: The device.
+
+    Returns:
+        float: The power, in W.
+    """
+    if not device.status:
+        return STANDBY_WATTS
+    if isinstance(device, SmartLight):
+        return STANDBY_WATTS + LIGHT_WATTS * device.brightness / 100.0
+    if isinstance(device, Thermostat):
+        return THERMOSTAT_WATTS
+    if isinstance(device, SecurityCamera):
+        return CAMERA_WATTS
+    return STANDBY_WATTS
+
+
+class Integrator:
+    """Energy counters of piecewise constant power draws, one per index.
+
+    Each counter keeps the energy used up to its last power change, so the energy at
+    any later time is one multiply-add away and the whole array of counters can be read
+    at once without replaying their history.
+    """
+
+    def __init__(self, capacity, now):
+        """Initialize an Integrator instance.
+
+        Args:
+            capacity (int): The number of counters to preallocate.
+            now (float): The time the counters start at, in seconds.
+        """
+        self.power = np.zeros(capacity, dtype=np.float64)
+        self.energy = np.zeros(capacity, dtype=np.float64)
+        self.since = np.full(capacity, now, dtype=np.float64)
+
+    @property
+    def capacity(self):
+        """int: The number of allocated counters."""
+        return len(self.power)
+
+    def grow(self, capacity, now):
+        """Reallocate the counters so that ``capacity`` of them fit."""
+        old = len(self.power)
+        self.power = np.concatenate((self.power, np.zeros(capacity - old)))
+        self.energy = np.concatenate((self.energy, np.zeros(capacity - old)))
+        self.since = np.concatenate((self.since, np.full(capacity - old, now)))
+
+    def reset(self, index, now):
+        """Clear a counter."""
+        self.power[index] = 0.0
+        self.energy[index] = 0.0
+        self.since[index] = now
+
+    def add(self, index, delta, now):
+        """Change the power of a counter.
+
+        Args:
+            index (int): The counter.
+            delta (float): The change of power, in W.
+            now (float): The time of the change, in seconds.
+        """
+        power = self.power[index]
+        self.energy[index] += power * (now - self.since[index]) / 3600.0
+        self.since[index] = now
+        self.power[index] = power + delta
+
+    def totals(self, now, size=None):
+        """Get the energy of the first ``size`` counters at a time, in Wh."""
+        size = len(self.power) if size is None else size
+        return self.energy[:size] + self.power[:size] * (now - self.since[:size]) / 3600.0
+
+
+class Window:
+    """Tumbling aggregation window of an EnergyMeter.
+
+    The energy of every counter at the start of the current window is kept, so the
+    energy used within the window is a subtraction away; when the window closes, the
+    energy of the closed window is kept per counter and the fleet total is appended to
+    ``history``.
+    """
+
+    def __init__(self, width, start, history=1440):
+        """Initialize a Window instance.
+
+        Args:
+            width (float): The width of the window, in seconds.
+            start (float): The start of the current window, in seconds.
+            history (int): The number of closed windows kept in ``history``.
+        """
+        self.width = width
+        self.start = start
+        self.history = RingBuffer(history)
+        self.starts = {}
+        self.previous = {}
+
+    @property
+    def end(self):
+        """float: The end of the current window, in seconds."""
+        return self.start + self.width
+
+    def track(self, level, capacity):
+        """Make room for ``capacity`` counters of a level."""
+        for arrays in (self.starts, self.previous):
+            old = arrays.get(level)
+            if old is None:
+                arrays[level] = np.zeros(capacity)
+            elif len(old) < capacity:
+                arrays[level] = np.concatenate((old, np.zeros(capacity - len(old))))
+
+    def reset(self, level, index):
+        """Clear the counter of a level reused for another device."""
+        self.starts[level][index] = 0.0
+        self.previous[level][index] = 0.0
+
+
+class EnergyMeter:
+    """Integrates the power drawn by the devices of one or more homes over time.
+
+    Every device draws a constant power between two changes of its status or
+    brightness, as estimated by ``power_model``. On a change, the energy used since the
+    previous one is added to the counters of the device, of its room, of its home and of
+    the fleet, so every rollup is updated in O(1) and reading the energy used so far
+    never rescans history. Energy is counted in Wh, and the energy used by removed
+    devices stays in their room, home and fleet.
+
+    Tumbling windows, such as every minute, hour and day, report the energy used in the
+    current and the previous window at every level; they roll over incrementally by
+    keeping the counters at the start of each window. Counters of devices are NumPy
+    arrays, so ranking 100k devices takes one ``argpartition``.
+
+    Homes are automation systems attached to the meter; a fleet of simulated homes can
+    share one meter running on the simulated clock.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, history=1440, capacity=1024, power_model=device_power,
+                 clock=time.time):
+        """Initialize an EnergyMeter instance.
+
+        Args:
+            windows (iterable): The widths of the aggregation windows, in seconds.
+            history (int): The number of closed windows kept per window width.
+            capacity (int): The number of devices to preallocate.
+            power_model (callable): Gives the power of a device, in W, from its state.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.power_model = power_model
+        self.clock = clock
+        now = clock()
+        self.counters = {
+            "device": Integrator(max(int(capacity), 1), now),
+            "room": Integrator(16, now),
+            "home": Integrator(16, now),
+            "fleet": Integrator(1, now),
+        }
+        self.windows = {width: Window(width, now // width * width, history) for width in windows}
+        self.room = np.full(self.counters["device"].capacity, -1, dtype=np.intp)
+        self.home = np.full(self.counters["device"].capacity, -1, dtype=np.intp)
+        self.devices = [None] * self.counters["device"].capacity
+        self._slots = {}
+        self._free = []
+        self._size = 0
+        self._names = {"room": [], "home": [], "fleet": ["fleet"]}
+        self._indices = {"room": {}, "home": {}, "fleet": {"fleet": 0}}
+        self._systems = {}
+        self._next_roll = min((window.end for window in self.windows.values()), default=float("inf"))
+        for level in LEVELS:
+            self._track(level)
+
+    def __len__(self):
+        """Return the number of metered devices."""
+        return len(self._slots)
+
+    def __contains__(self, device):
+        """Check whether a device is metered."""
+        return device in self._slots
+
+    def attach(self, automation_system, home=None, rooms=()):
+        """Start metering the devices of an automation system.
+
+        Args:
+            automation_system: The central automation system of a home.
+            home (optional): The name of the home; the number of homes attached so far
+                when omitted.
+            rooms (iterable): The names of the groups of the automation system that are
+                rooms; their members are metered in that room.
+
+        Returns:
+            The name of the home.
+        """
+        home = len(self._systems) if home is None else home
+        home_index = self._index("home", home)
+        self._systems[automation_system] = home_index
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.on_events)
+        self.devices_added(automation_system.get_devices(), home_index)
+        for room in rooms:
+            self.set_room(automation_system.group_devices(room), room)
+        return home
+
+    def detach(self, automation_system):
+        """Stop metering the devices of an automation system."""
+        home_index = self._systems.pop(automation_system)
+        automation_system.remove_listener(self)
+        automation_system.event_bus.remove_tap(self.on_events)
+        self.devices_removed([device for device, slot in self._slots.items() if self.home[slot] == home_index])
+
+    def _index(self, level, name):
+        """Get the counter of a room or home, creating it on first use."""
+        indices = self._indices[level]
+        index = indices.get(name)
+        if index is None:
+            index = indices[name] = len(self._names[level])
+            self._names[level].append(name)
+            counters = self.counters[level]
+            if index >= counters.capacity:
+                counters.grow(counters.capacity * 2, self.clock())
+                self._track(level)
+        return index
+
+    def _track(self, level):
+        """Make room in every window for the counters of a level."""
+        for window in self.windows.values():
+            window.track(level, self.counters[level].capacity)
+
+    def _allocate(self):
+        """Get a free device slot, growing the device columns if needed."""
+        if self._free:
+            return self._free.pop()
+        counters = self.counters["device"]
+        if self._size == counters.capacity:
+            capacity = counters.capacity * 2
+            counters.grow(capacity, self.clock())
+            self.room = np.concatenate((self.room, np.full(capacity - len(self.room), -1, dtype=np.intp)))
+            self.home = np.concatenate((self.home, np.full(capacity - len(self.home), -1, dtype=np.intp)))
+            self.devices.extend([None] * (capacity - len(self.devices)))
+            self._track("device")
+        self._size += 1
+        return self._size - 1
+
+    def _change(self, slot, delta, now):
+        """Change the power of a device and of every rollup containing it."""
+        counters = self.counters
+        counters["device"].add(slot, delta, now)
+        room = self.room[slot]
+        if room >= 0:
+            counters["room"].add(room, delta, now)
+        home = self.home[slot]
+        if home >= 0:
+            counters["home"].add(home, delta, now)
+        counters["fleet"].add(0, delta, now)
+
+    def set_room(self, devices, room):
+        """Meter devices in a room, moving the energy they use from now on.
+
+        Args:
+            devices (iterable): The metered devices.
+            room: The name of the room; None takes them out of any room. Rooms of
+                different homes are told apart by pairing the name with the home, and
+                with None for devices metered outside an attached home.
+        """
+        now = self._now()
+        for device in devices:
+            slot = self._slots.get(device)
+            if slot is None:
+                continue
+            power = self.counters["device"].power[slot]
+            old = self.room[slot]
+            if old >= 0:
+                self.counters["room"].add(old, -power, now)
+            if room is None:
+                self.room[slot] = -1
+                continue
+            home = self.home[slot]
+            index = self._index("room", (self._names["home"][home] if home >= 0 else None, room))
+            self.counters["room"].add(index, power, now)
+            self.room[slot] = index
+
+    def set_power(self, devices, watts):
+        """Override the power of devices, such as with a reading from a real meter.
+
+        The power model takes over again on the next change of a device.
+
+        Args:
+            devices (iterable): The metered devices.
+            watts: The power of every device, or a list with one power per device, in W.
+        """
+        now = self._now()
+        devices = list(devices)
+        watts = np.broadcast_to(np.asarray(watts, dtype=np.float64), (len(devices),))
+        power = self.counters["device"].power
+        for device, value in zip(devices, watts.tolist()):
+            slot = self._slots.get(device)
+            if slot is not None:
+                self._change(slot, value - power[slot], now)
+
+    def on_events(self, events):
+        """Update the power of devices whose status or brightness changed."""
+        now = self.clock()
+        if now >= self._next_roll:
+            self._roll(now)
+        slots = self._slots
+        power = self.counters["device"].power
+        for event in events:
+            if event.attribute != STATUS and event.attribute != BRIGHTNESS:
+                continue
+            slot = slots.get(event.device)
+            if slot is None:
+                continue
+            delta = self.power_model(event.device) - power[slot]
+            if delta:
+                self._change(slot, delta, now)
+
+    def devices_added(self, devices, home_index=None):
+        """Start metering devices added to an attached automation system."""
+        now = self._now()
+        for device in devices:
+            if device in self._slots:
+                continue
+            slot = self._allocate()
+            self._slots[device] = slot
+            self.devices[slot] = device
+            self.counters["device"].reset(slot, now)
+            for window in self.windows.values():
+                window.reset("device", slot)
+            self.room[slot] = -1
+            self.home[slot] = self._systems.get(device.observer, -1) if home_index is None else home_index
+            self._change(slot, self.power_model(device), now)
+
+    def devices_removed(self, devices):
+        """Stop metering devices; the energy they used stays in their rollups."""
+        now = self._now()
+        for device in devices:
+            slot = self._slots.pop(device, None)
+            if slot is None:
+                continue
+            self._change(slot, -self.counters["device"].power[slot], now)
+            self.devices[slot] = None
+            self.room[slot] = -1
+            self.home[slot] = -1
+            self._free.append(slot)
+
+    def _now(self):
+        """Get the current time, rolling over the windows that closed."""
+        now = self.clock()
+        if now >= self._next_roll:
+            self._roll(now)
+        return now
+
+    def _size_of(self, level):
+        """Get the number of counters in use at a level."""
+        return self._size if level == "device" else len(self._names[level])
+
+    def _roll(self, now):
+        """Close every window that ended by ``now`` and open the current ones.
+
+        Power is constant since the last change, so the counters at any boundary
+        between the last change and ``now`` are exact. Windows skipped entirely used
+        their constant power for their whole width.
+        """
+        for window in self.windows.values():
+            if now < window.end:
+                continue
+            boundary = window.end
+            for level in LEVELS:
+                size = self._size_of(level)
+                totals = self.counters[level].totals(boundary, size)
+                window.previous[level][:size] = totals - window.starts[level][:size]
+                window.starts[level][:size] = totals
+            window.history.append(window.start, window.previous["fleet"][0])
+            skipped = int((now - boundary) // window.width)
+            if skipped:
+                fleet_power = self.counters["fleet"].power[0]
+                for index in range(min(skipped, window.history.capacity)):
+                    start = boundary + (skipped - min(skipped, window.history.capacity) + index) * window.width
+                    window.history.append(start, fleet_power * window.width / 3600.0)
+                boundary += skipped * window.width
+                for level in LEVELS:
+                    size = self._size_of(level)
+                    counters = self.counters[level]
+                    window.previous[level][:size] = counters.power[:size] * window.width / 3600.0
+                    window.starts[level][:size] = counters.totals(boundary, size)
+            window.start = boundary
+        self._next_roll = min(window.end for window in self.windows.values())
+
+    def energy(self, level="device", window=None, previous=False):
+        """Get the energy used by every counter of a level.
+
+        Args:
+            level (str): One of ``device``, ``room``, ``home`` or ``fleet``.
+            window (float, optional): The width of an aggregation window; the energy used
+                since metering started when omitted.
+            previous (bool): Report the previous, closed window instead of the current one.
+
+        Returns:
+            numpy.ndarray: The energy in Wh, indexed by device slot or by the position of
+            the room or home in ``names(level)``.
+
+        Raises:
+            KeyError: If the level or the window is unknown.
+        """
+        now = self._now()
+        size = self._size_of(level)
+        if window is None:
+            return self.counters[level].totals(now, size)
+        window = self.windows[window]
+        if previous:
+            return window.previous[level][:size].copy()
+        return self.counters[level].totals(now, size) - window.starts[level][:size]
+
+    def names(self, level):
+        """Get the names of the rooms or homes, in the order of their counters."""
+        if level == "device":
+            return list(self.devices[:self._size])
+        return list(self._names[level])
+
+    def total(self, level, name, window=None, previous=False):
+        """Get the energy used by one device, room, home or the fleet.
+
+        Args:
+            level (str): One of ``device``, ``room``, ``home`` or ``fleet``.
+            name: The device, the ``(home, room)`` pair, the home, or ``fleet``.
+            window (float, optional): The width of an aggregation window.
+            previous (bool): Report the previous, closed window instead of the current one.
+
+        Returns:
+            float: The energy, in Wh.
+
+        Raises:
+            KeyError: If the level, the name or the window is unknown.
+        """
+        index = self._slots[name] if level == "device" else self._indices[level][name]
+        now = self._now()
+        counters = self.counters[level]
+        if window is None:
+            return float(counters.totals(now)[index])
+        window = self.windows[window]
+        if previous:
+            return float(window.previous[level][index])
+        energy = counters.energy[index] + counters.power[index] * (now - counters.since[index]) / 3600.0
+        return float(energy - window.starts[level][index])
+
+    def power(self, level="fleet", name="fleet"):
+        """Get the power currently drawn by a device, room, home or the fleet, in W."""
+        index = self._slots[name] if level == "device" else self._indices[level][name]
+        return float(self.counters[level].power[index])
+
+    def top(self, count, level="device", window=None, previous=False):
+        """Get the largest consumers of a level.
+
+        Args:
+            count (int): The number of consumers to return.
+            level (str): One of ``device``, ``room`` or ``home``.
+            window (float, optional): The width of an aggregation window.
+            previous (bool): Rank the previous, closed window instead of the current one.
+
+        Returns:
+            list: ``(device or name, Wh)`` pairs, the largest first.
+        """
+        energy = self.energy(level, window, previous)
+        if level == "device" and self._free:
+            energy[self._free] = -np.inf
+        count = min(count, len(energy))
+        if count <= 0:
+            return []
+        if count < len(energy):
+            indices = np.argpartition(energy, len(energy) - count)[len(energy) - count:]
+        else:
+            indices = np.arange(len(energy))
+        indices = indices[np.argsort(energy[indices])[::-1]]
+        names = self.devices if level == "device" else self._names[level]
+        return [(names[index], float(energy[index])) for index in indices.tolist() if energy[index] > -np.inf]
@@ -0,0 +1,207 @@
+import sys
+import time
+
+# Attributes reported by device change events.
+STATUS = "status"
+BRIGHTNESS = "brightness"
+TEMPERATURE = "temperature"
+SECURITY_STATUS = "security_status"
+
+
+def running_loop():
+    """Get the running asyncio event loop, or None outside of one.
+
+    asyncio is only looked up once something imported it, since no loop can run
+    before, which keeps its import cost out of the startup of headless tools.
+    """
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ChangeEvent:
+    """Class representing a change of one attribute of a device."""
+
+    __slots__ = ("device", "attribute", "value")
+
+    def __init__(self, device, attribute, value):
+        """Initialize a ChangeEvent instance.
+
+        Args:
+            device: The device whose state changed.
+            attribute (str): The attribute that changed (STATUS, BRIGHTNESS, TEMPERATURE
+                or SECURITY_STATUS).
+            value: The new value of the attribute.
+        """
+        self.device = device
+        self.attribute = attribute
+        self.value = value
+
+    def __repr__(self):
+        return f"ChangeEvent({self.device.get_id()!r}, {self.attribute!r}, {self.value!r})"
+
+
+class EventBus:
+    """Class collecting device change events and delivering them to subscribers in batches.
+
+    Events are coalesced per device and attribute until the next flush, so a device
+    changing many times between two flushes is delivered once with its latest value.
+    Flushes happen at most once every ``min_interval`` seconds and are scheduled through
+    any object providing ``call_later(delay, callback)``, such as an asyncio event loop;
+    when no scheduler is set the running asyncio loop is used if there is one,
+    otherwise the owner is expected to call ``flush`` itself.
+
+    Taps, unlike subscribers, see every event synchronously as it is published, for
+    consumers such as recorders that must not miss intermediate values.
+    """
+
+    def __init__(self, min_interval=0.1, scheduler=None, clock=time.monotonic):
+        """Initialize an EventBus instance.
+
+        Args:
+            min_interval (float): The minimum time between two deliveries, in seconds.
+            scheduler (optional): The object used to schedule deliveries.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.min_interval = min_interval
+        self.scheduler = scheduler
+        self.clock = clock
+        self._pending = {}
+        self._subscribers = []
+        self._taps = []
+        self._last_flush = None
+        self._scheduled = False
+
+    def __len__(self):
+        """Return the number of events waiting to be delivered."""
+        return len(self._pending)
+
+    def subscribe(self, callback, attributes=None):
+        """Register a callback receiving batches of change events.
+
+        Args:
+            callback (callable): Called with a list of ChangeEvent instances.
+            attributes (iterable, optional): Only deliver events for these attributes.
+
+        Returns:
+            callable: The callback, so it can later be passed to unsubscribe.
+        """
+        self._subscribers.append((callback, frozenset(attributes) if attributes is not None else None))
+        return callback
+
+    def unsubscribe(self, callback):
+        """Stop delivering events to a callback.
+
+        Args:
+            callback (callable): A callback previously passed to subscribe.
+        """
+        self._subscribers = [entry for entry in self._subscribers if entry[0] != callback]
+
+    def add_tap(self, callback):
+        """Register a callback receiving every event as soon as it is published.
+
+        Args:
+            callback (callable): Called with a list of ChangeEvent instances.
+
+        Returns:
+            callable: The callback, so it can later be passed to remove_tap.
+        """
+        self._taps.append(callback)
+        return callback
+
+    def remove_tap(self, callback):
+        """Stop passing events to a tap.
+
+        Args:
+            callback (callable): A callback previously passed to add_tap.
+        """
+        self._taps.remove(callback)
+
+    def publish(self, device, attribute, value):
+        """Queue a change event, replacing any pending event for the same device attribute.
+
+        The event is passed to the taps right away. It is dropped afterwards while
+        nobody is subscribed.
+
+        Args:
+            device: The device whose state changed.
+            attribute (str): The attribute that changed.
+            value: The new value of the attribute.
+        """
+        if not self._subscribers and not self._taps:
+            return
+        event = ChangeEvent(device, attribute, value)
+        for tap in self._taps:
+            tap([event])
+        if not self._subscribers:
+            return
+        self._pending[(device, attribute)] = event
+        self._schedule()
+
+    def publish_batch(self, changes):
+        """Queue the change events of a batch of changes made together.
+
+        The taps receive the whole batch as one list, and subscribers get it in a
+        single delivery, coalesced with the other pending events.
+
+        Args:
+            changes (list): The (device, attribute, value) tuples of the changes.
+        """
+        if not self._subscribers and not self._taps:
+            return
+        events = [ChangeEvent(device, attribute, value) for device, attribute, value in changes]
+        for tap in self._taps:
+            tap(events)
+        if not self._subscribers:
+            return
+        for event in events:
+            self._pending[(event.device, event.attribute)] = event
+        self._schedule()
+
+    def flush(self, force=False):
+        """Deliver the pending events to the subscribers.
+
+        Args:
+            force (bool): Deliver even if the last delivery was less than ``min_interval`` ago.
+
+        Returns:
+            int: The number of events delivered, 0 if nothing was due.
+        """
+        if not self._pending:
+            return 0
+        now = self.clock()
+        if not force and self._last_flush is not None and now - self._last_flush < self.min_interval:
+            return 0
+        self._last_flush = now
+        events = list(self._pending.values())
+        self._pending.clear()
+        for callback, attributes in list(self._subscribers):
+            if attributes is None:
+                callback(events)
+            else:
+                selected = [event for event in events if event.attribute in attributes]
+                if selected:
+                    callback(selected)
+        return len(events)
+
+    def _schedule(self):
+        """Schedule the next delivery if one is not already pending."""
+        if self._scheduled:
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            return
+        delay = 0.0
+        if self._last_flush is not None:
+            delay = max(0.0, self.min_interval - (self.clock() - self._last_flush))
+        scheduler.call_later(delay, self._run_scheduled_flush)
+        self._scheduled = True
+
+    def _run_scheduled_flush(self):
+        """Deliver pending events from the scheduler."""
+        self._scheduled = False
+        self.flush(force=True)
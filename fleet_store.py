@@ -0,0 +1,463 @@
+import numpy as np
+
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+# Device kinds stored in the kind column; 0 marks a free slot.
+FREE = 0
+LIGHT = 1
+THERMOSTAT = 2
+CAMERA = 3
+
+
+class FleetStore:
+    """Class storing the state of a whole device fleet in columnar NumPy arrays.
+
+    Every device occupies a slot, and its status, brightness, temperature and security
+    status live in one array per attribute at that slot. Fleet-wide updates and
+    aggregate queries then run as masked array operations instead of Python loops over
+    device objects. Devices are exposed on demand as proxy objects that keep the
+    regular getter/setter API of the device classes and read and write the arrays.
+    """
+
+    def __init__(self, capacity=1024):
+        """Initialize a FleetStore instance.
+
+        Args:
+            capacity (int): The number of slots to preallocate.
+        """
+        capacity = max(int(capacity), 1)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.status = np.zeros(capacity, dtype=np.bool_)
+        self.brightness = np.zeros(capacity, dtype=np.float32)
+        self.temperature = np.zeros(capacity, dtype=np.float32)
+        self.security = np.zeros(capacity, dtype=np.int16)
+        self.ids = [None] * capacity
+        self.security_labels = [""]
+        self._security_codes = {"": 0}
+        self._proxies = {}
+        self._free = []
+        self._size = 0
+        self._count = 0
+
+    def __len__(self):
+        """Return the number of devices in the store."""
+        return self._count
+
+    @property
+    def capacity(self):
+        """int: The number of allocated slots."""
+        return len(self.kind)
+
+    def _grow(self, minimum):
+        """Reallocate every column so that at least ``minimum`` slots are available."""
+        capacity = self.capacity
+        while capacity < minimum:
+            capacity *= 2
+        for name in ("kind", "status", "brightness", "temperature", "security"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        self.ids.extend([None] * (capacity - len(self.ids)))
+
+    def _allocate(self, count):
+        """Reserve ``count`` slots, reusing freed slots first.
+
+        Returns:
+            numpy.ndarray: The reserved slot numbers.
+        """
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        fresh = count - len(reused)
+        if self._size + fresh > self.capacity:
+            self._grow(self._size + fresh)
+        slots = np.concatenate([
+            np.array(reused, dtype=np.int64),
+            np.arange(self._size, self._size + fresh, dtype=np.int64),
+        ])
+        self._size += fresh
+        self._count += count
+        return slots
+
+    def security_code(self, security_status):
+        """Get the integer code used to store a security status label.
+
+        Args:
+            security_status (str): The security status label (e.g. SAFE or UNSAFE).
+
+        Returns:
+            int: The code of the label, registered on first use.
+        """
+        code = self._security_codes.get(security_status)
+        if code is None:
+            code = len(self.security_labels)
+            self.security_labels.append(security_status)
+            self._security_codes[security_status] = code
+        return code
+
+    def add_records(self, kind, ids, status=False, brightness=0.0, temperature=0.0, security=0):
+        """Store a batch of devices from column values.
+
+        Args:
+            kind (int or array-like): The kind of the devices (LIGHT, THERMOSTAT or CAMERA).
+            ids (iterable): The unique identifiers of the devices.
+            status (bool or array-like): The status of the devices.
+            brightness (float or array-like): The brightness level of the lights.
+            temperature (float or array-like): The temperature set on the thermostats.
+            security (int or array-like): The security status codes of the cameras, as
+                returned by security_code.
+
+        Returns:
+            numpy.ndarray: The slots of the new devices.
+        """
+        ids = list(ids)
+        slots = self._allocate(len(ids))
+        self.kind[slots] = kind
+        self.status[slots] = status
+        self.brightness[slots] = brightness
+        self.temperature[slots] = temperature
+        self.security[slots] = security
+        if len(slots) and slots[-1] - slots[0] == len(slots) - 1 and np.all(np.diff(slots) == 1):
+            self.ids[slots[0]:slots[-1] + 1] = ids
+        else:
+            for slot, device_id in zip(slots.tolist(), ids):
+                self.ids[slot] = device_id
+        return slots
+
+    def _add(self, kind, ids, status, brightness=0.0, temperature=0.0, security_status=""):
+        """Store a batch of devices of one kind and return their slots."""
+        return self.add_records(kind, ids, status, brightness, temperature, self.security_code(security_status))
+
+    def add_lights(self, ids, status=False, brightness=0.0):
+        """Store smart lights.
+
+        Args:
+            ids (iterable): The unique identifiers of the smart lights.
+            status (bool or array-like): The status of the lights.
+            brightness (float or array-like): The brightness level of the lights (0 to 100).
+
+        Returns:
+            numpy.ndarray: The slots of the new lights.
+        """
+        return self._add(LIGHT, ids, status, brightness=brightness)
+
+    def add_thermostats(self, ids, status=False, temperature=0.0):
+        """Store thermostats.
+
+        Args:
+            ids (iterable): The unique identifiers of the thermostats.
+            status (bool or array-like): The status of the thermostats.
+            temperature (float or array-like): The temperature set on the thermostats.
+
+        Returns:
+            numpy.ndarray: The slots of the new thermostats.
+        """
+        return self._add(THERMOSTAT, ids, status, temperature=temperature)
+
+    def add_cameras(self, ids, status=False, security_status=""):
+        """Store security cameras.
+
+        Args:
+            ids (iterable): The unique identifiers of the security cameras.
+            status (bool or array-like): The status of the cameras.
+            security_status (str): The security status shared by the new cameras.
+
+        Returns:
+            numpy.ndarray: The slots of the new cameras.
+        """
+        return self._add(CAMERA, ids, status, security_status=security_status)
+
+    def release(self, slots):
+        """Free the slots of devices removed from the store.
+
+        Proxies of released slots must no longer be used. A slot listed several times is
+        freed once.
+
+        Args:
+            slots (int or iterable): The slots to free.
+
+        Raises:
+            KeyError: If a slot is already free; no slot is freed then.
+        """
+        slots = np.unique(np.atleast_1d(np.asarray(slots, dtype=np.int64)))
+        free = slots[self.kind[slots] == FREE]
+        if len(free):
+            raise KeyError(f"Slot {free[0]} is already free.")
+        self.kind[slots] = FREE
+        for slot in slots.tolist():
+            self.ids[slot] = None
+            self._proxies.pop(slot, None)
+            self._free.append(slot)
+        self._count -= len(slots)
+
+    def device(self, slot):
+        """Get the proxy object of the device stored at a slot.
+
+        The proxy is created on first access and reused afterwards.
+
+        Args:
+            slot (int): The slot of the device.
+
+        Returns:
+            The proxy device, behaving like SmartLight, Thermostat or SecurityCamera.
+
+        Raises:
+            KeyError: If the slot is free.
+        """
+        slot = int(slot)
+        proxy = self._proxies.get(slot)
+        if proxy is None:
+            proxy_class = PROXY_CLASSES.get(int(self.kind[slot]))
+            if proxy_class is None:
+                raise KeyError(f"Slot {slot} is free.")
+            proxy = proxy_class(self, slot)
+            self._proxies[slot] = proxy
+        return proxy
+
+    def devices(self, slots):
+        """Get the proxy objects of the devices stored at several slots.
+
+        Args:
+            slots (iterable): The slots of the devices.
+
+        Returns:
+            list: The proxy devices.
+        """
+        return [self.device(slot) for slot in slots]
+
+    def mask(self, kind=None, status=None):
+        """Build a boolean mask selecting stored devices.
+
+        Args:
+            kind (int, optional): Only select devices of this kind (LIGHT, THERMOSTAT or CAMERA).
+            status (bool, optional): Only select devices that are ON (True) or OFF (False).
+
+        Returns:
+            numpy.ndarray: A boolean array over the used slots.
+        """
+        kinds = self.kind[:self._size]
+        mask = kinds != FREE if kind is None else kinds == kind
+        if status is not None:
+            mask &= self.status[:self._size] == bool(status)
+        return mask
+
+    def slots(self, mask=None):
+        """Get the slot numbers selected by a mask.
+
+        Args:
+            mask (numpy.ndarray, optional): The selection; every stored device when omitted.
+
+        Returns:
+            numpy.ndarray: The selected slots.
+        """
+        return np.flatnonzero(self.mask() if mask is None else mask)
+
+    def _assign(self, name, attribute, value, mask):
+        """Write a value into a column for the selected slots and report what changed."""
+        column = getattr(self, name)[:self._size]
+        if mask is None:
+            mask = self.mask()
+        changed = mask & (column != value)
+        column[changed] = value
+        if self._proxies:
+            for slot in np.flatnonzero(changed).tolist():
+                proxy = self._proxies.get(slot)
+                if proxy is not None and proxy.observer is not None:
+                    proxy.observer.device_changed(proxy, attribute)
+        return int(np.count_nonzero(changed))
+
+    def set_status(self, status, mask=None):
+        """Turn the selected devices on or off.
+
+        Args:
+            status (bool): The new status (True if ON, False if OFF).
+            mask (numpy.ndarray, optional): The selection; every stored device when omitted.
+
+        Returns:
+            int: The number of devices whose status changed.
+        """
+        return self._assign("status", "status", bool(status), mask)
+
+    def set_brightness(self, brightness, mask=None):
+        """Set the brightness of the selected lights.
+
+        Args:
+            brightness (float): The new brightness level (0 to 100).
+            mask (numpy.ndarray, optional): The selection; every light when omitted.
+
+        Returns:
+            int: The number of lights whose brightness changed.
+        """
+        if mask is None:
+            mask = self.mask(LIGHT)
+        return self._assign("brightness", "brightness", brightness, mask)
+
+    def set_temperature(self, temperature, mask=None):
+        """Set the temperature of the selected thermostats.
+
+        Args:
+            temperature (float): The new temperature.
+            mask (numpy.ndarray, optional): The selection; every thermostat when omitted.
+
+        Returns:
+            int: The number of thermostats whose temperature changed.
+        """
+        if mask is None:
+            mask = self.mask(THERMOSTAT)
+        return self._assign("temperature", "temperature", temperature, mask)
+
+    def set_security_status(self, security_status, mask=None):
+        """Set the security status of the selected cameras.
+
+        Args:
+            security_status (str): The new security status (SAFE or UNSAFE).
+            mask (numpy.ndarray, optional): The selection; every camera when omitted.
+
+        Returns:
+            int: The number of cameras whose security status changed.
+        """
+        if mask is None:
+            mask = self.mask(CAMERA)
+        return self._assign("security", "security_status", self.security_code(security_status), mask)
+
+    def count(self, mask=None):
+        """Count the selected devices.
+
+        Args:
+            mask (numpy.ndarray, optional): The selection; every stored device when omitted.
+
+        Returns:
+            int: The number of selected devices.
+        """
+        return int(np.count_nonzero(self.mask() if mask is None else mask))
+
+    def mean(self, column, mask=None):
+        """Average a column over the selected devices.
+
+        Args:
+            column (str): The column to average ("brightness" or "temperature").
+            mask (numpy.ndarray, optional): The selection; every stored device when omitted.
+
+        Returns:
+            float: The mean value, or 0.0 if nothing is selected.
+        """
+        values = getattr(self, column)[:self._size][self.mask() if mask is None else mask]
+        return float(values.mean()) if len(values) else 0.0
+
+    def security_counts(self, mask=None):
+        """Count the selected cameras per security status.
+
+        Args:
+            mask (numpy.ndarray, optional): The selection; every camera when omitted.
+
+        Returns:
+            dict: The number of cameras keyed by security status label.
+        """
+        if mask is None:
+            mask = self.mask(CAMERA)
+        counts = np.bincount(self.security[:self._size][mask], minlength=len(self.security_labels))
+        return {label: int(counts[code]) for code, label in enumerate(self.security_labels) if counts[code]}
+
+
+def _column_property(name, doc):
+    """Build a property reading and writing one slot of a FleetStore column."""
+    def fget(self):
+        return getattr(self.store, name)[self.slot].item()
+
+    def fset(self, value):
+        getattr(self.store, name)[self.slot] = value
+
+    return property(fget, fset, doc=doc)
+
+
+def _id_property():
+    """Build a property reading and writing the ID of a stored device."""
+    def fget(self):
+        return self.store.ids[self.slot]
+
+    def fset(self, value):
+        self.store.ids[self.slot] = value
+
+    return property(fget, fset, doc="str: The unique identifier of the device.")
+
+
+class StoredSmartLight(SmartLight):
+    """Smart light whose state lives in a FleetStore."""
+
+    __slots__ = ("store", "slot")
+
+    device_class = SmartLight
+    id = _id_property()
+    status = _column_property("status", "bool: True if the light is ON.")
+    brightness = _column_property("brightness", "float: The brightness level (0 to 100).")
+
+    def __init__(self, store, slot):
+        """Initialize a StoredSmartLight proxy.
+
+        Args:
+            store (FleetStore): The store holding the state of the light.
+            slot (int): The slot of the light in the store.
+        """
+        self.store = store
+        self.slot = slot
+        self.observer = None
+
+
+class StoredThermostat(Thermostat):
+    """Thermostat whose state lives in a FleetStore."""
+
+    __slots__ = ("store", "slot")
+
+    device_class = Thermostat
+    id = _id_property()
+    status = _column_property("status", "bool: True if the thermostat is ON.")
+    temperature = _column_property("temperature", "float: The temperature set on the thermostat.")
+
+    def __init__(self, store, slot):
+        """Initialize a StoredThermostat proxy.
+
+        Args:
+            store (FleetStore): The store holding the state of the thermostat.
+            slot (int): The slot of the thermostat in the store.
+        """
+        self.store = store
+        self.slot = slot
+        self.observer = None
+
+
+class StoredSecurityCamera(SecurityCamera):
+    """Security camera whose state lives in a FleetStore."""
+
+    __slots__ = ("store", "slot")
+
+    device_class = SecurityCamera
+    id = _id_property()
+    status = _column_property("status", "bool: True if the camera is ON.")
+
+    def __init__(self, store, slot):
+        """Initialize a StoredSecurityCamera proxy.
+
+        Args:
+            store (FleetStore): The store holding the state of the camera.
+            slot (int): The slot of the camera in the store.
+        """
+        self.store = store
+        self.slot = slot
+        self.observer = None
+
+    @property
+    def security_status(self):
+        """str: The security status of the camera (SAFE or UNSAFE)."""
+        return self.store.security_labels[self.store.security[self.slot]]
+
+    @security_status.setter
+    def security_status(self, security_status):
+        self.store.security[self.slot] = self.store.security_code(security_status)
+
+
+PROXY_CLASSES = {
+    LIGHT: StoredSmartLight,
+    THERMOSTAT: StoredThermostat,
+    CAMERA: StoredSecurityCamera,
+}
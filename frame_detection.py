@@ -0,0 +1,278 @@
+import numpy as np
+
+from smart_home.security_camera import SAFE, UNSAFE
+
+
+class FramePool:
+    """Preallocated pool of grayscale frames sharing one contiguous buffer.
+
+    Frames are handed out by slot and returned after use, so a running camera never
+    allocates a frame. Every slot can be reached both as a NumPy view and as a
+    ``memoryview`` slice of the shared buffer, to receive raw frame bytes from a
+    socket or a file without an intermediate copy.
+    """
+
+    def __init__(self, count, height, width):
+        """Initialize a FramePool instance.
+
+        Args:
+            count (int): The number of frames in the pool.
+            height (int): The height of a frame, in pixels.
+            width (int): The width of a frame, in pixels.
+        """
+        self.height = height
+        self.width = width
+        self.frames = np.zeros((count, height, width), dtype=np.uint8)
+        self.frame_size = height * width
+        self._view = memoryview(self.frames).cast("B")
+        self._free = list(range(count - 1, -1, -1))
+
+    def __len__(self):
+        """Return the number of frames available."""
+        return len(self._free)
+
+    @property
+    def nbytes(self):
+        """int: The memory held by the pool, in bytes."""
+        return self.frames.nbytes
+
+    def acquire(self):
+        """Take a free slot.
+
+        Returns:
+            int: The slot.
+
+        Raises:
+            IndexError: If every frame is in use.
+        """
+        if not self._free:
+            raise IndexError("Every frame of the pool is in use.")
+        return self._free.pop()
+
+    def release(self, slot):
+        """Return a slot to the pool."""
+        self._free.append(slot)
+
+    def frame(self, slot):
+        """Get the frame of a slot as a NumPy view."""
+        return self.frames[slot]
+
+    def buffer(self, slot):
+        """Get the frame of a slot as a writable memoryview of its bytes."""
+        start = slot * self.frame_size
+        return self._view[start:start + self.frame_size]
+
+    def load(self, slot, data):
+        """Copy raw frame bytes, such as a bytes-like object read from a socket, into a slot."""
+        self.buffer(slot)[:] = data
+
+
+class SyntheticScene:
+    """Generates frames of a static scene with sensor noise and an optional moving intruder.
+
+    The background and a small bank of noise patterns are computed once; rendering a
+    frame only copies and combines them into the output buffer, so it allocates nothing.
+    """
+
+    def __init__(self, height, width, seed=None, noise_patterns=8, intruder_size=40, intruder_speed=6):
+        """Initialize a SyntheticScene instance.
+
+        Args:
+            height (int): The height of a frame, in pixels.
+            width (int): The width of a frame, in pixels.
+            seed (int, optional): The seed of the random number generator.
+            noise_patterns (int): The number of precomputed noise patterns cycled through.
+            intruder_size (int): The side of the square intruder, in pixels.
+            intruder_speed (int): The distance the intruder moves per frame, in pixels.
+        """
+        rng = np.random.default_rng(seed)
+        rows = np.linspace(40, 160, height, dtype=np.float32)[:, None]
+        columns = np.linspace(0, 60, width, dtype=np.float32)[None, :]
+        self.background = (rows + columns).astype(np.uint8)
+        self.noise = rng.integers(0, 4, size=(noise_patterns, height, width), dtype=np.uint8)
+        self.intruder_size = min(intruder_size, height, width)
+        self.intruder_speed = intruder_speed
+        self.intruder = False
+        self.index = 0
+        self._x = 0
+        self._y = (height - self.intruder_size) // 2
+
+    def render(self, out):
+        """Draw the next frame into a preallocated array.
+
+        Args:
+            out (numpy.ndarray): The uint8 frame to draw into.
+        """
+        np.bitwise_xor(self.background, self.noise[self.index % len(self.noise)], out=out)
+        self.index += 1
+        if self.intruder:
+            size = self.intruder_size
+            out[self._y:self._y + size, self._x:self._x + size] = 255
+            self._x = (self._x + self.intruder_speed) % (out.shape[1] - size + 1)
+
+
+class MotionDetector:
+    """Detects motion by differencing each frame with the previous one.
+
+    The previous frame, the difference and the motion mask live in buffers allocated
+    once, and every operation writes into them, so processing a frame allocates
+    nothing. With ``step`` above 1 only every ``step``-th pixel of every ``step``-th row
+    is compared, through a strided view rather than a copy.
+    """
+
+    def __init__(self, height, width, threshold=25, min_fraction=0.002, step=1):
+        """Initialize a MotionDetector instance.
+
+        Args:
+            height (int): The height of a frame, in pixels.
+            width (int): The width of a frame, in pixels.
+            threshold (int): The brightness change counting a pixel as moving.
+            min_fraction (float): The fraction of moving pixels counting a frame as motion.
+            step (int): The subsampling step.
+        """
+        shape = (len(range(0, height, step)), len(range(0, width, step)))
+        self.threshold = threshold
+        self.min_fraction = min_fraction
+        self.step = step
+        self.previous = np.zeros(shape, dtype=np.uint8)
+        self._high = np.empty(shape, dtype=np.uint8)
+        self._low = np.empty(shape, dtype=np.uint8)
+        self._mask = np.empty(shape, dtype=bool)
+        self._pixels = shape[0] * shape[1]
+        self._primed = False
+
+    def process(self, frame):
+        """Compare a frame with the previous one and keep it for the next comparison.
+
+        Args:
+            frame (numpy.ndarray): The uint8 frame.
+
+        Returns:
+            float: The fraction of moving pixels; 0 for the first frame.
+        """
+        if self.step > 1:
+            frame = frame[::self.step, ::self.step]
+        if not self._primed:
+            np.copyto(self.previous, frame)
+            self._primed = True
+            return 0.0
+        np.maximum(frame, self.previous, out=self._high)
+        np.minimum(frame, self.previous, out=self._low)
+        np.subtract(self._high, self._low, out=self._high)
+        np.greater(self._high, self.threshold, out=self._mask)
+        np.copyto(self.previous, frame)
+        return np.count_nonzero(self._mask) / self._pixels
+
+    def detect(self, frame):
+        """Check whether a frame shows motion."""
+        return self.process(frame) >= self.min_fraction
+
+
+class FrameDetection:
+    """Frame-based detection mode deciding the security status of a camera.
+
+    The camera turns UNSAFE after ``unsafe_frames`` consecutive frames with motion and
+    back to SAFE after ``safe_frames`` consecutive still frames, which filters out
+    isolated noisy frames. Cameras that are OFF keep their status.
+    """
+
+    def __init__(self, camera, detector, unsafe_frames=3, safe_frames=30):
+        """Initialize a FrameDetection instance.
+
+        Args:
+            camera (SecurityCamera): The camera whose status is decided.
+            detector (MotionDetector): The detector processing the frames of the camera.
+            unsafe_frames (int): The consecutive motion frames turning the camera UNSAFE.
+            safe_frames (int): The consecutive still frames turning the camera SAFE.
+        """
+        self.camera = camera
+        self.detector = detector
+        self.unsafe_frames = unsafe_frames
+        self.safe_frames = safe_frames
+        self.frames = 0
+        self._streak = 0
+        self._motion = False
+
+    def process(self, frame):
+        """Process a frame and update the security status of the camera.
+
+        Returns:
+            str: The security status of the camera.
+        """
+        self.frames += 1
+        motion = self.detector.detect(frame)
+        if motion != self._motion:
+            self._motion = motion
+            self._streak = 0
+        self._streak += 1
+        if self.camera.get_status():
+            if motion and self._streak >= self.unsafe_frames:
+                self.camera.set_security_status(UNSAFE)
+            elif not motion and self._streak >= self.safe_frames:
+                self.camera.set_security_status(SAFE)
+        return self.camera.get_security_status()
+
+
+class SyntheticCameraRig:
+    """Drives the frame-based detection of several cameras from synthetic scenes.
+
+    Each step renders one frame per camera into a slot of a shared FramePool and runs
+    its detection, so any number of steps allocates no frame memory. ``start`` runs
+    the rig at ``fps`` through a scheduler offering ``call_later``.
+    """
+
+    def __init__(self, cameras, height=240, width=320, fps=30.0, seed=0, **detector_options):
+        """Initialize a SyntheticCameraRig instance.
+
+        Args:
+            cameras (list): The SecurityCamera instances to drive.
+            height (int): The height of the frames, in pixels.
+            width (int): The width of the frames, in pixels.
+            fps (float): The frame rate of every camera.
+            seed (int): The base seed of the scenes; camera ``n`` uses ``seed + n``.
+            **detector_options: Options passed to MotionDetector.
+        """
+        self.fps = fps
+        self.pool = FramePool(len(cameras), height, width)
+        self.scenes = [SyntheticScene(height, width, seed + index) for index in range(len(cameras))]
+        self.detections = [FrameDetection(camera, MotionDetector(height, width, **detector_options))
+                           for camera in cameras]
+        self.slots = [self.pool.acquire() for _ in cameras]
+        self._frames = [self.pool.frame(slot) for slot in self.slots]
+        self._scheduler = None
+        self._generation = 0
+
+    def scene(self, camera):
+        """Get the synthetic scene filmed by a camera."""
+        for scene, detection in zip(self.scenes, self.detections):
+            if detection.camera is camera:
+                return scene
+        raise KeyError(f"Camera '{camera.get_id()}' is not part of the rig.")
+
+    def step(self):
+        """Render and process one frame for every camera."""
+        for scene, detection, frame in zip(self.scenes, self.detections, self._frames):
+            scene.render(frame)
+            detection.process(frame)
+
+    def start(self, scheduler):
+        """Run a step every frame period on a scheduler offering ``call_later``.
+
+        Starting again replaces the previous schedule instead of adding a second one.
+        """
+        self._scheduler = scheduler
+        self._generation += 1
+        scheduler.call_later(1.0 / self.fps, self._run_scheduled_step, self._generation)
+
+    def stop(self):
+        """Stop running steps."""
+        self._scheduler = None
+        # Schedulers may not cancel their calls, so the pending step is ignored instead.
+        self._generation += 1
+
+    def _run_scheduled_step(self, generation):
+        """Run a step from the scheduler and schedule the next one."""
+        if generation != self._generation:
+            return
+        self.step()
+        self._scheduler.call_later(1.0 / self.fps, self._run_scheduled_step, generation)
@@ -0,0 +1,83 @@
+from smart_home.event_bus import BRIGHTNESS, SECURITY_STATUS, STATUS, TEMPERATURE
+
+# Setter used by batch commands for every device attribute.
+ATTRIBUTE_SETTERS = {
+    STATUS: "set_status",
+    BRIGHTNESS: "set_brightness",
+    TEMPERATURE: "set_temperature",
+    SECURITY_STATUS: "set_security_status",
+}
+
+
+class Group:
+    """Named set of devices, such as a room, a floor or every camera.
+
+    Members are devices added explicitly, every registered device of ``device_type``
+    and the members of the nested groups, so a floor can be made of its rooms.
+    """
+
+    def __init__(self, name, devices=(), device_type=None, groups=()):
+        """Initialize a Group instance.
+
+        Args:
+            name (str): The unique name of the group.
+            devices (iterable): The devices explicitly in the group.
+            device_type (type, optional): Include every registered device of this type.
+            groups (iterable): The names of nested groups.
+        """
+        self.name = name
+        self.device_type = device_type
+        self.groups = list(groups)
+        self._devices = dict.fromkeys(devices)
+
+    def add(self, device):
+        """Add a device to the group."""
+        self._devices[device] = None
+
+    def discard(self, device):
+        """Remove a device from the group if it is an explicit member."""
+        self._devices.pop(device, None)
+
+    def resolve(self, automation_system, seen=None):
+        """Get the registered members of the group, nested groups included.
+
+        Args:
+            automation_system: The central automation system the group belongs to.
+            seen (set, optional): The names of the groups already being resolved, which
+                breaks cycles between nested groups.
+
+        Returns:
+            dict: The member devices, as keys in a stable order.
+        """
+        seen = set() if seen is None else seen
+        seen.add(self.name)
+        members = {device: None for device in self._devices if device in automation_system}
+        if self.device_type is not None:
+            members.update(dict.fromkeys(automation_system.devices_of_type(self.device_type)))
+        for name in self.groups:
+            if name not in seen:
+                members.update(automation_system.group(name).resolve(automation_system, seen))
+        return members
+
+
+class Scene:
+    """Named set of attribute values applied to groups of devices in one batch."""
+
+    def __init__(self, name, settings):
+        """Initialize a Scene instance.
+
+        Args:
+            name (str): The unique name of the scene.
+            settings (dict): The attribute values to apply to each group, such as
+                ``{"living room": {"status": True, "brightness": 40}}``. Groups are applied
+                in order, so later groups win for devices in several groups.
+
+        Raises:
+            ValueError: If an attribute cannot be set by a batch command.
+        """
+        for attributes in settings.values():
+            unknown = set(attributes) - set(ATTRIBUTE_SETTERS)
+            if unknown:
+                raise ValueError(f"Scene '{name}' sets unknown attributes: {', '.join(sorted(unknown))}.")
+        self.name = name
+        self.settings = {group: dict(attributes) for group, attributes in settings.items()}
@@ -0,0 +1,471 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter as Tally, deque
+from contextlib import contextmanager
+
+# Methods timed by an Instrumentation: (module, class, method, category). Modules that are
+# not imported yet are skipped, so instrumenting never imports Qt.
+DEFAULT_TARGETS = (
+    ("smart_home.device", "Device", "set_status", "device"),
+    ("smart_home.device", "Device", "turn_on", "device"),
+    ("smart_home.device", "Device", "turn_off", "device"),
+    ("smart_home.smart_light", "SmartLight", "turn_on", "device"),
+    ("smart_home.smart_light", "SmartLight", "turn_off", "device"),
+    ("smart_home.smart_light", "SmartLight", "set_brightness", "device"),
+    ("smart_home.thermostat", "Thermostat", "set_temperature", "device"),
+    ("smart_home.security_camera", "SecurityCamera", "set_security_status", "device"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "add_device", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "add_devices", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "remove_device", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "remove_devices", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "get_device", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "set_attributes", "registry"),
+    ("smart_home.central_automation_system", "CentralAutomationSystem", "apply_scene", "registry"),
+    ("smart_home.event_bus", "EventBus", "flush", "events"),
+    ("smart_home.transition_engine", "TransitionEngine", "tick", "events"),
+    ("smart_home.monitoring_dashboard", "SmartHomeGUI", "on_device_changes", "gui"),
+    ("smart_home.monitoring_dashboard", "SmartHomeGUI", "update_device_status", "gui"),
+    ("smart_home.monitoring_dashboard", "SmartHomeGUI", "update_monitoring_text", "gui"),
+    ("smart_home.control_plane", "ControlPlane", "handle", "http"),
+)
+
+# Upper bounds of the buckets exported to Prometheus, in seconds.
+EXPORT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Percentiles reported in the JSON export.
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        """Initialize a Counter instance at 0."""
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Increase the counter."""
+        self.value += amount
+
+
+class Histogram:
+    """Latency histogram with HDR-style log-linear buckets.
+
+    Values below ``2 ** bits`` get a bucket each; above, every power of two is split
+    into ``2 ** (bits - 1)`` buckets, so any recorded value is known within a relative
+    error of ``2 ** (1 - bits)`` (under 1% with the default 8 bits) whatever its
+    magnitude. Recording is a few integer operations and never allocates.
+    """
+
+    __slots__ = ("bits", "counts", "count", "total", "minimum", "maximum", "_half")
+
+    def __init__(self, bits=8, highest=2 ** 44):
+        """Initialize a Histogram instance.
+
+        Args:
+            bits (int): The number of significant bits kept per value.
+            highest (int): The largest value recorded exactly; larger values are clamped
+                to it. The default is about 5 hours in nanoseconds.
+        """
+        self.bits = bits
+        self._half = 1 << (bits - 1)
+        self.counts = [0] * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = 0
+
+    def _index(self, value):
+        """Get the bucket of a value."""
+        shift = value.bit_length() - self.bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _lowest(self, index):
+        """Get the smallest value of a bucket."""
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        return (index - shift * self._half) << shift
+
+    def record(self, value):
+        """Record a non-negative integer value, such as a duration in nanoseconds."""
+        counts = self.counts
+        index = self._index(value)
+        if index >= len(counts):
+            index = len(counts) - 1
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def reset(self):
+        """Forget every recorded value."""
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = 0
+
+    def percentile(self, percent):
+        """Get the value below which a percentage of the recorded values fall.
+
+        Args:
+            percent (float): The percentage, from 0 to 100.
+
+        Returns:
+            int: The lowest value of the bucket holding the percentile, or 0 when
+            nothing was recorded.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * percent / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self._lowest(index), self.minimum), self.maximum)
+        return self.maximum
+
+    def cumulative(self, bounds):
+        """Count the values at or below each bound, for Prometheus buckets."""
+        results = []
+        seen = 0
+        index = 0
+        counts = self.counts
+        for bound in bounds:
+            limit = min(self._index(bound), len(counts) - 1)
+            while index <= limit:
+                seen += counts[index]
+                index += 1
+            results.append(seen)
+        return results
+
+
+class Span:
+    """Timed section of code kept in the trace of an Instrumentation."""
+
+    __slots__ = ("name", "start", "duration", "depth")
+
+    def __init__(self, name, start, duration, depth):
+        """Initialize a Span instance.
+
+        Args:
+            name (str): The name of the operation.
+            start (int): The start time, from ``time.perf_counter_ns``.
+            duration (int): The duration, in nanoseconds.
+            depth (int): The number of spans it is nested in.
+        """
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.depth = depth
+
+    def as_dict(self):
+        """Get the span as a JSON-compatible dictionary."""
+        return {"name": self.name, "start": self.start, "duration": self.duration, "depth": self.depth}
+
+
+class Profiler:
+    """On-demand capture of where time goes, with cProfile or a sampling thread.
+
+    cProfile traces every call of the thread that starts it and gives exact call counts;
+    sampling looks at the stack of that thread every ``interval`` seconds from another
+    thread, costing almost nothing to the profiled code, and reports folded stacks that
+    flame graph tools read.
+    """
+
+    MODES = ("cprofile", "sampling")
+
+    def __init__(self):
+        """Initialize a Profiler instance that is not capturing."""
+        self.mode = None
+        self._profile = None
+        self._thread = None
+        self._stop = None
+        self._samples = None
+
+    @property
+    def running(self):
+        """bool: Whether a capture is in progress."""
+        return self.mode is not None
+
+    def start(self, mode="cprofile", interval=0.005):
+        """Start capturing.
+
+        Args:
+            mode (str): ``cprofile`` or ``sampling``.
+            interval (float): The time between two samples, in seconds.
+
+        Raises:
+            ValueError: If the mode is unknown.
+            RuntimeError: If a capture is already in progress.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'.")
+        if self.running:
+            raise RuntimeError("A profile is already being captured.")
+        self.mode = mode
+        if mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+        self._samples = Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(), interval),
+                                        name="smart-home-sampler", daemon=True)
+        self._thread.start()
+
+    def _sample(self, thread_id, interval):
+        """Collect the stack of a thread until stopped."""
+        samples = self._samples
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                samples[";".join(reversed(stack))] += 1
+
+    def stop(self, limit=30):
+        """Stop capturing and report the results.
+
+        Args:
+            limit (int): The number of functions or stacks reported.
+
+        Returns:
+            str: The cProfile statistics sorted by cumulative time, or the most sampled
+            stacks in folded format (``outer;inner count``).
+
+        Raises:
+            RuntimeError: If no capture is in progress.
+        """
+        if not self.running:
+            raise RuntimeError("No profile is being captured.")
+        mode, self.mode = self.mode, None
+        if mode == "cprofile":
+            self._profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats("cumulative").print_stats(limit)
+            self._profile = None
+            return output.getvalue()
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        samples, self._samples = self._samples, None
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common(limit))
+
+
+class Instrumentation:
+    """Counters, latency histograms and tracing spans around the hot paths of the system.
+
+    ``install`` wraps the methods listed in ``targets`` (device commands, registry
+    operations, event delivery and dashboard refreshes by default) with a timer feeding
+    one histogram per method, and ``uninstall`` puts the original methods back. Nothing
+    is wrapped until then, so a system that is not instrumented runs exactly the code
+    it runs without this module. While ``tracing`` is on, each timed call is also kept
+    as a Span in a bounded trace. Metrics are exported as Prometheus text or JSON.
+    """
+
+    def __init__(self, targets=DEFAULT_TARGETS, trace_capacity=10000, namespace="smart_home"):
+        """Initialize an Instrumentation instance.
+
+        Args:
+            targets (iterable): The (module, class, method, category) of the methods to time.
+            trace_capacity (int): The number of spans kept.
+            namespace (str): The prefix of the exported metric names.
+        """
+        self.targets = tuple(targets)
+        self.namespace = namespace
+        self.tracing = False
+        self.spans = deque(maxlen=trace_capacity)
+        self.profiler = Profiler()
+        self.counters = {}
+        self.histograms = {}
+        self._originals = []
+        self._depth = 0
+
+    def __enter__(self):
+        """Install the instrumentation for the duration of a ``with`` block."""
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Uninstall the instrumentation."""
+        self.uninstall()
+
+    @property
+    def installed(self):
+        """bool: Whether methods are currently wrapped."""
+        return bool(self._originals)
+
+    def counter(self, name, **labels):
+        """Get a counter, creating it on first use.
+
+        Args:
+            name (str): The name of the counter, without the namespace.
+            **labels: The labels telling counters of the same name apart.
+
+        Returns:
+            Counter: The counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = Counter()
+        return counter
+
+    def histogram(self, name, **labels):
+        """Get a latency histogram in nanoseconds, creating it on first use."""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def install(self):
+        """Wrap every target method whose module is imported.
+
+        Returns:
+            int: The number of methods wrapped.
+        """
+        if self.installed:
+            return len(self._originals)
+        for module_name, class_name, method_name, category in self.targets:
+            module = sys.modules.get(module_name)
+            cls = getattr(module, class_name, None)
+            if cls is None or method_name not in vars(cls):
+                continue
+            original = vars(cls)[method_name]
+            operation = f"{class_name}.{method_name}"
+            setattr(cls, method_name, self._wrap(original, operation, category))
+            self._originals.append((cls, method_name, original))
+        return len(self._originals)
+
+    def uninstall(self):
+        """Put the original methods back."""
+        while self._originals:
+            cls, method_name, original = self._originals.pop()
+            setattr(cls, method_name, original)
+
+    def _wrap(self, function, operation, category):
+        """Build a method timing every call of ``function``."""
+        histogram = self.histogram("call_duration", category=category, operation=operation)
+        errors = self.counter("call_errors", category=category, operation=operation)
+        clock = time.perf_counter_ns
+        spans = self.spans
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            self._depth += 1
+            try:
+                return function(*args, **kwargs)
+            except BaseException:
+                errors.value += 1
+                raise
+            finally:
+                self._depth -= 1
+                duration = clock() - start
+                histogram.record(duration)
+                if self.tracing:
+                    spans.append(Span(operation, start, duration, self._depth))
+
+        timed.__wrapped__ = function
+        return timed
+
+    @contextmanager
+    def span(self, name, category="span"):
+        """Time a block of code, such as ``with instrumentation.span("refresh"):``."""
+        histogram = self.histogram("call_duration", category=category, operation=name)
+        start = time.perf_counter_ns()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            duration = time.perf_counter_ns() - start
+            histogram.record(duration)
+            if self.tracing:
+                self.spans.append(Span(name, start, duration, self._depth))
+
+    def reset(self):
+        """Clear every counter, histogram and span."""
+        for counter in self.counters.values():
+            counter.value = 0
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.spans.clear()
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        """Format Prometheus labels."""
+        pairs = [f'{key}="{value}"' for key, value in tuple(labels) + tuple(extra)]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def prometheus(self):
+        """Export every metric in the Prometheus text format.
+
+        Histograms are exported in seconds with the bounds of EXPORT_BUCKETS.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            metric = f"{self.namespace}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (key, labels), counter in sorted(self.counters.items()):
+                if key == name:
+                    lines.append(f"{metric}{self._labels(labels)} {counter.value}")
+        bounds = [round(bound * 1e9) for bound in EXPORT_BUCKETS]
+        for name in sorted({name for name, _ in self.histograms}):
+            metric = f"{self.namespace}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (key, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if key != name or not histogram.count:
+                    continue
+                for bound, count in zip(EXPORT_BUCKETS, histogram.cumulative(bounds)):
+                    lines.append(f"{metric}_bucket{self._labels(labels, [('le', repr(bound))])} {count}")
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {histogram.total / 1e9!r}")
+                lines.append(f"{metric}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, spans=100):
+        """Export every metric as a JSON-compatible dictionary.
+
+        Args:
+            spans (int): The number of most recent spans included.
+
+        Returns:
+            dict: Counters, histogram summaries in nanoseconds and recent spans.
+        """
+        return {
+            "counters": [{"name": name, "labels": dict(labels), "value": counter.value}
+                         for (name, labels), counter in sorted(self.counters.items())],
+            "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count,
+                            "sum": histogram.total, "min": histogram.minimum or 0, "max": histogram.maximum,
+                            **{f"p{percent:g}": histogram.percentile(percent) for percent in PERCENTILES}}
+                           for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+                           if histogram.count],
+            "spans": [span.as_dict() for span in list(self.spans)[-spans:]] if spans else [],
+        }
+
+    def json(self, spans=100):
+        """Export every metric as a JSON document."""
+        return json.dumps(self.snapshot(spans), separators=(",", ":"))
@@ -0,0 +1,402 @@
+import os
+import struct
+import time
+import zlib
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.event_bus import BRIGHTNESS, SECURITY_STATUS, STATUS, TEMPERATURE, running_loop
+from smart_home.fleet_store import CAMERA, LIGHT, THERMOSTAT
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.snapshot import SnapshotError, load_system, save_system
+from smart_home.thermostat import Thermostat
+
+MAGIC = b"SMHJRNL1"
+
+# Every entry is a header (CRC-32 of the payload, payload length, operation) followed
+# by its payload. A torn write at the end of the file fails the length or CRC check
+# and is dropped on replay. A batch entry holds several length-prefixed SET payloads
+# committed together, so a batch command is replayed entirely or not at all.
+ENTRY_HEADER = struct.Struct("<IIB")
+ADD, REMOVE, SET, BATCH = 1, 2, 3, 4
+BATCH_ITEM = struct.Struct("<I")
+
+DEVICE_KEY = struct.Struct("<BH")
+NUMBER = struct.Struct("<d")
+TEXT_LENGTH = struct.Struct("<H")
+
+ATTRIBUTES = (STATUS, BRIGHTNESS, TEMPERATURE, SECURITY_STATUS)
+DEVICE_CLASSES = {LIGHT: SmartLight, THERMOSTAT: Thermostat, CAMERA: SecurityCamera}
+
+
+class JournalError(Exception):
+    """Raised when a journal file is malformed."""
+
+
+def _device_kind(device):
+    """Get the journal kind of a device, or None if its type is not journaled."""
+    for kind, device_class in DEVICE_CLASSES.items():
+        if isinstance(device, device_class):
+            return kind
+    return None
+
+
+def _pack_text(text):
+    """Encode a length-prefixed string."""
+    encoded = str(text).encode()
+    return TEXT_LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_text(payload, offset):
+    """Decode a length-prefixed string, returning it with the offset following it."""
+    (length,) = TEXT_LENGTH.unpack_from(payload, offset)
+    offset += TEXT_LENGTH.size
+    return payload[offset:offset + length].decode(), offset + length
+
+
+def _pack_value(attribute, value):
+    """Encode the value of a device attribute."""
+    if attribute == SECURITY_STATUS:
+        return _pack_text(value)
+    return NUMBER.pack(float(value))
+
+
+def _unpack_value(attribute, payload, offset):
+    """Decode the value of a device attribute, returning it with the offset following it."""
+    if attribute == SECURITY_STATUS:
+        return _unpack_text(payload, offset)
+    (value,) = NUMBER.unpack_from(payload, offset)
+    if attribute == STATUS:
+        value = bool(value)
+    return value, offset + NUMBER.size
+
+
+def _pack_key(kind, device_id):
+    """Encode the kind and ID identifying a device."""
+    encoded = str(device_id).encode()
+    return DEVICE_KEY.pack(kind, len(encoded)) + encoded
+
+
+def _unpack_key(payload):
+    """Decode the kind and ID of a device, returning them with the offset following them."""
+    kind, length = DEVICE_KEY.unpack_from(payload)
+    offset = DEVICE_KEY.size + length
+    return kind, payload[DEVICE_KEY.size:offset].decode(), offset
+
+
+def _entry(operation, payload):
+    """Frame a payload as a journal entry."""
+    return ENTRY_HEADER.pack(zlib.crc32(payload), len(payload), operation) + payload
+
+
+def read_entries(path):
+    """Read the complete entries of a journal file.
+
+    Args:
+        path (str): The path of the journal file.
+
+    Returns:
+        tuple: The list of (operation, payload) entries and the file offset following
+        the last complete one.
+
+    Raises:
+        JournalError: If the file is not a journal.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise JournalError(f"'{path}' is not a journal.")
+    entries = []
+    offset = len(MAGIC)
+    while offset + ENTRY_HEADER.size <= len(data):
+        checksum, length, operation = ENTRY_HEADER.unpack_from(data, offset)
+        start = offset + ENTRY_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        entries.append((operation, payload))
+        offset = start + length
+    return entries, offset
+
+
+def replay(path, automation_system):
+    """Apply the entries of a journal file to an automation system.
+
+    Values are written to the devices directly, so replaying neither starts light fades
+    nor journals anything again. Entries are absolute, so replaying an entry already
+    reflected in the automation system is harmless.
+
+    Args:
+        path (str): The path of the journal file.
+        automation_system (CentralAutomationSystem): The automation system to update.
+
+    Returns:
+        int: The number of entries applied.
+    """
+    entries, _ = read_entries(path)
+    for operation, payload in entries:
+        if operation == BATCH:
+            offset = 0
+            while offset < len(payload):
+                (length,) = BATCH_ITEM.unpack_from(payload, offset)
+                offset += BATCH_ITEM.size
+                _apply(automation_system, SET, payload[offset:offset + length])
+                offset += length
+        else:
+            _apply(automation_system, operation, payload)
+    return len(entries)
+
+
+def _apply(automation_system, operation, payload):
+    """Apply one ADD, REMOVE or SET entry to an automation system."""
+    kind, device_id, offset = _unpack_key(payload)
+    device_class = DEVICE_CLASSES.get(kind)
+    if device_class is None:
+        return
+    device = automation_system.get_device(device_id, device_class)
+    if operation == ADD:
+        if device is None:
+            (status,) = NUMBER.unpack_from(payload, offset)
+            attribute = SECURITY_STATUS if kind == CAMERA else BRIGHTNESS
+            value, _ = _unpack_value(attribute, payload, offset + NUMBER.size)
+            automation_system.add_device(device_class(device_id, bool(status), value))
+    elif operation == REMOVE:
+        if device is not None:
+            automation_system.remove_device(device_id, device_class)
+    elif operation == SET and device is not None:
+        attribute = ATTRIBUTES[payload[offset]]
+        value, _ = _unpack_value(attribute, payload, offset + 1)
+        setattr(device, attribute, value)
+        automation_system.device_changed(device, attribute)
+
+
+def recover(journal_path, snapshot_path=None):
+    """Rebuild an automation system from its last snapshot and its journal.
+
+    Args:
+        journal_path (str): The path of the journal file.
+        snapshot_path (str, optional): The path of the snapshot the journal was compacted into.
+
+    Returns:
+        CentralAutomationSystem: The recovered automation system.
+    """
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        automation_system = load_system(snapshot_path)
+    else:
+        automation_system = CentralAutomationSystem()
+    if os.path.exists(journal_path):
+        replay(journal_path, automation_system)
+    return automation_system
+
+
+class Journal:
+    """Append-only write-ahead journal of the device state changes of an automation system.
+
+    Changes are picked up from the event bus as soon as they are published and from the
+    registry notifications, encoded in memory, and written out by group commit: one
+    write and one fsync every ``sync_interval`` seconds however many changes happened,
+    so dragging a slider does not cost an fsync per tick. Commits are scheduled on the
+    given scheduler or the running asyncio loop, so a crash loses at most the changes of
+    the last interval. Without either, the buffer is committed by the first change
+    recorded once ``sync_interval`` has elapsed since the last commit, and by ``commit``
+    and ``close``; a crash then loses the changes recorded since the last commit, which
+    may be older than an interval if the system went idle.
+    Once the journal grows past ``compact_bytes`` it is compacted into a snapshot of the
+    current state and started afresh. If the state cannot be snapshotted, for example
+    because a device ID is too long for the snapshot format, the error is kept in
+    ``compaction_error`` and compaction is retried after another ``compact_bytes``.
+    """
+
+    def __init__(self, automation_system, path, snapshot_path=None, sync_interval=0.05,
+                 compact_bytes=64 * 1024 * 1024, scheduler=None, clock=time.monotonic):
+        """Open or create a journal and start recording the changes of an automation system.
+
+        A torn entry left at the end of an existing journal by a crash is truncated.
+        The state already held by the automation system is not journaled; use
+        ``recover`` to restore it first, or ``compact`` to record it.
+
+        Args:
+            automation_system (CentralAutomationSystem): The automation system to journal.
+            path (str): The path of the journal file.
+            snapshot_path (str, optional): The path of the snapshot written by compaction.
+            sync_interval (float): The maximum time between two group commits, in seconds.
+            compact_bytes (int, optional): The journal size triggering compaction; None
+                disables automatic compaction.
+            scheduler (optional): An object with a ``call_later(delay, callback)`` method
+                used to schedule commits; the running asyncio loop is used when omitted.
+                Without either, changes are committed as they are recorded, at most once
+                per ``sync_interval``.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.automation_system = automation_system
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+        self.scheduler = scheduler
+        self.clock = clock
+        self.commits = 0
+        self.compaction_error = None
+        self._compact_at = compact_bytes
+        self._buffer = bytearray()
+        self._last_commit = clock()
+        self._scheduled = False
+        if os.path.exists(path):
+            _, end = read_entries(path)
+            self._file = open(path, "r+b")
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, "w+b")
+            self._file.write(MAGIC)
+            self._sync()
+        self.size = self._file.tell()
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.record_events)
+
+    def close(self):
+        """Commit the pending entries and stop journaling."""
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.remove_tap(self.record_events)
+        self.commit()
+        self._file.close()
+
+    @property
+    def pending(self):
+        """int: The number of encoded bytes waiting for the next commit."""
+        return len(self._buffer)
+
+    def _append(self, operation, payload):
+        """Buffer an entry until the next group commit."""
+        self._buffer += _entry(operation, payload)
+        self._schedule()
+
+    @staticmethod
+    def _set_payload(device, attribute, value):
+        """Encode a new value of a device attribute, or return None if it is not journaled."""
+        kind = _device_kind(device)
+        if kind is None or attribute not in ATTRIBUTES:
+            return None
+        payload = _pack_key(kind, device.get_id()) + bytes((ATTRIBUTES.index(attribute),))
+        return payload + _pack_value(attribute, value)
+
+    def record(self, device, attribute, value):
+        """Journal a new value of a device attribute.
+
+        Args:
+            device: The device that changed.
+            attribute (str): The attribute that changed.
+            value: The new value of the attribute.
+        """
+        payload = self._set_payload(device, attribute, value)
+        if payload is not None:
+            self._append(SET, payload)
+
+    def record_events(self, events):
+        """Journal a batch of change events published on the event bus.
+
+        Several events published together, as by a batch command, make a single entry.
+        """
+        if len(events) == 1:
+            event = events[0]
+            self.record(event.device, event.attribute, event.value)
+            return
+        payloads = [self._set_payload(event.device, event.attribute, event.value) for event in events]
+        payload = b"".join(BATCH_ITEM.pack(len(item)) + item for item in payloads if item is not None)
+        if payload:
+            self._append(BATCH, payload)
+
+    def devices_added(self, devices):
+        """Journal devices added to the automation system."""
+        for device in devices:
+            kind = _device_kind(device)
+            if kind is None:
+                continue
+            if kind == CAMERA:
+                value = _pack_text(device.get_security_status())
+            elif kind == LIGHT:
+                value = NUMBER.pack(float(device.get_brightness()))
+            else:
+                value = NUMBER.pack(float(device.get_temperature()))
+            payload = _pack_key(kind, device.get_id()) + NUMBER.pack(float(bool(device.get_status())))
+            self._append(ADD, payload + value)
+
+    def devices_removed(self, devices):
+        """Journal devices removed from the automation system."""
+        for device in devices:
+            kind = _device_kind(device)
+            if kind is not None:
+                self._append(REMOVE, _pack_key(kind, device.get_id()))
+
+    def commit(self):
+        """Write the buffered entries and fsync the journal.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        written = len(self._buffer)
+        self._last_commit = self.clock()
+        if not written:
+            return 0
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._sync()
+        self.size += written
+        self.commits += 1
+        if self.compact_bytes is not None and self.snapshot_path is not None and self.size >= self._compact_at:
+            try:
+                self.compact()
+            except SnapshotError as error:
+                self.compaction_error = error
+                self._compact_at = self.size + self.compact_bytes
+        return written
+
+    def compact(self):
+        """Save the current state as a snapshot and empty the journal.
+
+        The snapshot replaces the previous one atomically before the journal is emptied,
+        so a crash in between only leaves entries that replay to the same state.
+
+        Raises:
+            JournalError: If the journal has no snapshot path.
+            SnapshotError: If the state cannot be snapshotted; the journal is then kept.
+        """
+        if self.snapshot_path is None:
+            raise JournalError("The journal has no snapshot path to compact into.")
+        temporary_path = self.snapshot_path + ".tmp"
+        try:
+            save_system(temporary_path, self.automation_system)
+        except SnapshotError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        os.replace(temporary_path, self.snapshot_path)
+        self._buffer.clear()
+        self._compact_at = self.compact_bytes
+        self._file.seek(len(MAGIC))
+        self._file.truncate()
+        self._sync()
+        self.size = len(MAGIC)
+
+    def _sync(self):
+        """Flush the journal file to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _schedule(self):
+        """Schedule the next group commit if one is not already pending."""
+        if self._scheduled:
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            if self.clock() - self._last_commit >= self.sync_interval:
+                self.commit()
+            return
+        delay = max(0.0, self.sync_interval - (self.clock() - self._last_commit))
+        scheduler.call_later(delay, self._run_scheduled_commit)
+        self._scheduled = True
+
+    def _run_scheduled_commit(self):
+        """Commit the buffered entries from the scheduler."""
+        self._scheduled = False
+        self.commit()
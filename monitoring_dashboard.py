@@ -1,11 +1,56 @@
 from PyQt5.QtGui import QColor, QIcon
 from PyQt5.QtWidgets import QMainWindow, QWidget, QPushButton, QLabel, QSlider, QTextEdit, QVBoxLayout, \
-    QLineEdit, QComboBox, QMessageBox
+    QLineEdit, QComboBox, QMessageBox, QTableView, QHeaderView, QAbstractItemView
 from PyQt5.QtCore import QTimer
+from smart_home.central_automation_system import registered_class
+from smart_home.device_models import DeviceListModel, DeviceTableModel
 from smart_home.smart_light import SmartLight
 from smart_home.thermostat import Thermostat
 from smart_home.security_camera import SecurityCamera
 
+DEVICE_TYPES = {
+    "Smart Light": SmartLight,
+    "Thermostat": Thermostat,
+    "Security Camera": SecurityCamera,
+}
+
+# Applied once per slider; the handle turns gray through the :disabled state, so
+# enabling or disabling a slider never re-parses the stylesheet.
+SLIDER_STYLE = """
+    QSlider {
+        height: 20px;
+    }
+    QSlider::groove:horizontal {
+        background-color: #e0e0e0;
+        border: 1px solid #cccccc;
+        height: 4px;
+        margin: 2px 0;
+    }
+    QSlider::handle:horizontal {
+        background-color: green;
+        border: 1px solid #cccccc;
+        width: 16px;
+        margin: -7px 0;
+        border-radius: 8px;
+    }
+    QSlider::handle:horizontal:disabled {
+        background-color: gray;
+    }
+"""
+
+
+class QtScheduler:
+    """Scheduler adapter running delayed callbacks on the Qt event loop."""
+
+    def call_later(self, delay, callback, *args):
+        """Run a callback after the given delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            callback (callable): The function to call.
+        """
+        QTimer.singleShot(int(delay * 1000), lambda: callback(*args))
+
 
 class SmartHomeGUI(QMainWindow):
     """Class representing the Smart Home Monitoring Dashboard."""
@@ -21,6 +66,11 @@ class SmartHomeGUI(QMainWindow):
         self.thermostat = None
         self.security_camera = None
 
+        # Drive light fades from the Qt event loop instead of blocking it.
+        self.transition_engine = SmartLight.transition_engine
+        if self.transition_engine.scheduler is None:
+            self.transition_engine.scheduler = QtScheduler()
+
         self.setWindowTitle("Smart Home Dashboard")
 
         self.setWindowIcon(QIcon('icon.png'))
@@ -33,8 +83,11 @@ class SmartHomeGUI(QMainWindow):
         self.create_widgets()
         self.update_device_status()
 
-        self.toggle_timer = QTimer()
-        self.toggle_timer.timeout.connect(self.update_brightness_slider)
+        # Refresh the dashboard from batched device change events instead of polling.
+        self.event_bus = automation_system.event_bus
+        if self.event_bus.scheduler is None:
+            self.event_bus.scheduler = QtScheduler()
+        self.event_bus.subscribe(self.on_device_changes)
 
         self.setAutoFillBackground(True)
         p = self.palette()
@@ -72,8 +125,14 @@ class SmartHomeGUI(QMainWindow):
         self.remove_device_label = QLabel("Remove Device:")
         layout.addWidget(self.remove_device_label)
 
+        self.remove_device_filter = QLineEdit()
+        self.remove_device_filter.setPlaceholderText("Type to filter devices")
+        self.remove_device_filter.textChanged.connect(self.filter_remove_device_dropdown)
+        layout.addWidget(self.remove_device_filter)
+
+        self.remove_device_model = DeviceListModel(self.automation_system, parent=self)
         self.remove_device_dropdown = QComboBox()
-        self.remove_device_dropdown.addItem("Select Device to Remove")
+        self.remove_device_dropdown.setModel(self.remove_device_model)
         layout.addWidget(self.remove_device_dropdown)
 
         self.remove_device_button = QPushButton("Remove Device")
@@ -130,7 +189,8 @@ class SmartHomeGUI(QMainWindow):
 
         self.light_brightness_slider = QSlider(orientation=1)
         self.light_brightness_slider.setRange(0, 100)
-        self.light_brightness_slider.valueChanged.connect(self.update_device_status)
+        self.light_brightness_slider.setStyleSheet(SLIDER_STYLE)
+        self.light_brightness_slider.valueChanged.connect(self.set_light_brightness)
         layout.addWidget(self.light_brightness_slider)
 
         self.thermostat_status_label = QLabel("Thermostat Status:")
@@ -163,7 +223,8 @@ class SmartHomeGUI(QMainWindow):
 
         self.thermostat_slider = QSlider(orientation=1)
         self.thermostat_slider.setRange(0, 100)
-        self.thermostat_slider.valueChanged.connect(self.update_device_status)
+        self.thermostat_slider.setStyleSheet(SLIDER_STYLE)
+        self.thermostat_slider.valueChanged.connect(self.set_thermostat_temperature)
         layout.addWidget(self.thermostat_slider)
 
         self.security_status_label = QLabel("Security Camera Status:")
@@ -201,13 +262,42 @@ class SmartHomeGUI(QMainWindow):
         layout.addWidget(self.monitoring_label)
 
         self.monitoring_text = QTextEdit()
+        self.monitoring_status_text = None
         layout.addWidget(self.monitoring_text)
 
+        self.devices_label = QLabel("All Devices:")
+        layout.addWidget(self.devices_label)
+
+        # Built by create_device_table once the window is first shown, so opening the
+        # dashboard does not wait for a model of the whole fleet.
+        self.device_table_model = None
+        self.device_table = None
+
 
         layout.setContentsMargins(20, 20, 20, 20)
 
         self.central_widget.setLayout(layout)
 
+    def create_device_table(self):
+        """Create the table listing every device, below the "All Devices" label."""
+        if self.device_table is not None:
+            return
+        self.device_table_model = DeviceTableModel(self.automation_system, self)
+        self.device_table = QTableView()
+        self.device_table.setModel(self.device_table_model)
+        self.device_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Fixed row heights let the view lay out only the visible rows of large fleets.
+        self.device_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.device_table.verticalHeader().setDefaultSectionSize(24)
+        self.device_table.horizontalHeader().setStretchLastSection(True)
+        self.central_widget.layout().addWidget(self.device_table)
+
+    def showEvent(self, event):
+        """Create the device table right after the window first appears."""
+        super().showEvent(event)
+        if self.device_table is None:
+            QTimer.singleShot(0, self.create_device_table)
+
     def add_new_device(self):
         """Add a new device to the smart home system based on user input."""
         device_type = self.device_type_dropdown.currentText()
@@ -218,11 +308,8 @@ class SmartHomeGUI(QMainWindow):
             return
 
         # Check if the device ID already exists for the given device type
-        existing_ids = [device.get_id() for device in self.automation_system.get_devices() if
-                        isinstance(device, SmartLight) and device_type == "Smart Light"
-                        or isinstance(device, Thermostat) and device_type == "Thermostat"
-                        or isinstance(device, SecurityCamera) and device_type == "Security Camera"]
-        if device_id in existing_ids:
+        device_class = DEVICE_TYPES[device_type]
+        if self.automation_system.has_device(device_id, device_class):
             self.show_message("Error", f"Device with ID '{device_id}' already exists for the selected device type.")
             return
 
@@ -230,7 +317,6 @@ class SmartHomeGUI(QMainWindow):
             self.smart_light = SmartLight(id=device_id, status=False, brightness=0.0)
             try:
                 self.automation_system.add_device(self.smart_light)
-                self.update_remove_device_dropdown()
                 self.show_message("Successful Operation", "Smart Light added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Smart Light: {str(e)}")
@@ -239,7 +325,6 @@ class SmartHomeGUI(QMainWindow):
             self.thermostat = Thermostat(id=device_id, status=False, temperature=0.0)
             try:
                 self.automation_system.add_device(self.thermostat)
-                self.update_remove_device_dropdown()
                 self.show_message("Success", "Thermostat added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Thermostat: {str(e)}")
@@ -249,7 +334,6 @@ class SmartHomeGUI(QMainWindow):
                                                   security_status="Click 'Show Security Status' to get the status")
             try:
                 self.automation_system.add_device(self.security_camera)
-                self.update_remove_device_dropdown()
                 self.show_message("Success", "Security Camera added successfully.")
             except Exception as e:
                 self.show_message("Error", f"Error adding Security Camera: {str(e)}")
@@ -263,90 +347,126 @@ class SmartHomeGUI(QMainWindow):
         msg_box.exec_()
 
     def update_remove_device_dropdown(self):
-        """Update the remove device dropdown with the list of devices in the smart home system."""
-        self.remove_device_dropdown.clear()
-        self.remove_device_dropdown.addItem("Select Device to Remove")
-
-        for device in self.automation_system.get_devices():
-            if isinstance(device, SmartLight):
-                item_text = f"SmartLight#{device.get_id()}"
-            elif isinstance(device, SecurityCamera):
-                item_text = f"SecurityCamera#{device.get_id()}"
-            elif isinstance(device, Thermostat):
-                item_text = f"Thermostat#{device.get_id()}"
-            else:
-                item_text = device.get_id()
-            self.remove_device_dropdown.addItem(item_text, userData=device.get_id())
+        """Rebuild the remove device dropdown from the devices in the smart home system.
+
+        The dropdown follows devices being added and removed on its own; this is only
+        needed to resynchronize it wholesale.
+        """
+        self.remove_device_model.reload()
+        self.remove_device_dropdown.setCurrentIndex(0)
+
+    def filter_remove_device_dropdown(self, text):
+        """Only list the devices whose label contains the given text in the remove device dropdown."""
+        self.remove_device_model.set_filter(text)
+        self.remove_device_dropdown.setCurrentIndex(1 if text and self.remove_device_model.rowCount() > 1 else 0)
 
     def remove_selected_device(self):
         """Remove the selected device from the smart home system."""
         selected_device_index = self.remove_device_dropdown.currentIndex()
         if selected_device_index != 0:
-            device_id = self.remove_device_dropdown.itemData(selected_device_index)
-            if device_id:
+            device = self.remove_device_dropdown.itemData(selected_device_index)
+            if device is not None:
 
-                if self.smart_light and self.smart_light.get_id() == device_id:
+                if self.smart_light is device:
                     self.smart_light = None
-                    self.light_brightness_slider.setValue(0)
-
-                    self.toggle_timer.stop()
-                elif self.thermostat and self.thermostat.get_id() == device_id:
+                elif self.thermostat is device:
                     self.thermostat = None
-                    self.thermostat_slider.setValue(0)
-                elif self.security_camera and self.security_camera.get_id() == device_id:
+                elif self.security_camera is device:
                     self.security_camera = None
 
-                self.automation_system.remove_device(device_id)
-                self.update_remove_device_dropdown()
+                if isinstance(device, SmartLight):
+                    device.transition_engine.cancel(device)
+
+                self.automation_system.remove_device(device.get_id(), registered_class(device))
                 self.update_device_status()
 
     def toggle_smart_light(self):
-        """Toggle the status of the smart light and update the device status."""
+        """Toggle the status of the smart light."""
         if self.smart_light:
             if self.smart_light.status:
                 self.smart_light.turn_off()
-                self.toggle_timer.start(100)
             else:
                 self.smart_light.turn_on()
-                self.toggle_timer.start(100)
 
     def toggle_thermostat(self):
-        """Toggle the status of the thermostat and update the device status."""
+        """Toggle the status of the thermostat."""
         if self.thermostat:
             if self.thermostat.status:
                 self.thermostat.turn_off()
             else:
                 self.thermostat.turn_on()
-        self.update_device_status()
 
     def toggle_security_camera(self):
-        """Toggle the status of the security camera and update the device status."""
+        """Toggle the status of the security camera."""
         if self.security_camera:
             if self.security_camera.status:
                 self.security_camera.turn_off()
             else:
                 self.security_camera.turn_on()
-        self.update_device_status()
 
-    def update_brightness_slider(self):
-        """Update the brightness slider based on the status of the smart light."""
-        current_value = self.light_brightness_slider.value()
-        if self.smart_light.status:
-            if current_value < 100:
-                new_value = current_value + 1
-                self.light_brightness_slider.setValue(new_value)
-            else:
-                self.toggle_timer.stop()
-        else:
-            if current_value > 0:
-                new_value = current_value - 1
-                self.light_brightness_slider.setValue(new_value)
-            else:
-                self.toggle_timer.stop()
-        self.update_device_status()
+    def set_light_brightness(self, brightness):
+        """Apply the brightness slider value to the smart light."""
+        if self.smart_light:
+            self.smart_light.set_brightness(brightness)
+
+    def set_thermostat_temperature(self, temperature):
+        """Apply the thermostat slider value to the thermostat."""
+        if self.thermostat:
+            self.thermostat.set_temperature(temperature)
+
+    def on_device_changes(self, events):
+        """Refresh the parts of the dashboard showing the devices in a batch of change events.
+
+        Args:
+            events (list): The ChangeEvent instances delivered by the event bus.
+        """
+        changed = {event.device for event in events}
+        refresh = False
+        if self.smart_light in changed:
+            self.update_light_controls()
+            refresh = True
+        if self.thermostat in changed:
+            self.update_thermostat_controls()
+            refresh = True
+        if self.security_camera in changed:
+            self.update_security_controls()
+            refresh = True
+        if refresh:
+            self.update_monitoring_text()
 
     def update_device_status(self):
         """Update the status of devices on the monitoring dashboard."""
+        self.update_light_controls()
+        self.update_thermostat_controls()
+        self.update_security_controls()
+        self.update_monitoring_text()
+
+    def update_light_controls(self):
+        """Update the brightness slider from the smart light."""
+        brightness = int(self.smart_light.get_brightness()) if self.smart_light else 0
+        if self.light_brightness_slider.value() != brightness:
+            self.light_brightness_slider.setValue(brightness)
+        enabled = bool(self.smart_light and self.smart_light.status)
+        if self.light_brightness_slider.isEnabled() != enabled:
+            self.light_brightness_slider.setEnabled(enabled)
+
+    def update_thermostat_controls(self):
+        """Update the thermostat slider from the thermostat."""
+        temperature = int(self.thermostat.get_temperature()) if self.thermostat else 0
+        if self.thermostat_slider.value() != temperature:
+            self.thermostat_slider.setValue(temperature)
+        enabled = bool(self.thermostat and self.thermostat.status)
+        if self.thermostat_slider.isEnabled() != enabled:
+            self.thermostat_slider.setEnabled(enabled)
+
+    def update_security_controls(self):
+        """Update the security status button from the security camera."""
+        enabled = bool(self.security_camera and self.security_camera.status)
+        if self.show_security_status_button.isEnabled() != enabled:
+            self.show_security_status_button.setEnabled(enabled)
+
+    def update_monitoring_text(self):
+        """Update the monitoring text from the tracked devices."""
         if self.smart_light:
             light_status = "ON" if self.smart_light.status else "OFF"
             light_brightness = self.light_brightness_slider.value()
@@ -368,114 +488,17 @@ class SmartHomeGUI(QMainWindow):
             security_camera_status = "N/A"
             security_status = "N/A"
 
-        self.show_security_status_button.setEnabled(self.security_camera.status if self.security_camera else False)
-        self.thermostat_slider.setEnabled(self.thermostat.status if self.thermostat else False)
-        self.light_brightness_slider.setEnabled(self.smart_light.status if self.smart_light else False)
-
-        if self.smart_light and self.smart_light.status:
-            # Slider is enabled
-            self.light_brightness_slider.setEnabled(True)
-            self.light_brightness_slider.setStyleSheet(
-                """
-               QSlider {
-                   height: 20px; 
-               }
-               QSlider::groove:horizontal {
-                   background-color: #e0e0e0; 
-                   border: 1px solid #cccccc; 
-                   height: 4px;
-                   margin: 2px 0; 
-               }
-               QSlider::handle:horizontal {
-                   background-color: green; 
-                   border: 1px solid #cccccc; 
-                   width: 16px; 
-                   margin: -7px 0; 
-                   border-radius: 8px; 
-               }
-               """
-            )
-        else:
-            self.light_brightness_slider.setEnabled(False)
-            self.light_brightness_slider.setStyleSheet(
-                """
-                QSlider {
-                    height: 20px; /* Height of the slider track */
-                }
-                QSlider::groove:horizontal {
-                    background-color: #e0e0e0; 
-                    border: 1px solid #cccccc;
-                    height: 4px; 
-                    margin: 2px 0;
-                }
-                QSlider::handle:horizontal {
-                    background-color: gray; 
-                    border: 1px solid #cccccc;
-                    width: 16px; 
-                    margin: -7px 0; 
-                    border-radius: 8px; 
-                }
-                """
-            )
-
-        if self.thermostat and self.thermostat.status:
-
-            self.thermostat_slider.setEnabled(True)
-            self.thermostat_slider.setStyleSheet(
-                """
-               QSlider {
-                   height: 20px; 
-               }
-               QSlider::groove:horizontal {
-                   background-color: #e0e0e0; 
-                   border: 1px solid #cccccc;
-                   height: 4px; 
-                   margin: 2px 0;
-               }
-               QSlider::handle:horizontal {
-                   background-color: green; 
-                   border: 1px solid #cccccc; 
-                   width: 16px; 
-                   margin: -7px 0;
-                   border-radius: 8px;
-               }
-               """
-            )
-        else:
-
-            self.thermostat_slider.setEnabled(False)
-            self.thermostat_slider.setStyleSheet(
-                """
-                QSlider {
-                    height: 20px; 
-                }
-                QSlider::groove:horizontal {
-                    background-color: #e0e0e0; 
-                    border: 1px solid #cccccc; 
-                    height: 4px; 
-                    margin: 2px 0; 
-                }
-                QSlider::handle:horizontal {
-                    background-color: gray; 
-                    border: 1px solid #cccccc; 
-                    width: 16px;
-                    margin: -7px 0; 
-                    border-radius: 8px;
-                }
-                """
-            )
-
         status_text = (
             f"Smart Light: {light_status} (Brightness: {light_brightness})\n"
             f"Thermostat: {thermostat_status} (Thermostat Temperature: {thermostat_temperature}℃)\n"
             f"Security Camera: {security_camera_status}\n"
             f"Security Status: {security_status}"
         )
-        self.monitoring_text.setPlainText(status_text)
+        if status_text != self.monitoring_status_text:
+            self.monitoring_status_text = status_text
+            self.monitoring_text.setPlainText(status_text)
 
     def show_security_status(self):
         """Show the security status of the security camera."""
         if self.security_camera:
             self.security_camera.set_random_security_status()
-            self.update_device_status()
-
@@ -0,0 +1,450 @@
+import itertools
+
+from smart_home.event_bus import BRIGHTNESS, SECURITY_STATUS, STATUS, TEMPERATURE, running_loop
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+# Topic level naming each device type, and the attributes it reports.
+DEVICE_TOPICS = {"light": SmartLight, "thermostat": Thermostat, "camera": SecurityCamera}
+TOPIC_ATTRIBUTES = {
+    "light": (STATUS, BRIGHTNESS),
+    "thermostat": (STATUS, TEMPERATURE),
+    "camera": (STATUS, SECURITY_STATUS),
+}
+SETTERS = {
+    STATUS: "set_status",
+    BRIGHTNESS: "set_brightness",
+    TEMPERATURE: "set_temperature",
+    SECURITY_STATUS: "set_security_status",
+}
+
+
+def encode_value(attribute, value):
+    """Encode an attribute value as an MQTT payload: ON/OFF, a number or text."""
+    if attribute == STATUS:
+        return b"ON" if value else b"OFF"
+    return str(value).encode()
+
+
+def decode_value(attribute, payload):
+    """Decode an MQTT payload produced by encode_value.
+
+    Raises:
+        ValueError: If the payload does not fit the attribute.
+    """
+    if attribute == STATUS:
+        if payload in (b"ON", b"OFF"):
+            return payload == b"ON"
+        raise ValueError(f"Invalid status payload {payload!r}.")
+    if attribute == SECURITY_STATUS:
+        return payload.decode()
+    number = float(payload)
+    return int(number) if number.is_integer() else number
+
+
+def topic_matches(topic_filter, topic):
+    """Check whether a topic matches a filter with ``+`` and ``#`` wildcards."""
+    filter_levels = topic_filter.split("/")
+    levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(levels) or (level != "+" and level != levels[index]):
+            return False
+    return len(filter_levels) == len(levels)
+
+
+class Message:
+    """Message published on a topic."""
+
+    __slots__ = ("topic", "payload", "qos", "retain", "packet_id")
+
+    def __init__(self, topic, payload, qos=0, retain=False, packet_id=None):
+        """Initialize a Message instance.
+
+        Args:
+            topic (str): The topic of the message.
+            payload (bytes): The payload of the message.
+            qos (int): The quality of service, 0 (at most once) or 1 (at least once).
+            retain (bool): Keep the message as the last known value of the topic.
+            packet_id (int, optional): The identifier acknowledging a QoS 1 delivery.
+        """
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.packet_id = packet_id
+
+    def __repr__(self):
+        """Return a readable description of the message."""
+        return f"Message({self.topic!r}, {self.payload!r}, qos={self.qos})"
+
+
+class Subscription:
+    """Callback receiving the batches of messages published on matching topics.
+
+    With QoS 1, delivered messages stay in ``inflight`` until the callback returns;
+    if it raises they are kept and delivered again by ``LocalBroker.redeliver``.
+    """
+
+    __slots__ = ("topic_filter", "callback", "qos", "inflight")
+
+    def __init__(self, topic_filter, callback, qos=0):
+        """Initialize a Subscription instance.
+
+        Args:
+            topic_filter (str): The topics to receive, with ``+`` and ``#`` wildcards.
+            callback (callable): Called with a list of Message instances.
+            qos (int): The maximum quality of service of the deliveries.
+        """
+        self.topic_filter = topic_filter
+        self.callback = callback
+        self.qos = qos
+        self.inflight = {}
+
+
+class TopicTree:
+    """Subscriptions indexed by the levels of their topic filters."""
+
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self):
+        """Initialize an empty TopicTree instance."""
+        self.children = {}
+        self.subscriptions = []
+
+    def add(self, subscription):
+        """Index a subscription."""
+        node = self
+        for level in subscription.topic_filter.split("/"):
+            node = node.children.setdefault(level, TopicTree())
+        node.subscriptions.append(subscription)
+
+    def remove(self, subscription):
+        """Drop a subscription from the index."""
+        node = self
+        for level in subscription.topic_filter.split("/"):
+            node = node.children[level]
+        node.subscriptions.remove(subscription)
+
+    def match(self, levels, index=0, found=None):
+        """Get the subscriptions matching the levels of a topic."""
+        found = [] if found is None else found
+        wildcard = self.children.get("#")
+        if wildcard is not None:
+            found.extend(wildcard.subscriptions)
+        if index == len(levels):
+            found.extend(self.subscriptions)
+            return found
+        for key in (levels[index], "+"):
+            child = self.children.get(key)
+            if child is not None:
+                child.match(levels, index + 1, found)
+        return found
+
+
+class LocalBroker:
+    """In-process stand-in for an MQTT broker.
+
+    Topics are routed through a tree of subscription filters, and the result is cached
+    per topic, so routing a message to its subscribers is a dictionary lookup once a
+    topic has been seen. Messages are delivered in batches: ``publish`` queues them
+    and every subscription later receives all its queued messages in a single call,
+    while ``publish_batch`` delivers a whole batch at once. Retained messages are
+    replayed to new subscriptions.
+
+    A callback raising does not stop the delivery to the other subscriptions: the
+    failure is counted in ``failed`` and kept in ``last_error``, and the QoS 1 messages
+    it did not handle stay in flight until ``redeliver``.
+    """
+
+    def __init__(self, batch_size=1000, scheduler=None):
+        """Initialize a LocalBroker instance.
+
+        Args:
+            batch_size (int): The number of queued messages triggering a delivery.
+            scheduler (optional): An object with a ``call_later(delay, callback)`` method
+                used to deliver queued messages soon after they are published; the running
+                asyncio loop is used when omitted. Without either, messages are delivered
+                when the batch is full or on ``flush``.
+        """
+        self.batch_size = batch_size
+        self.scheduler = scheduler
+        self.retained = {}
+        self.delivered = 0
+        self.failed = 0
+        self.last_error = None
+        self._tree = TopicTree()
+        self._routes = {}
+        self._queue = []
+        self._packet_ids = itertools.count(1)
+        self._scheduled = False
+
+    def subscribe(self, topic_filter, callback, qos=0):
+        """Subscribe a callback to the topics matching a filter.
+
+        Args:
+            topic_filter (str): The topics to receive, with ``+`` and ``#`` wildcards.
+            callback (callable): Called with a list of Message instances.
+            qos (int): The maximum quality of service of the deliveries.
+
+        Returns:
+            Subscription: The subscription, so it can later be passed to unsubscribe.
+        """
+        subscription = Subscription(topic_filter, callback, qos)
+        self._tree.add(subscription)
+        self._routes.clear()
+        retained = [message for topic, message in self.retained.items() if topic_matches(topic_filter, topic)]
+        if retained:
+            self._deliver(subscription, retained)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering messages to a subscription."""
+        self._tree.remove(subscription)
+        self._routes.clear()
+
+    def _route(self, topic):
+        """Get the subscriptions matching a topic."""
+        subscriptions = self._routes.get(topic)
+        if subscriptions is None:
+            subscriptions = self._routes[topic] = self._tree.match(topic.split("/"))
+        return subscriptions
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """Queue a message for delivery.
+
+        Args:
+            topic (str): The topic of the message.
+            payload (bytes): The payload of the message.
+            qos (int): The quality of service, 0 or 1.
+            retain (bool): Keep the message as the last known value of the topic.
+        """
+        self._queue.append(Message(topic, payload, qos, retain))
+        if len(self._queue) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule()
+
+    def publish_batch(self, messages):
+        """Deliver a batch of messages right away, along with any queued ones.
+
+        Args:
+            messages (iterable): Message instances, or (topic, payload) pairs sent with QoS 0.
+        """
+        self._queue.extend(message if isinstance(message, Message) else Message(*message) for message in messages)
+        self.flush()
+
+    def flush(self):
+        """Deliver the queued messages.
+
+        Returns:
+            int: The number of messages delivered.
+        """
+        queue, self._queue = self._queue, []
+        if not queue:
+            return 0
+        batches = {}
+        retained = self.retained
+        for message in queue:
+            if message.retain:
+                retained[message.topic] = message
+            for subscription in self._route(message.topic):
+                batch = batches.get(subscription)
+                if batch is None:
+                    batches[subscription] = [message]
+                else:
+                    batch.append(message)
+        for subscription, batch in batches.items():
+            self._try_deliver(subscription, batch)
+        return len(queue)
+
+    def _try_deliver(self, subscription, messages):
+        """Hand messages to a subscription, recording the failure if its callback raises."""
+        try:
+            self._deliver(subscription, messages)
+        except Exception as error:
+            self.failed += len(messages)
+            self.last_error = error
+
+    def _deliver(self, subscription, messages):
+        """Hand messages to a subscription, tracking QoS 1 deliveries until they are handled."""
+        if subscription.qos:
+            inflight = subscription.inflight
+            delivered = []
+            for message in messages:
+                if message.qos:
+                    message = Message(message.topic, message.payload, 1, message.retain, next(self._packet_ids))
+                    inflight[message.packet_id] = message
+                delivered.append(message)
+            subscription.callback(delivered)
+            for message in delivered:
+                if message.packet_id is not None:
+                    inflight.pop(message.packet_id, None)
+        else:
+            subscription.callback(messages)
+        self.delivered += len(messages)
+
+    def redeliver(self):
+        """Deliver again the QoS 1 messages whose delivery failed.
+
+        Returns:
+            int: The number of messages delivered again.
+        """
+        count = 0
+        for subscriptions in self._tree_subscriptions():
+            for subscription in subscriptions:
+                if subscription.inflight:
+                    messages = list(subscription.inflight.values())
+                    subscription.inflight.clear()
+                    count += len(messages)
+                    self._try_deliver(subscription, messages)
+        return count
+
+    def _tree_subscriptions(self):
+        """Iterate over the subscription lists of every node of the topic tree."""
+        nodes = [self._tree]
+        while nodes:
+            node = nodes.pop()
+            yield node.subscriptions
+            nodes.extend(node.children.values())
+
+    def _schedule(self):
+        """Schedule a delivery of the queued messages if one is not already pending."""
+        if self._scheduled:
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            return
+        scheduler.call_later(0, self._run_scheduled_flush)
+        self._scheduled = True
+
+    def _run_scheduled_flush(self):
+        """Deliver the queued messages from the scheduler."""
+        self._scheduled = False
+        self.flush()
+
+
+class MqttAdapter:
+    """Bridges the devices of an automation system to MQTT-style topics.
+
+    Devices report their state on ``<prefix>/<type>/<id>/<attribute>``, for example
+    ``home/light/kitchen/brightness`` with payload ``40`` or ``home/light/kitchen/status``
+    with payload ``ON``. The adapter subscribes to these topics and applies every batch
+    of reports to the devices in one automation system batch. Changes made locally, by
+    the dashboard or by rules, are published as commands on the same topics with a
+    ``/set`` suffix. Reports are looked up through a per-topic cache, so ingesting a
+    message costs a dictionary lookup, a payload decode and a setter call.
+    """
+
+    def __init__(self, automation_system, broker, prefix="home", qos=0, auto_register=False):
+        """Initialize an MqttAdapter instance and start bridging.
+
+        Args:
+            automation_system (CentralAutomationSystem): The automation system to bridge.
+            broker (LocalBroker): The broker carrying the messages.
+            prefix (str): The first level of every topic.
+            qos (int): The quality of service of the subscription and of the commands.
+            auto_register (bool): Register unknown devices when they first report.
+        """
+        self.automation_system = automation_system
+        self.broker = broker
+        self.prefix = prefix
+        self.qos = qos
+        self.auto_register = auto_register
+        self.ingested = 0
+        self.rejected = 0
+        self._topics = {}
+        self._device_topics = {}
+        # Values applied by the batch being ingested, whose echoes are not published.
+        self._applied = {}
+        self._subscription = broker.subscribe(f"{prefix}/+/+/+", self.ingest, qos)
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.publish_changes)
+
+    def close(self):
+        """Stop bridging."""
+        self.broker.unsubscribe(self._subscription)
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.remove_tap(self.publish_changes)
+
+    def topic(self, device, attribute):
+        """Get the state topic of a device attribute, or None if the device type is not bridged."""
+        for name, device_class in DEVICE_TOPICS.items():
+            if isinstance(device, device_class):
+                return f"{self.prefix}/{name}/{device.get_id()}/{attribute}"
+        return None
+
+    def _resolve(self, topic):
+        """Get the (setter, attribute) applying a state report, or None if it is ignored."""
+        prefix = self.prefix + "/"
+        if not topic.startswith(prefix):
+            return None
+        levels = topic[len(prefix):].split("/", 2)
+        if len(levels) != 3:
+            return None
+        name, device_id, attribute = levels
+        device_class = DEVICE_TOPICS.get(name)
+        if device_class is None or attribute not in TOPIC_ATTRIBUTES[name]:
+            return None
+        device = self.automation_system.get_device(device_id, device_class)
+        if device is None:
+            if not self.auto_register:
+                return None
+            device = device_class(device_id, False, 0 if attribute != SECURITY_STATUS else "SAFE")
+            self.automation_system.add_device(device)
+        return getattr(device, SETTERS[attribute]), attribute
+
+    def ingest(self, messages):
+        """Apply a batch of state reports to the devices.
+
+        Reports for unknown devices or with malformed payloads are counted in
+        ``rejected`` and skipped.
+        """
+        topics = self._topics
+        applied = self._applied
+        try:
+            with self.automation_system.batch():
+                for message in messages:
+                    route = topics.get(message.topic)
+                    if route is None:
+                        route = self._resolve(message.topic)
+                        if route is None:
+                            self.rejected += 1
+                            continue
+                        topics[message.topic] = route
+                        self._device_topics.setdefault(route[0].__self__, []).append(message.topic)
+                    setter, attribute = route
+                    try:
+                        setter(decode_value(attribute, message.payload))
+                    except ValueError:
+                        self.rejected += 1
+                        continue
+                    device = setter.__self__
+                    applied[(device, attribute)] = getattr(device, attribute)
+                    self.ingested += 1
+        finally:
+            applied.clear()
+
+    def publish_changes(self, events):
+        """Publish local changes as commands, skipping the echoes of the reports being ingested.
+
+        Changes that ingested reports cause elsewhere, such as through rules, are published.
+        """
+        applied = self._applied
+        for event in events:
+            if applied and applied.get((event.device, event.attribute), event) == event.value:
+                continue
+            topic = self.topic(event.device, event.attribute)
+            if topic is not None:
+                self.broker.publish(topic + "/set", encode_value(event.attribute, event.value), self.qos)
+
+    def devices_added(self, devices):
+        """Nothing to do; topics of new devices are resolved when they first report."""
+
+    def devices_removed(self, devices):
+        """Forget the cached topics of removed devices."""
+        for device in devices:
+            for topic in self._device_topics.pop(device, ()):
+                self._topics.pop(topic, None)
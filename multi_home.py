@@ -0,0 +1,128 @@
+import argparse
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from smart_home.simulation import Simulation, simulate_homes
+
+# Metrics reported by every shard, packed as little-endian doubles in this order.
+METRIC_FIELDS = ("homes", "events", "actions", "devices", "devices_on", "unsafe_cameras",
+                 "simulated_seconds", "wall_seconds")
+METRICS_RECORD = struct.Struct("<" + "d" * len(METRIC_FIELDS))
+
+
+def pack_metrics(stats):
+    """Pack the statistics of a shard into a fixed-size binary record.
+
+    Args:
+        stats (dict): The statistics returned by simulate_homes.
+
+    Returns:
+        bytes: The packed record.
+    """
+    return METRICS_RECORD.pack(*(float(stats[field]) for field in METRIC_FIELDS))
+
+
+def unpack_metrics(record):
+    """Unpack a binary record produced by pack_metrics.
+
+    Args:
+        record (bytes): The packed record.
+
+    Returns:
+        dict: The statistics of the shard.
+    """
+    return dict(zip(METRIC_FIELDS, METRICS_RECORD.unpack(record)))
+
+
+def run_shard(first_home, homes, days, seed, options):
+    """Simulate one shard of homes in a worker process.
+
+    Args:
+        first_home (int): The identifier of the first home of the shard.
+        homes (int): The number of homes in the shard.
+        days (float): The simulated duration, in days.
+        seed (int): The seed of the random number generator of the shard.
+        options (dict): The options passed to simulate_homes.
+
+    Returns:
+        bytes: The metrics of the shard, packed by pack_metrics.
+    """
+    simulation_options = {key: options.pop(key) for key in ("fade_interval", "fade_step") if key in options}
+    stats = simulate_homes(homes, days, seed, simulation=Simulation(**simulation_options),
+                           first_home=first_home, **options)
+    return pack_metrics(stats)
+
+
+def split_homes(homes, shards):
+    """Split a number of homes into shards of nearly equal size.
+
+    Returns:
+        list: The (first home, number of homes) pair of every non-empty shard.
+    """
+    shards = max(1, min(shards, homes))
+    size, extra = divmod(homes, shards)
+    ranges = []
+    first = 0
+    for index in range(shards):
+        count = size + (1 if index < extra else 0)
+        ranges.append((first, count))
+        first += count
+    return ranges
+
+
+def run_homes(homes=10000, days=1.0, workers=None, shards=None, seed=0, **options):
+    """Simulate many homes sharded across worker processes.
+
+    Every shard runs its own Simulation and sends its metrics back as a fixed-size
+    binary record, so the cost of collecting results does not grow with the number
+    of devices.
+
+    Args:
+        homes (int): The number of homes to simulate.
+        days (float): The simulated duration, in days.
+        workers (int, optional): The number of worker processes; one per CPU by default.
+        shards (int, optional): The number of shards; one per worker by default.
+        seed (int): The base seed; shard ``n`` uses ``seed + n``.
+        **options: Options passed to simulate_homes and Simulation (lights, thermostats,
+            cameras, activity rates, fade_interval, fade_step).
+
+    Returns:
+        dict: The summed metrics of every shard, the list of per-shard metrics under
+        ``shards`` and the overall wall-clock time under ``elapsed_seconds``.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_homes(homes, shards or workers)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_shard, first, count, days, seed + index, dict(options))
+                   for index, (first, count) in enumerate(ranges)]
+        shard_metrics = [unpack_metrics(future.result()) for future in futures]
+    elapsed = time.perf_counter() - started
+    totals = {field: sum(metrics[field] for metrics in shard_metrics) for field in METRIC_FIELDS}
+    totals["simulated_seconds"] = days * 86400.0
+    totals["wall_seconds"] = max(metrics["wall_seconds"] for metrics in shard_metrics)
+    totals["elapsed_seconds"] = elapsed
+    totals["workers"] = workers
+    totals["shards"] = shard_metrics
+    return totals
+
+
+def main(argv=None):
+    """Run a sharded multi-home simulation from the command line."""
+    parser = argparse.ArgumentParser(description="Simulate many smart homes across worker processes.")
+    parser.add_argument("--homes", type=int, default=10000, help="number of homes to simulate")
+    parser.add_argument("--days", type=float, default=1.0, help="simulated duration in days")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--shards", type=int, default=None, help="number of shards")
+    parser.add_argument("--seed", type=int, default=0, help="base random seed")
+    args = parser.parse_args(argv)
+    totals = run_homes(args.homes, args.days, args.workers, args.shards, args.seed)
+    print(f"Simulated {int(totals['homes']):,} homes for {args.days:g} day(s) on {totals['workers']} worker(s): "
+          f"{int(totals['events']):,} events, {int(totals['actions']):,} actions in "
+          f"{totals['elapsed_seconds']:.2f} s ({totals['events'] / totals['elapsed_seconds']:,.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import operator
+from collections import deque
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+class Condition:
+    """Test on one attribute of the devices of an automation system.
+
+    A condition applies to a single device when ``device_id`` is given, to every device
+    of ``device_type`` otherwise, or to every device having the attribute. It holds when
+    at least one device it applies to passes the test; the devices currently passing are
+    kept in ``matches``, so a change only re-tests the device that changed.
+    """
+
+    __slots__ = ("attribute", "operator", "value", "device_id", "device_type", "test", "matches", "rule")
+
+    def __init__(self, attribute, operator, value, device_id=None, device_type=None):
+        """Initialize a Condition instance.
+
+        Args:
+            attribute (str): The device attribute tested, such as ``"temperature"``.
+            operator (str): The comparison, one of ``==``, ``!=``, ``>``, ``>=``, ``<`` and ``<=``.
+            value: The value the attribute is compared to.
+            device_id (str, optional): Only test the device with this ID.
+            device_type (type, optional): Only test devices of this type.
+
+        Raises:
+            ValueError: If the operator is not supported.
+        """
+        if operator not in OPERATORS:
+            raise ValueError(f"Unsupported operator '{operator}'.")
+        self.attribute = attribute
+        self.operator = operator
+        self.value = value
+        self.device_id = device_id
+        self.device_type = device_type
+        self.test = OPERATORS[operator]
+        self.matches = set()
+        self.rule = None
+
+    def __repr__(self):
+        """Return a readable description of the condition."""
+        target = self.device_type.__name__ if self.device_type is not None else "device"
+        if self.device_id is not None:
+            target += f"#{self.device_id}"
+        return f"{target}.{self.attribute} {self.operator} {self.value!r}"
+
+    def applies_to(self, device):
+        """Check whether the condition tests a device."""
+        if self.device_type is not None and not isinstance(device, self.device_type):
+            return False
+        return self.device_id is None or device.get_id() == self.device_id
+
+    def passes(self, value):
+        """Check whether an attribute value passes the test; incomparable values do not."""
+        try:
+            return bool(self.test(value, self.value))
+        except TypeError:
+            return False
+
+
+class Rule:
+    """Automation rule running actions when all of its conditions start to hold."""
+
+    __slots__ = ("name", "conditions", "actions", "satisfied", "active", "fired")
+
+    def __init__(self, name, conditions, actions):
+        """Initialize a Rule instance.
+
+        Args:
+            name (str): The name of the rule.
+            conditions (list): The Condition instances that must all hold.
+            actions (list): Callables run with the automation system when the rule fires.
+        """
+        self.name = name
+        self.conditions = list(conditions)
+        self.actions = list(actions)
+        self.satisfied = 0
+        self.active = False
+        self.fired = 0
+
+    def __repr__(self):
+        """Return a readable description of the rule."""
+        return f"Rule({self.name!r}, if {' and '.join(map(repr, self.conditions))})"
+
+
+class AttributeIndex:
+    """Conditions testing one attribute, indexed by the devices they apply to."""
+
+    __slots__ = ("by_device", "by_type", "any")
+
+    def __init__(self):
+        """Initialize an empty AttributeIndex instance."""
+        self.by_device = {}
+        self.by_type = {}
+        self.any = []
+
+    def __bool__(self):
+        """Check whether any condition is indexed."""
+        return bool(self.by_device or self.by_type or self.any)
+
+    def _bucket(self, condition):
+        """Get the list holding a condition."""
+        if condition.device_id is not None:
+            return self.by_device.setdefault(condition.device_id, [])
+        if condition.device_type is not None:
+            return self.by_type.setdefault(condition.device_type, [])
+        return self.any
+
+    def add(self, condition):
+        """Index a condition."""
+        self._bucket(condition).append(condition)
+
+    def remove(self, condition):
+        """Drop a condition from the index."""
+        self._bucket(condition).remove(condition)
+        if condition.device_id is not None and not self.by_device[condition.device_id]:
+            del self.by_device[condition.device_id]
+        elif condition.device_id is None and condition.device_type is not None \
+                and not self.by_type[condition.device_type]:
+            del self.by_type[condition.device_type]
+
+    def conditions_for(self, device):
+        """Get the conditions applying to a device."""
+        conditions = []
+        for condition in self.by_device.get(device.get_id(), ()):
+            if condition.device_type is None or isinstance(device, condition.device_type):
+                conditions.append(condition)
+        if self.by_type:
+            for device_class in type(device).__mro__:
+                conditions.extend(self.by_type.get(device_class, ()))
+        conditions.extend(self.any)
+        return conditions
+
+
+class RuleEngine:
+    """Runs automation rules against the state changes of an automation system.
+
+    Conditions are compiled into an index keyed by attribute and then by device ID or
+    type, in the manner of the alpha network of a Rete matcher: a change event only
+    re-tests the conditions on the attribute and device that changed, and every rule
+    keeps a count of its conditions that hold, so checking whether a rule fires is O(1)
+    however many rules exist. Changes are taken from an event bus tap, so rules see
+    every transition as it happens.
+
+    Rules are edge-triggered: they fire when their last missing condition starts to
+    hold and must stop holding before they can fire again. Changes made by actions are
+    processed after the current event, which lets rules trigger each other.
+    """
+
+    def __init__(self, automation_system, max_cascade=10000):
+        """Initialize a RuleEngine instance and start following an automation system.
+
+        Args:
+            automation_system: The central automation system whose devices are automated.
+            max_cascade (int): The maximum number of events processed for a single
+                external change, guarding against rules triggering each other forever.
+        """
+        self.automation_system = automation_system
+        self.max_cascade = max_cascade
+        self.rules = {}
+        self._index = {}
+        self._queue = deque()
+        self._processing = False
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.on_events)
+
+    def close(self):
+        """Stop following the automation system."""
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.remove_tap(self.on_events)
+
+    def __len__(self):
+        """Return the number of rules."""
+        return len(self.rules)
+
+    def add_rule(self, name, conditions, actions):
+        """Add a rule.
+
+        The conditions are evaluated against the current device states, but the rule only
+        fires on later changes.
+
+        Args:
+            name (str): The unique name of the rule.
+            conditions (list): The Condition instances that must all hold.
+            actions (list): Callables run with the automation system when the rule fires.
+
+        Returns:
+            Rule: The new rule.
+
+        Raises:
+            ValueError: If a rule with the same name exists or a condition belongs to another rule.
+        """
+        if name in self.rules:
+            raise ValueError(f"A rule named '{name}' already exists.")
+        rule = Rule(name, conditions, actions)
+        for condition in rule.conditions:
+            if condition.rule is not None:
+                raise ValueError(f"Condition {condition!r} already belongs to rule '{condition.rule.name}'.")
+        for condition in rule.conditions:
+            condition.rule = rule
+            self._index.setdefault(condition.attribute, AttributeIndex()).add(condition)
+            for device in self._candidates(condition):
+                if hasattr(device, condition.attribute) and condition.passes(getattr(device, condition.attribute)):
+                    condition.matches.add(device)
+            if condition.matches:
+                rule.satisfied += 1
+        rule.active = rule.satisfied == len(rule.conditions)
+        self.rules[name] = rule
+        return rule
+
+    def remove_rule(self, name):
+        """Remove a rule.
+
+        Args:
+            name (str): The name of the rule.
+
+        Returns:
+            Rule: The removed rule.
+
+        Raises:
+            KeyError: If no rule has that name.
+        """
+        rule = self.rules.pop(name)
+        for condition in rule.conditions:
+            index = self._index[condition.attribute]
+            index.remove(condition)
+            if not index:
+                del self._index[condition.attribute]
+            condition.rule = None
+            condition.matches.clear()
+        return rule
+
+    def _candidates(self, condition):
+        """Get the registered devices a condition may apply to."""
+        if condition.device_id is not None:
+            device = self.automation_system.get_device(condition.device_id, condition.device_type) \
+                or self.automation_system.get_device(condition.device_id)
+            return [device] if device is not None and condition.applies_to(device) else []
+        if condition.device_type is not None:
+            return self.automation_system.devices_of_type(condition.device_type)
+        return self.automation_system.get_devices()
+
+    def _update(self, condition, device, passes, fired):
+        """Record whether a device passes a condition and collect the rule if it fires."""
+        matches = condition.matches
+        held = bool(matches)
+        if passes:
+            matches.add(device)
+        else:
+            matches.discard(device)
+        if held == bool(matches):
+            return
+        rule = condition.rule
+        if held:
+            rule.satisfied -= 1
+            rule.active = False
+        else:
+            rule.satisfied += 1
+            if rule.satisfied == len(rule.conditions) and not rule.active:
+                rule.active = True
+                fired.append(rule)
+
+    def _fire(self, rules):
+        """Run the actions of rules that fired."""
+        for rule in rules:
+            rule.fired += 1
+            for action in rule.actions:
+                action(self.automation_system)
+
+    def on_events(self, events):
+        """Evaluate the rules affected by a batch of change events published on the event bus."""
+        self._queue.extend(events)
+        if self._processing:
+            return
+        self._processing = True
+        processed = 0
+        try:
+            while self._queue:
+                event = self._queue.popleft()
+                processed += 1
+                if processed > self.max_cascade:
+                    self._queue.clear()
+                    raise RuntimeError(f"Rules triggered more than {self.max_cascade} changes in a row.")
+                index = self._index.get(event.attribute)
+                if index is None:
+                    continue
+                fired = []
+                for condition in index.conditions_for(event.device):
+                    self._update(condition, event.device, condition.passes(event.value), fired)
+                self._fire(fired)
+        finally:
+            self._processing = False
+
+    def devices_added(self, devices):
+        """Evaluate the conditions applying to devices added to the automation system."""
+        fired = []
+        for device in devices:
+            for attribute, index in self._index.items():
+                if hasattr(device, attribute):
+                    value = getattr(device, attribute)
+                    for condition in index.conditions_for(device):
+                        self._update(condition, device, condition.passes(value), fired)
+        self._fire(fired)
+
+    def devices_removed(self, devices):
+        """Forget devices removed from the automation system."""
+        fired = []
+        for device in devices:
+            for index in self._index.values():
+                for condition in index.conditions_for(device):
+                    self._update(condition, device, False, fired)
+        self._fire(fired)
+
+
+def set_devices(device_type, method, *args):
+    """Build an action calling a method on every device of a type.
+
+    For example ``set_devices(SmartLight, "set_brightness", 100)``.
+
+    Args:
+        device_type (type): The type of the devices.
+        method (str): The name of the method to call.
+        *args: The arguments passed to the method.
+
+    Returns:
+        callable: The action.
+    """
+    def action(automation_system):
+        for device in automation_system.devices_of_type(device_type):
+            getattr(device, method)(*args)
+    return action
+
+
+def set_device(device_id, method, *args, device_type=None):
+    """Build an action calling a method on one device, if it is registered.
+
+    For example ``set_device("hall", "turn_on", device_type=Thermostat)``.
+
+    Args:
+        device_id (str): The ID of the device.
+        method (str): The name of the method to call.
+        *args: The arguments passed to the method.
+        device_type (type, optional): The type of the device.
+
+    Returns:
+        callable: The action.
+    """
+    def action(automation_system):
+        device = automation_system.get_device(device_id, device_type)
+        if device is not None:
+            getattr(device, method)(*args)
+    return action
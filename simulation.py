@@ -0,0 +1,323 @@
+import argparse
+import contextlib
+import heapq
+import itertools
+import random
+import time
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.event_bus import EventBus
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+from smart_home.transition_engine import TransitionEngine
+
+SECONDS_PER_DAY = 86400.0
+
+
+class ScheduledCall:
+    """Class representing a callback scheduled on a Simulation."""
+
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        """Initialize a ScheduledCall instance.
+
+        Args:
+            when (float): The simulated time at which the callback runs.
+            callback (callable): The function to call.
+            args (tuple): The positional arguments passed to the callback.
+        """
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevent the callback from running."""
+        self.cancelled = True
+
+
+class Simulation:
+    """Discrete-event scheduler driving devices in simulated time.
+
+    Callbacks are kept in a priority queue ordered by simulated time, and running the
+    simulation jumps straight from one event to the next instead of sleeping. The
+    simulation offers the same ``call_later`` interface as an asyncio event loop, so the
+    transition engine and the event buses of the simulated homes schedule their work on
+    it, and no Qt installation is required.
+    """
+
+    def __init__(self, start=0.0, fade_interval=1.0, fade_step=10):
+        """Initialize a Simulation instance.
+
+        Fades keep the 10 second duration of the dashboard but advance in coarser steps
+        by default, which is plenty for simulated homes and ten times cheaper.
+
+        Args:
+            start (float): The simulated time to start at, in seconds.
+            fade_interval (float): The time between two brightness steps of a light fade.
+            fade_step (int): The brightness change applied on every fade step.
+        """
+        self.now = start
+        self.events_processed = 0
+        self.transition_engine = TransitionEngine(interval=fade_interval, step=fade_step, scheduler=self)
+        self._queue = []
+        self._sequence = itertools.count()
+
+    def time(self):
+        """Get the current simulated time, in seconds."""
+        return self.now
+
+    def call_at(self, when, callback, *args):
+        """Schedule a callback at a simulated time.
+
+        Args:
+            when (float): The simulated time at which to run the callback.
+            callback (callable): The function to call.
+
+        Returns:
+            ScheduledCall: A handle that can cancel the callback.
+        """
+        call = ScheduledCall(max(when, self.now), callback, args)
+        heapq.heappush(self._queue, (call.when, next(self._sequence), call))
+        return call
+
+    def call_later(self, delay, callback, *args):
+        """Schedule a callback after a simulated delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            callback (callable): The function to call.
+
+        Returns:
+            ScheduledCall: A handle that can cancel the callback.
+        """
+        return self.call_at(self.now + delay, callback, *args)
+
+    @contextlib.contextmanager
+    def _fading(self):
+        """Make smart lights fade through the transition engine of the simulation."""
+        previous_engine = SmartLight.transition_engine
+        SmartLight.transition_engine = self.transition_engine
+        try:
+            yield
+        finally:
+            SmartLight.transition_engine = previous_engine
+
+    def step(self):
+        """Run the next scheduled callback.
+
+        Smart lights fade through the transition engine of the simulation meanwhile.
+
+        Returns:
+            bool: False if nothing was left to run.
+        """
+        with self._fading():
+            while self._queue:
+                when, _, call = heapq.heappop(self._queue)
+                if call.cancelled:
+                    continue
+                self.now = when
+                self.events_processed += 1
+                call.callback(*call.args)
+                return True
+        return False
+
+    def run_until(self, end):
+        """Run every callback scheduled up to a simulated time.
+
+        Smart lights fade through the transition engine of the simulation while it runs.
+
+        Args:
+            end (float): The simulated time to stop at.
+
+        Returns:
+            int: The number of callbacks run.
+        """
+        processed = self.events_processed
+        with self._fading():
+            queue = self._queue
+            pop = heapq.heappop
+            while queue and queue[0][0] <= end:
+                when, _, call = pop(queue)
+                if call.cancelled:
+                    continue
+                self.now = when
+                self.events_processed += 1
+                call.callback(*call.args)
+        self.now = max(self.now, end)
+        return self.events_processed - processed
+
+    def run_for(self, duration):
+        """Run the simulation for a simulated duration.
+
+        Args:
+            duration (float): The simulated time to run for, in seconds.
+
+        Returns:
+            int: The number of callbacks run.
+        """
+        return self.run_until(self.now + duration)
+
+
+def build_home(simulation, home_id, lights=5, thermostats=1, cameras=2):
+    """Create the automation system of a simulated home.
+
+    Its event bus runs on the simulated clock.
+
+    Args:
+        simulation (Simulation): The simulation the home belongs to.
+        home_id: The identifier of the home, used as a prefix for device IDs.
+        lights (int): The number of smart lights.
+        thermostats (int): The number of thermostats.
+        cameras (int): The number of security cameras.
+
+    Returns:
+        CentralAutomationSystem: The automation system of the home.
+    """
+    automation_system = CentralAutomationSystem()
+    automation_system.event_bus = EventBus(scheduler=simulation, clock=simulation.time)
+    devices = [SmartLight(f"{home_id}-light-{index}", False, 0) for index in range(lights)]
+    devices += [Thermostat(f"{home_id}-thermostat-{index}", False, 20.0) for index in range(thermostats)]
+    devices += [SecurityCamera(f"{home_id}-camera-{index}", True, "SAFE") for index in range(cameras)]
+    automation_system.add_devices(devices)
+    return automation_system
+
+
+class HomeActivity:
+    """Random occupant behaviour driving the devices of one simulated home.
+
+    Lights are toggled and thermostats adjusted at random times following Poisson
+    processes, and cameras that are ON check the security status periodically.
+    """
+
+    def __init__(self, simulation, automation_system, rng=None, light_toggles_per_day=4.0,
+                 thermostat_changes_per_day=3.0, camera_interval=900.0):
+        """Initialize a HomeActivity instance.
+
+        Args:
+            simulation (Simulation): The simulation scheduling the activity.
+            automation_system (CentralAutomationSystem): The home whose devices are driven.
+            rng (random.Random, optional): The random number generator to use.
+            light_toggles_per_day (float): The average number of toggles of each light per day.
+            thermostat_changes_per_day (float): The average number of adjustments of each
+                thermostat per day.
+            camera_interval (float): The time between two security checks of a camera, in seconds.
+        """
+        self.simulation = simulation
+        self.automation_system = automation_system
+        self.rng = rng or random.Random()
+        self.light_rate = light_toggles_per_day / SECONDS_PER_DAY
+        self.thermostat_rate = thermostat_changes_per_day / SECONDS_PER_DAY
+        self.camera_interval = camera_interval
+        self.actions = 0
+
+    def start(self):
+        """Schedule the first action of every device of the home."""
+        for light in self.automation_system.devices_of_type(SmartLight):
+            self._schedule(self.light_rate, self.toggle_light, light)
+        for thermostat in self.automation_system.devices_of_type(Thermostat):
+            self._schedule(self.thermostat_rate, self.adjust_thermostat, thermostat)
+        for camera in self.automation_system.devices_of_type(SecurityCamera):
+            self.simulation.call_later(self.rng.uniform(0, self.camera_interval), self.check_camera, camera)
+
+    def _schedule(self, rate, action, device):
+        """Schedule an action after an exponentially distributed delay."""
+        if rate > 0:
+            self.simulation.call_later(self.rng.expovariate(rate), action, device)
+
+    def _is_registered(self, device):
+        """Check whether a device still belongs to the home."""
+        return device in self.automation_system
+
+    def toggle_light(self, light):
+        """Switch a light on or off and schedule its next toggle."""
+        if not self._is_registered(light):
+            return
+        if light.get_status():
+            light.turn_off()
+        else:
+            light.turn_on()
+        self.actions += 1
+        self._schedule(self.light_rate, self.toggle_light, light)
+
+    def adjust_thermostat(self, thermostat):
+        """Switch a thermostat on or off or change its temperature, then schedule the next change."""
+        if not self._is_registered(thermostat):
+            return
+        if self.rng.random() < 0.5:
+            thermostat.set_status(not thermostat.get_status())
+        else:
+            thermostat.set_temperature(round(self.rng.uniform(18.0, 24.0), 1))
+        self.actions += 1
+        self._schedule(self.thermostat_rate, self.adjust_thermostat, thermostat)
+
+    def check_camera(self, camera):
+        """Refresh the security status of a camera that is ON and schedule the next check."""
+        if not self._is_registered(camera):
+            return
+        if camera.get_status():
+            camera.set_random_security_status()
+            self.actions += 1
+        self.simulation.call_later(self.camera_interval, self.check_camera, camera)
+
+
+def simulate_homes(homes=1000, days=1.0, seed=0, simulation=None, first_home=0, **options):
+    """Simulate the activity of many homes.
+
+    Args:
+        homes (int): The number of homes to simulate.
+        days (float): The simulated duration, in days.
+        seed (int): The seed of the random number generator.
+        simulation (Simulation, optional): The simulation to run the homes in.
+        first_home (int): The identifier of the first home; homes are numbered from it.
+        **options: Device counts passed to build_home (lights, thermostats, cameras) and
+            activity rates passed to HomeActivity.
+
+    Returns:
+        dict: Statistics about the run, including the wall-clock time it took.
+    """
+    home_options = {key: options.pop(key) for key in ("lights", "thermostats", "cameras") if key in options}
+    simulation = simulation or Simulation()
+    rng = random.Random(seed)
+    activities = []
+    for home_id in range(first_home, first_home + homes):
+        automation_system = build_home(simulation, home_id, **home_options)
+        activity = HomeActivity(simulation, automation_system, rng=rng, **options)
+        activity.start()
+        activities.append(activity)
+    started = time.perf_counter()
+    events = simulation.run_for(days * SECONDS_PER_DAY)
+    elapsed = time.perf_counter() - started
+    systems = [activity.automation_system for activity in activities]
+    return {
+        "homes": homes,
+        "simulated_seconds": days * SECONDS_PER_DAY,
+        "events": events,
+        "actions": sum(activity.actions for activity in activities),
+        "devices": sum(len(system) for system in systems),
+        "devices_on": sum(len(system.devices_with_status(True)) for system in systems),
+        "unsafe_cameras": sum(camera.get_security_status() == "UNSAFE"
+                              for system in systems for camera in system.devices_of_type(SecurityCamera)),
+        "wall_seconds": elapsed,
+    }
+
+
+def main(argv=None):
+    """Run a headless simulation from the command line."""
+    parser = argparse.ArgumentParser(description="Simulate smart homes without the dashboard.")
+    parser.add_argument("--homes", type=int, default=1000, help="number of homes to simulate")
+    parser.add_argument("--days", type=float, default=1.0, help="simulated duration in days")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--fade-interval", type=float, default=1.0, help="seconds between fade steps")
+    parser.add_argument("--fade-step", type=int, default=10, help="brightness change per fade step")
+    args = parser.parse_args(argv)
+    simulation = Simulation(fade_interval=args.fade_interval, fade_step=args.fade_step)
+    stats = simulate_homes(args.homes, args.days, args.seed, simulation=simulation)
+    print(f"Simulated {stats['homes']:,} homes for {args.days:g} day(s): {stats['actions']:,} actions, "
+          f"{stats['events']:,} events in {stats['wall_seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
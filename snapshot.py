@@ -0,0 +1,410 @@
+import os
+import struct
+
+import numpy as np
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.fleet_store import CAMERA, LIGHT, THERMOSTAT, FleetStore
+from smart_home.security_camera import SecurityCamera
+from smart_home.smart_light import SmartLight
+from smart_home.telemetry import RECORDED_ATTRIBUTES
+from smart_home.thermostat import Thermostat
+
+# File layout: a fixed header, a fixed-size index of segment entries, then segments of
+# fixed-width records appended one after the other. A segment becomes visible once its
+# index entry is written and the segment count in the header is bumped, so appending
+# never rewrites existing data.
+MAGIC = b"SMHSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+INDEX_ENTRY = struct.Struct("<IIQQQ")
+MAX_SEGMENTS = 1024
+DATA_START = HEADER_SIZE + INDEX_ENTRY.size * MAX_SEGMENTS
+ALIGNMENT = 64
+
+# Segment kinds.
+DEVICES = 1
+SECURITY_LABELS = 2
+TELEMETRY = 3
+
+ID_SIZE = 32
+DEVICE_RECORD = np.dtype([
+    ("kind", "i1"),
+    ("status", "?"),
+    ("security", "<i2"),
+    ("value", "<f4"),
+    ("id", f"S{ID_SIZE}"),
+])
+LABEL_SIZE = 64
+LABEL_RECORD = np.dtype([("label", f"S{LABEL_SIZE}")])
+TELEMETRY_RECORD = np.dtype([
+    ("time", "<f8"),
+    ("value", "<f4"),
+    ("device", "<u4"),
+    ("attribute", "u1"),
+    ("padding", "V7"),
+])
+RECORD_TYPES = {DEVICES: DEVICE_RECORD, SECURITY_LABELS: LABEL_RECORD, TELEMETRY: TELEMETRY_RECORD}
+
+DEVICE_KINDS = ((SmartLight, LIGHT), (Thermostat, THERMOSTAT), (SecurityCamera, CAMERA))
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is malformed or full."""
+
+
+class Segment:
+    """Entry of the segment index of a snapshot file."""
+
+    __slots__ = ("kind", "ref", "offset", "count", "record_size")
+
+    def __init__(self, kind, ref, offset, count, record_size):
+        """Initialize a Segment instance.
+
+        Args:
+            kind (int): The kind of records (DEVICES, SECURITY_LABELS or TELEMETRY).
+            ref (int): The index of a related segment, such as the devices segment that
+                telemetry records refer to.
+            offset (int): The position of the first record in the file.
+            count (int): The number of records.
+            record_size (int): The size of a record, in bytes.
+        """
+        self.kind = kind
+        self.ref = ref
+        self.offset = offset
+        self.count = count
+        self.record_size = record_size
+
+
+class Snapshot:
+    """Binary snapshot file of device state and telemetry, read through memory maps.
+
+    Records have a fixed width, so a segment is mapped as a NumPy structured array
+    without parsing anything, and readers work on the file pages directly.
+    """
+
+    def __init__(self, path, writable=False):
+        """Open an existing snapshot file.
+
+        Args:
+            path (str): The path of the file.
+            writable (bool): Allow appending segments.
+
+        Raises:
+            SnapshotError: If the file is not a snapshot.
+        """
+        self.path = path
+        self.writable = writable
+        with open(path, "rb") as file:
+            header = file.read(DATA_START)
+        if len(header) < DATA_START:
+            raise SnapshotError(f"'{path}' is too short to be a snapshot.")
+        magic, version, count = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"'{path}' is not a version {VERSION} snapshot.")
+        self.segments = [Segment(*INDEX_ENTRY.unpack_from(header, HEADER_SIZE + index * INDEX_ENTRY.size))
+                         for index in range(count)]
+
+    @classmethod
+    def create(cls, path):
+        """Create an empty snapshot file, replacing any existing file.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            Snapshot: The new snapshot, open for appending.
+        """
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0).ljust(DATA_START, b"\0"))
+        return cls(path, writable=True)
+
+    def append(self, kind, records, ref=0):
+        """Append a segment of records.
+
+        Args:
+            kind (int): The kind of records (DEVICES, SECURITY_LABELS or TELEMETRY).
+            records (numpy.ndarray): The records, using the record type of the kind.
+            ref (int): The index of a related segment.
+
+        Returns:
+            int: The index of the new segment.
+
+        Raises:
+            SnapshotError: If the snapshot is read-only or its index is full.
+        """
+        if not self.writable:
+            raise SnapshotError("The snapshot was opened read-only.")
+        if len(self.segments) >= MAX_SEGMENTS:
+            raise SnapshotError(f"The snapshot already holds {MAX_SEGMENTS} segments.")
+        records = np.ascontiguousarray(records, dtype=RECORD_TYPES[kind])
+        with open(self.path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            offset = -(-file.tell() // ALIGNMENT) * ALIGNMENT
+            file.seek(offset)
+            file.write(records.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+            segment = Segment(kind, ref, offset, len(records), records.dtype.itemsize)
+            file.seek(HEADER_SIZE + len(self.segments) * INDEX_ENTRY.size)
+            file.write(INDEX_ENTRY.pack(segment.kind, segment.ref, segment.offset, segment.count,
+                                        segment.record_size))
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, len(self.segments) + 1))
+            file.flush()
+            os.fsync(file.fileno())
+        self.segments.append(segment)
+        return len(self.segments) - 1
+
+    def read(self, index):
+        """Map the records of a segment without copying them.
+
+        Args:
+            index (int): The index of the segment.
+
+        Returns:
+            numpy.ndarray: A read-only structured array backed by the file.
+        """
+        segment = self.segments[index]
+        dtype = RECORD_TYPES[segment.kind]
+        if segment.count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=segment.offset, shape=(segment.count,))
+
+    def latest(self, kind):
+        """Get the index of the most recent segment of a kind, or None if there is none."""
+        for index in range(len(self.segments) - 1, -1, -1):
+            if self.segments[index].kind == kind:
+                return index
+        return None
+
+    def indexes(self, kind):
+        """Get the indexes of every segment of a kind, oldest first."""
+        return [index for index, segment in enumerate(self.segments) if segment.kind == kind]
+
+    def security_labels(self):
+        """Get the security status labels that security codes refer to."""
+        index = self.latest(SECURITY_LABELS)
+        if index is None:
+            return []
+        return [label.decode() for label in self.read(index)["label"]]
+
+    def append_security_labels(self, labels):
+        """Append a labels segment replacing the current security status labels."""
+        records = np.zeros(len(labels), dtype=LABEL_RECORD)
+        records["label"] = [_encode_label(label) for label in labels]
+        return self.append(SECURITY_LABELS, records)
+
+    def devices(self):
+        """Map the records of the most recent devices segment.
+
+        Raises:
+            SnapshotError: If the snapshot holds no devices.
+        """
+        index = self.latest(DEVICES)
+        if index is None:
+            raise SnapshotError("The snapshot holds no devices.")
+        return self.read(index)
+
+    def telemetry(self):
+        """Map every telemetry segment referring to the most recent devices segment.
+
+        Returns:
+            list: One structured array per segment, oldest first.
+        """
+        devices = self.latest(DEVICES)
+        return [self.read(index) for index in self.indexes(TELEMETRY) if self.segments[index].ref == devices]
+
+
+def _encode_id(device_id):
+    """Encode a device ID into its fixed-width form."""
+    encoded = str(device_id).encode()
+    if len(encoded) > ID_SIZE:
+        raise SnapshotError(f"Device ID '{device_id}' is longer than {ID_SIZE} bytes.")
+    return encoded
+
+
+def _encode_label(label):
+    """Encode a security status label into its fixed-width form."""
+    encoded = str(label).encode()
+    if len(encoded) > LABEL_SIZE:
+        raise SnapshotError(f"Security status '{label}' is longer than {LABEL_SIZE} bytes.")
+    return encoded
+
+
+def _device_kind(device):
+    """Get the fleet store kind of a device."""
+    for device_class, kind in DEVICE_KINDS:
+        if isinstance(device, device_class):
+            return kind
+    raise SnapshotError(f"Cannot store devices of type {type(device).__name__}.")
+
+
+def save_fleet(path, store):
+    """Write the devices of a FleetStore to a new snapshot file.
+
+    Args:
+        path (str): The path of the file.
+        store (FleetStore): The store to save.
+
+    Returns:
+        Snapshot: The new snapshot, open for appending.
+    """
+    slots = store.slots()
+    records = np.zeros(len(slots), dtype=DEVICE_RECORD)
+    kinds = store.kind[slots]
+    records["kind"] = kinds
+    records["status"] = store.status[slots]
+    records["security"] = store.security[slots]
+    records["value"] = np.where(kinds == THERMOSTAT, store.temperature[slots], store.brightness[slots])
+    records["id"] = [_encode_id(store.ids[slot]) for slot in slots.tolist()]
+    for label in store.security_labels:
+        _encode_label(label)
+    snapshot = Snapshot.create(path)
+    snapshot.append_security_labels(store.security_labels)
+    snapshot.append(DEVICES, records)
+    return snapshot
+
+
+def load_fleet(path, capacity=None):
+    """Restore a FleetStore from a snapshot file.
+
+    The columns are copied straight from the mapped records.
+
+    Args:
+        path (str): The path of the file.
+        capacity (int, optional): The number of slots to preallocate.
+
+    Returns:
+        FleetStore: The restored store.
+    """
+    snapshot = Snapshot(path)
+    records = snapshot.devices()
+    store = FleetStore(capacity=max(capacity or 0, len(records)))
+    codes = np.array([store.security_code(label) for label in snapshot.security_labels()] or [0], dtype=np.int16)
+    kinds = records["kind"]
+    values = records["value"]
+    store.add_records(
+        kinds,
+        np.char.decode(records["id"]).tolist(),
+        records["status"],
+        brightness=np.where(kinds == LIGHT, values, 0.0),
+        temperature=np.where(kinds == THERMOSTAT, values, 0.0),
+        security=codes[records["security"]],
+    )
+    return store
+
+
+def save_system(path, automation_system, recorder=None):
+    """Write the devices of an automation system, and optionally their telemetry, to a new snapshot.
+
+    Args:
+        path (str): The path of the file.
+        automation_system (CentralAutomationSystem): The automation system to save.
+        recorder (TelemetryRecorder, optional): The recorder whose raw samples are saved.
+
+    Returns:
+        Snapshot: The new snapshot, open for appending.
+    """
+    devices = automation_system.get_devices()
+    labels = []
+    codes = {}
+    records = np.zeros(len(devices), dtype=DEVICE_RECORD)
+    for row, device in enumerate(devices):
+        record = records[row]
+        record["kind"] = kind = _device_kind(device)
+        record["status"] = bool(device.get_status())
+        record["id"] = _encode_id(device.get_id())
+        if kind == LIGHT:
+            record["value"] = device.get_brightness()
+        elif kind == THERMOSTAT:
+            record["value"] = device.get_temperature()
+        else:
+            label = device.get_security_status()
+            if label not in codes:
+                _encode_label(label)
+                codes[label] = len(labels)
+                labels.append(label)
+            record["security"] = codes[label]
+    snapshot = Snapshot.create(path)
+    snapshot.append_security_labels(labels)
+    snapshot.append(DEVICES, records)
+    if recorder is not None:
+        append_telemetry(snapshot, recorder)
+    return snapshot
+
+
+def append_telemetry(snapshot, recorder, since=None):
+    """Append the raw samples of a TelemetryRecorder as a new telemetry segment.
+
+    Samples are attached to the most recent devices segment; series of devices missing
+    from it are skipped.
+
+    Args:
+        snapshot (Snapshot): A snapshot opened for appending.
+        recorder (TelemetryRecorder): The recorder to save.
+        since (float, optional): Only save samples taken at or after this time.
+
+    Returns:
+        int: The index of the new segment.
+    """
+    devices_index = snapshot.latest(DEVICES)
+    if devices_index is None:
+        raise SnapshotError("The snapshot holds no devices.")
+    devices = snapshot.read(devices_index)
+    rows = {(int(kind), device_id.decode()): row
+            for row, (kind, device_id) in enumerate(zip(devices["kind"].tolist(), devices["id"].tolist()))}
+    labels = snapshot.security_labels()
+    label_codes = {label: code for code, label in enumerate(labels)}
+    chunks = []
+    for device, attribute, series in recorder.iter_series():
+        row = rows.get((_device_kind(device), str(device.get_id())))
+        if row is None:
+            continue
+        times, values = series.raw.samples(since)
+        if attribute == "security_status":
+            mapped = []
+            for code in values.astype(np.int64).tolist():
+                label = recorder.security_labels[code]
+                if label not in label_codes:
+                    label_codes[label] = len(labels)
+                    labels.append(label)
+                mapped.append(label_codes[label])
+            values = np.array(mapped, dtype=np.float32)
+        chunk = np.zeros(len(times), dtype=TELEMETRY_RECORD)
+        chunk["time"] = times
+        chunk["value"] = values
+        chunk["device"] = row
+        chunk["attribute"] = RECORDED_ATTRIBUTES.index(attribute)
+        chunks.append(chunk)
+    if len(labels) != len(snapshot.security_labels()):
+        snapshot.append_security_labels(labels)
+    records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=TELEMETRY_RECORD)
+    return snapshot.append(TELEMETRY, records, ref=devices_index)
+
+
+def load_system(path):
+    """Restore an automation system of regular device objects from a snapshot file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        CentralAutomationSystem: The restored automation system.
+    """
+    snapshot = Snapshot(path)
+    records = snapshot.devices()
+    labels = snapshot.security_labels()
+    devices = []
+    for kind, status, security, value, device_id in records.tolist():
+        device_id = device_id.decode()
+        if kind == LIGHT:
+            devices.append(SmartLight(device_id, status, value))
+        elif kind == THERMOSTAT:
+            devices.append(Thermostat(device_id, status, value))
+        elif kind == CAMERA:
+            devices.append(SecurityCamera(device_id, status, labels[security] if labels else ""))
+    automation_system = CentralAutomationSystem()
+    automation_system.add_devices(devices)
+    return automation_system
@@ -0,0 +1,334 @@
+import time
+
+import numpy as np
+
+from smart_home.event_bus import BRIGHTNESS, SECURITY_STATUS, STATUS, TEMPERATURE
+
+RECORDED_ATTRIBUTES = (STATUS, BRIGHTNESS, TEMPERATURE, SECURITY_STATUS)
+
+# (bucket width in seconds, number of buckets kept) of every downsampling tier: 5 minute
+# buckets over a day, hourly buckets over two weeks and daily buckets over eight weeks.
+# With 128 raw samples this preallocates about 15 KB per series.
+DEFAULT_TIERS = ((300.0, 288), (3600.0, 336), (86400.0, 56))
+
+
+class RingBuffer:
+    """Fixed-size buffer of timestamped samples overwriting the oldest ones when full.
+
+    Storage is preallocated once, so appending is O(1) and never allocates.
+    """
+
+    __slots__ = ("times", "columns", "start", "size")
+
+    def __init__(self, capacity, columns=1):
+        """Initialize a RingBuffer instance.
+
+        Args:
+            capacity (int): The number of samples kept.
+            columns (int): The number of values stored per sample.
+        """
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.columns = np.zeros((columns, capacity), dtype=np.float32)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        """Return the number of samples held."""
+        return self.size
+
+    @property
+    def capacity(self):
+        """int: The number of samples kept."""
+        return len(self.times)
+
+    @property
+    def nbytes(self):
+        """int: The memory preallocated by the buffer, in bytes."""
+        return self.times.nbytes + self.columns.nbytes
+
+    def append(self, timestamp, *values):
+        """Add a sample, overwriting the oldest one if the buffer is full.
+
+        Args:
+            timestamp (float): The time of the sample, in seconds.
+            *values (float): One value per column.
+        """
+        capacity = len(self.times)
+        if self.size < capacity:
+            index = (self.start + self.size) % capacity
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % capacity
+        self.times[index] = timestamp
+        for column, value in enumerate(values):
+            self.columns[column, index] = value
+
+    def _order(self):
+        """Return the storage indexes of the samples from oldest to newest."""
+        return (np.arange(self.size) + self.start) % len(self.times)
+
+    def samples(self, since=None):
+        """Get the samples from oldest to newest.
+
+        Args:
+            since (float, optional): Only return samples taken at or after this time.
+
+        Returns:
+            tuple: The timestamps followed by one array per column.
+        """
+        order = self._order()
+        times = self.times[order]
+        columns = self.columns[:, order]
+        if since is not None:
+            keep = times >= since
+            times = times[keep]
+            columns = columns[:, keep]
+        return (times, *columns)
+
+    def last(self):
+        """Get the newest sample as a (timestamp, *values) tuple, or None if empty."""
+        if not self.size:
+            return None
+        index = (self.start + self.size - 1) % len(self.times)
+        return (float(self.times[index]), *(float(value) for value in self.columns[:, index]))
+
+
+class DownsampleTier:
+    """Aggregates samples into fixed-width time buckets keeping their min, max and mean.
+
+    Only the bucket being filled is held as running totals; finished buckets go to a
+    ring buffer, so every update is O(1).
+    """
+
+    __slots__ = ("width", "buckets", "bucket_start", "minimum", "maximum", "total", "count")
+
+    def __init__(self, width, capacity):
+        """Initialize a DownsampleTier instance.
+
+        Args:
+            width (float): The width of a bucket, in seconds.
+            capacity (int): The number of finished buckets kept.
+        """
+        self.width = width
+        self.buckets = RingBuffer(capacity, columns=3)
+        self.bucket_start = None
+        self.minimum = self.maximum = self.total = 0.0
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        """int: The memory preallocated by the tier, in bytes."""
+        return self.buckets.nbytes
+
+    def add(self, timestamp, value):
+        """Account for a sample, closing the current bucket if the sample falls past it.
+
+        Args:
+            timestamp (float): The time of the sample, in seconds.
+            value (float): The value of the sample.
+        """
+        bucket_start = timestamp - timestamp % self.width
+        if bucket_start != self.bucket_start:
+            self.close()
+            self.bucket_start = bucket_start
+            self.minimum = self.maximum = self.total = value
+            self.count = 1
+            return
+        if value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+        self.total += value
+        self.count += 1
+
+    def close(self):
+        """Store the bucket being filled, if any."""
+        if self.count:
+            self.buckets.append(self.bucket_start, self.minimum, self.maximum, self.total / self.count)
+            self.count = 0
+
+    def samples(self, since=None):
+        """Get the finished buckets and the one being filled, from oldest to newest.
+
+        Args:
+            since (float, optional): Only return buckets starting at or after this time.
+
+        Returns:
+            tuple: Arrays of bucket start times, minimums, maximums and means.
+        """
+        times, minimums, maximums, means = self.buckets.samples(since)
+        if self.count and (since is None or self.bucket_start >= since):
+            times = np.append(times, self.bucket_start)
+            minimums = np.append(minimums, self.minimum)
+            maximums = np.append(maximums, self.maximum)
+            means = np.append(means, self.total / self.count)
+        return times, minimums, maximums, means
+
+
+class Series:
+    """Recorded history of one attribute of one device."""
+
+    __slots__ = ("raw", "tiers")
+
+    def __init__(self, capacity, tiers):
+        """Initialize a Series instance.
+
+        Args:
+            capacity (int): The number of raw samples kept.
+            tiers (iterable): The (bucket width, bucket count) of every downsampling tier.
+        """
+        self.raw = RingBuffer(capacity)
+        self.tiers = [DownsampleTier(width, count) for width, count in tiers]
+
+    @property
+    def nbytes(self):
+        """int: The memory preallocated by the series, in bytes."""
+        return self.raw.nbytes + sum(tier.nbytes for tier in self.tiers)
+
+    def append(self, timestamp, value):
+        """Record a sample in the raw buffer and every tier."""
+        self.raw.append(timestamp, value)
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+
+
+class TelemetryRecorder:
+    """Records the state transitions of every device of an automation system.
+
+    Each device attribute gets a Series holding its latest raw samples and min/max/mean
+    downsampling tiers, all preallocated when the attribute is first recorded, so the
+    memory used is fixed per series however long the recorder runs. Status is recorded
+    as 0/1 and security statuses as integer codes mapped through ``security_labels``.
+    The series of removed devices move to an archive bounded by ``archive`` series,
+    which drops the oldest first, and come back if their device is added again.
+    """
+
+    def __init__(self, automation_system, capacity=128, tiers=DEFAULT_TIERS, clock=time.time, archive=1024):
+        """Initialize a TelemetryRecorder instance and start recording.
+
+        Args:
+            automation_system: The central automation system whose devices are recorded.
+            capacity (int): The number of raw samples kept per series.
+            tiers (iterable): The (bucket width, bucket count) of every downsampling tier.
+            clock (callable): Returns the current time in seconds.
+            archive (int): The number of series of removed devices kept.
+        """
+        self.automation_system = automation_system
+        self.capacity = capacity
+        self.tiers = tuple(tiers)
+        self.clock = clock
+        self.archive = archive
+        self.security_labels = []
+        self._security_codes = {}
+        self._series = {}
+        self._archive = {}
+        self.devices_added(automation_system.get_devices())
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.record_events)
+
+    def close(self):
+        """Stop recording."""
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.remove_tap(self.record_events)
+
+    def __len__(self):
+        """Return the number of recorded series."""
+        return len(self._series)
+
+    @property
+    def nbytes(self):
+        """int: The memory preallocated by every series, archived ones included, in bytes."""
+        return (sum(series.nbytes for series in self._series.values())
+                + sum(series.nbytes for series in self._archive.values()))
+
+    def security_code(self, security_status):
+        """Get the integer code recorded for a security status label."""
+        code = self._security_codes.get(security_status)
+        if code is None:
+            code = len(self.security_labels)
+            self.security_labels.append(security_status)
+            self._security_codes[security_status] = code
+        return code
+
+    def record(self, device, attribute, value, timestamp=None):
+        """Record a value of a device attribute.
+
+        Args:
+            device: The device the value belongs to.
+            attribute (str): The attribute of the device.
+            value: The value to record.
+            timestamp (float, optional): The time of the sample; the clock is used when omitted.
+        """
+        if attribute == SECURITY_STATUS:
+            value = self.security_code(value)
+        series = self._series.get((device, attribute))
+        if series is None:
+            series = self._series[(device, attribute)] = Series(self.capacity, self.tiers)
+        series.append(self.clock() if timestamp is None else timestamp, float(value))
+
+    def record_events(self, events):
+        """Record a batch of change events published on the event bus."""
+        timestamp = self.clock()
+        for event in events:
+            if event.attribute in RECORDED_ATTRIBUTES:
+                self.record(event.device, event.attribute, event.value, timestamp)
+
+    def devices_added(self, devices):
+        """Record the initial state of devices added to the automation system."""
+        timestamp = self.clock()
+        for device in devices:
+            for attribute in RECORDED_ATTRIBUTES:
+                if hasattr(device, attribute):
+                    series = self._archive.pop((device, attribute), None)
+                    if series is not None:
+                        self._series[(device, attribute)] = series
+                    self.record(device, attribute, getattr(device, attribute), timestamp)
+
+    def devices_removed(self, devices):
+        """Archive the series of removed devices, dropping the oldest archived ones beyond ``archive``."""
+        archive = self._archive
+        for device in devices:
+            for attribute in RECORDED_ATTRIBUTES:
+                series = self._series.pop((device, attribute), None)
+                if series is not None and self.archive > 0:
+                    archive[(device, attribute)] = series
+        while len(archive) > self.archive:
+            del archive[next(iter(archive))]
+
+    def iter_series(self):
+        """Iterate over the ``(device, attribute, series)`` of the registered devices."""
+        for (device, attribute), series in self._series.items():
+            yield device, attribute, series
+
+    def series(self, device, attribute):
+        """Get the recorded series of a device attribute, or None if nothing was recorded or kept."""
+        series = self._series.get((device, attribute))
+        return self._archive.get((device, attribute)) if series is None else series
+
+    def history(self, device, attribute, since=None, resolution=None):
+        """Get the recorded history of a device attribute.
+
+        Args:
+            device: The device to query.
+            attribute (str): The attribute to query.
+            since (float, optional): Only return samples at or after this time.
+            resolution (float, optional): The bucket width of a downsampling tier; the
+                raw samples are returned when omitted.
+
+        Returns:
+            tuple: ``(times, values)`` for raw samples, or ``(times, minimums, maximums,
+            means)`` for a tier.
+
+        Raises:
+            KeyError: If nothing was recorded for the attribute or no tier has that width.
+        """
+        series = self.series(device, attribute)
+        if series is None:
+            raise KeyError(f"No telemetry recorded for {attribute} of device '{device.get_id()}'.")
+        if resolution is None:
+            return series.raw.samples(since)
+        for tier in series.tiers:
+            if tier.width == resolution:
+                return tier.samples(since)
+        raise KeyError(f"No downsampling tier with a resolution of {resolution} seconds.")
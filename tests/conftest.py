@@ -0,0 +1,13 @@
+"""Make the checkout importable as the ``smart_home`` package, whatever its directory name."""
+import importlib.util
+import os
+import sys
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "smart_home" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "smart_home", os.path.join(PACKAGE_DIRECTORY, "__init__.py"), submodule_search_locations=[PACKAGE_DIRECTORY])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["smart_home"] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,92 @@
+import os
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.journal import MAGIC, Journal, read_entries, recover
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def journaled_system(path, **options):
+    """Create an automation system with a thermostat and a light, journaled to a path."""
+    automation_system = CentralAutomationSystem()
+    journal = Journal(automation_system, path, **options)
+    automation_system.add_device(Thermostat("hall", True, 20))
+    automation_system.add_device(SmartLight("kitchen", True, 10))
+    return automation_system, journal
+
+
+def test_torn_tail_is_dropped_on_replay_and_truncated_on_reopen(tmp_path):
+    path = str(tmp_path / "journal")
+    automation_system, journal = journaled_system(path)
+    automation_system.get_device("hall", Thermostat).set_temperature(23)
+    automation_system.get_device("kitchen", SmartLight).set_brightness(55)
+    journal.close()
+    entries, end = read_entries(path)
+    assert end == os.path.getsize(path)
+
+    # A crash in the middle of the next write leaves a partial header and payload.
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02\x03\x04\x50\x00\x00\x00\x03torn")
+
+    recovered = recover(path)
+    assert recovered.get_device("hall", Thermostat).get_temperature() == 23
+    assert recovered.get_device("kitchen", SmartLight).get_brightness() == 55
+    assert read_entries(path) == (entries, end)
+
+    journal = Journal(recovered, path)
+    assert os.path.getsize(path) == end
+    recovered.get_device("hall", Thermostat).set_temperature(18)
+    journal.close()
+    assert recover(path).get_device("hall", Thermostat).get_temperature() == 18
+
+
+def test_entry_with_bad_checksum_ends_replay(tmp_path):
+    path = str(tmp_path / "journal")
+    automation_system, journal = journaled_system(path)
+    journal.commit()
+    automation_system.get_device("hall", Thermostat).set_temperature(23)
+    journal.close()
+
+    with open(path, "r+b") as file:
+        file.seek(-1, os.SEEK_END)
+        file.write(b"\xff")
+
+    recovered = recover(path)
+    assert recovered.get_device("hall", Thermostat).get_temperature() == 20
+
+
+def test_commits_are_grouped_without_a_scheduler(tmp_path):
+    clock = FakeClock()
+    automation_system, journal = journaled_system(str(tmp_path / "journal"), sync_interval=1.0, clock=clock)
+    thermostat = automation_system.get_device("hall", Thermostat)
+    for step in range(100):
+        clock.now = step * 0.1
+        thermostat.set_temperature(15 + step % 10)
+    # One commit per elapsed interval rather than one per change.
+    assert journal.commits == 9
+    assert journal.pending > 0
+    journal.close()
+    assert journal.pending == 0
+
+
+def test_compaction_error_does_not_fail_commit(tmp_path):
+    path = str(tmp_path / "journal")
+    snapshot_path = str(tmp_path / "snapshot")
+    automation_system, journal = journaled_system(path, snapshot_path=snapshot_path, compact_bytes=1)
+    automation_system.add_device(SmartLight("x" * 300, True, 10))
+    assert journal.commit() > 0
+    assert journal.compaction_error is not None
+    assert not os.path.exists(snapshot_path)
+    assert os.path.getsize(path) > len(MAGIC)
+    journal.close()
+    assert recover(path, snapshot_path).has_device("x" * 300, SmartLight)
@@ -0,0 +1,111 @@
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.mqtt import LocalBroker, MqttAdapter
+from smart_home.rules import Condition, RuleEngine, set_device
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+
+
+def bridged_home(**options):
+    """Create an automation system with a thermostat and a light, bridged to a broker."""
+    automation_system = CentralAutomationSystem()
+    automation_system.add_device(Thermostat("hall", True, 20))
+    automation_system.add_device(SmartLight("kitchen", True, 10))
+    broker = LocalBroker()
+    adapter = MqttAdapter(automation_system, broker, **options)
+    commands = []
+    broker.subscribe(f"{adapter.prefix}/+/+/+/set", lambda messages: commands.extend(
+        (message.topic, message.payload) for message in messages))
+    return automation_system, broker, adapter, commands
+
+
+def test_rule_cascade_of_an_ingested_report_is_published():
+    automation_system, broker, adapter, commands = bridged_home()
+    RuleEngine(automation_system).add_rule(
+        "hot hall",
+        [Condition("temperature", ">", 25, device_id="hall", device_type=Thermostat)],
+        [set_device("kitchen", "set_brightness", 77, device_type=SmartLight)],
+    )
+    broker.publish("home/thermostat/hall/temperature", b"30")
+    broker.flush()
+    broker.flush()
+    assert adapter.ingested == 1
+    assert automation_system.get_device("hall", Thermostat).get_temperature() == 30
+    # The report itself is not echoed back, but the change it caused is commanded.
+    assert commands == [("home/light/kitchen/brightness/set", b"77")]
+
+
+def test_local_changes_are_published_and_reports_are_not_echoed():
+    automation_system, broker, adapter, commands = bridged_home()
+    broker.publish("home/light/kitchen/brightness", b"40")
+    broker.publish("home/light/kitchen/status", b"OFF")
+    broker.flush()
+    broker.flush()
+    assert commands == []
+    light = automation_system.get_device("kitchen", SmartLight)
+    assert light.get_brightness() == 40
+    assert not light.get_status()
+
+    automation_system.get_device("hall", Thermostat).set_temperature(18)
+    broker.flush()
+    assert commands == [("home/thermostat/hall/temperature/set", b"18")]
+
+
+def test_invalid_reports_are_rejected():
+    automation_system, broker, adapter, commands = bridged_home()
+    broker.publish("home/light/kitchen/brightness", b"bright")
+    broker.publish("home/light/porch/brightness", b"40")
+    broker.publish("home/light/kitchen/color", b"red")
+    broker.flush()
+    assert adapter.rejected == 3
+    assert adapter.ingested == 0
+    assert automation_system.get_device("kitchen", SmartLight).get_brightness() == 10
+
+
+def test_prefix_with_several_levels():
+    automation_system, broker, adapter, commands = bridged_home(prefix="site/home")
+    broker.publish("site/home/thermostat/hall/temperature", b"22.5")
+    broker.flush()
+    assert adapter.ingested == 1
+    assert automation_system.get_device("hall", Thermostat).get_temperature() == 22.5
+
+
+def test_qos1_messages_are_redelivered_after_a_failed_callback():
+    broker = LocalBroker()
+    received = []
+    failures = [RuntimeError("offline")]
+
+    def flaky(messages):
+        if failures:
+            raise failures.pop()
+        received.extend(message.payload for message in messages)
+
+    subscription = broker.subscribe("sensors/#", flaky, qos=1)
+    broker.publish("sensors/a", b"1", qos=1)
+    broker.publish("sensors/b", b"2", qos=1)
+    broker.publish("sensors/c", b"3", qos=0)
+    broker.flush()
+    assert received == []
+    assert broker.failed == 3
+    assert isinstance(broker.last_error, RuntimeError)
+    # Only the QoS 1 messages stay in flight.
+    assert sorted(message.payload for message in subscription.inflight.values()) == [b"1", b"2"]
+
+    assert broker.redeliver() == 2
+    assert received == [b"1", b"2"]
+    assert subscription.inflight == {}
+    assert broker.redeliver() == 0
+
+
+def test_failing_subscriber_does_not_block_the_others():
+    broker = LocalBroker()
+    received = []
+
+    def broken(messages):
+        raise ValueError("broken")
+
+    broker.subscribe("sensors/+", broken)
+    broker.subscribe("sensors/+", lambda messages: received.extend(message.payload for message in messages))
+    broker.publish("sensors/a", b"1")
+    broker.flush()
+    assert received == [b"1"]
+    assert broker.failed == 1
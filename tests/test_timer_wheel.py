@@ -0,0 +1,117 @@
+import math
+import random
+
+import pytest
+
+from smart_home.central_automation_system import CentralAutomationSystem
+from smart_home.simulation import Simulation
+from smart_home.smart_light import SmartLight
+from smart_home.thermostat import Thermostat
+from smart_home.timer_wheel import DeviceScheduler, TimerWheel
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_timers_never_fire_early_and_are_never_missed(seed):
+    rng = random.Random(seed)
+    resolution = 0.5
+    # A small wheel, so timers cascade through every level and some overflow it.
+    wheel = TimerWheel(resolution=resolution, bits=3, levels=3, start=0.0)
+    reach = (1 << 9) * resolution
+    fired = {}
+    pending = {}
+
+    def fire(key):
+        assert key not in fired
+        fired[key] = now
+
+    def schedule(key, when):
+        pending[key] = (wheel.call_at(when, fire, key), when)
+
+    now = 0.0
+    for key in range(500):
+        schedule(key, rng.uniform(0.0, 3 * reach))
+    next_key = 500
+    previous = now
+    while pending:
+        due = [math.ceil(when / resolution) * resolution for _, when in pending.values()]
+        assert wheel.next_time() <= min(due)
+        now += rng.choice((0.1, 0.3, resolution, 2.0, 7.5, 40.0))
+        wheel.advance(now)
+        for key, (timer, when) in list(pending.items()):
+            expires = math.ceil(when / resolution)
+            if math.floor(now / resolution) >= expires:
+                # Fired by the first advance reaching the tick of its expiry.
+                assert key in fired
+                assert math.floor(previous / resolution) < expires
+                del pending[key]
+            else:
+                assert key not in fired
+        if next_key < 1000:
+            for _ in range(rng.randrange(4)):
+                schedule(next_key, now + rng.uniform(0.0, reach))
+                next_key += 1
+        if pending and rng.random() < 0.2:
+            timer, _ = pending.pop(rng.choice(list(pending)))
+            timer.cancel()
+        previous = now
+    assert len(wheel) == 0
+    assert wheel.next_time() is None
+
+
+def test_recurring_timer_keeps_its_period():
+    wheel = TimerWheel(resolution=1.0, bits=2, levels=2, start=0.0)
+    calls = []
+    timer = wheel.call_every(3.0, lambda: calls.append(now), start=3.0)
+    for now in range(1, 40):
+        wheel.advance(now)
+    assert calls == list(range(3, 40, 3))
+    timer.cancel()
+    wheel.advance(100)
+    assert len(calls) == 13
+    assert len(wheel) == 0
+
+
+def test_timer_cancelled_in_the_same_tick_does_not_fire():
+    wheel = TimerWheel(start=0.0)
+    calls = []
+    victim = None
+
+    def cancel_victim():
+        calls.append("first")
+        victim.cancel()
+
+    wheel.call_at(5.0, cancel_victim)
+    victim = wheel.call_at(5.0, calls.append, "victim")
+    assert wheel.advance(10.0) == 1
+    assert calls == ["first"]
+    assert len(wheel) == 0
+
+
+def test_device_scheduler_runs_jobs_on_a_simulation():
+    simulation = Simulation()
+    automation_system = CentralAutomationSystem()
+    automation_system.add_device(Thermostat("hall", True, 20))
+    scheduler = DeviceScheduler(automation_system, scheduler=simulation, clock=simulation.time)
+    scheduler.at(100.0, "hall", "set_temperature", 17, device_type=Thermostat)
+    # A job due before the pending wake moves the wake earlier.
+    scheduler.at(50.0, "hall", "set_temperature", 22, device_type=Thermostat)
+    thermostat = automation_system.get_device("hall", Thermostat)
+
+    simulation.run_until(49.0)
+    assert thermostat.get_temperature() == 20
+    simulation.run_until(50.0)
+    assert thermostat.get_temperature() == 22
+    simulation.run_until(100.0)
+    assert thermostat.get_temperature() == 17
+    assert len(scheduler) == 0
+
+
+def test_device_scheduler_job_on_removed_device_does_nothing():
+    simulation = Simulation()
+    automation_system = CentralAutomationSystem()
+    automation_system.add_device(SmartLight("porch", False, 0))
+    scheduler = DeviceScheduler(automation_system, scheduler=simulation, clock=simulation.time)
+    scheduler.at(10.0, "porch", "turn_on", device_type=SmartLight)
+    automation_system.remove_device("porch", SmartLight)
+    simulation.run_until(20.0)
+    assert len(scheduler) == 0
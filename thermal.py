@@ -0,0 +1,406 @@
+import math
+
+import numpy as np
+
+from smart_home.event_bus import STATUS, TEMPERATURE, running_loop
+
+# Defaults describing a furnished room of about 20 square meters: its effective heat
+# capacity (air, furniture and inner wall surfaces) in J/K, its heat loss to the outside
+# in W/K, the power of its HVAC unit in W and the conductance of a shared wall in W/K.
+DEFAULT_HEAT_CAPACITY = 2.0e6
+DEFAULT_LOSS = 40.0
+DEFAULT_HVAC_POWER = 2000.0
+DEFAULT_CONDUCTANCE = 20.0
+
+
+class ThermalModel:
+    """Lumped thermal model of many zones advanced in fixed time steps.
+
+    Every zone is a heat capacity exchanging heat with the outside, with the zones it
+    shares walls with and with its HVAC unit, whose demand runs from -1 (full cooling)
+    to 1 (full heating). The state of all zones lives in NumPy columns, and a step
+    updates all of them with a handful of array operations: the heat exchanged between
+    zones is gathered with one ``bincount`` over the wall list. Each zone also carries
+    the setpoint and the on/off state of the thermostat controlling it, read by the
+    controllers.
+
+    Steps use explicit Euler integration, split into as many substeps as needed to
+    stay stable and free of oscillations for the stiffest zone.
+    """
+
+    COLUMNS = ("temperature", "heat_capacity", "loss", "hvac_power", "demand", "setpoint", "enabled",
+               "energy", "_coupling")
+
+    def __init__(self, capacity=1024, outside_temperature=10.0, dt=60.0):
+        """Initialize a ThermalModel instance.
+
+        Args:
+            capacity (int): The number of zones to preallocate.
+            outside_temperature: The outside temperature in degrees Celsius, as a float or
+                an array with one value per zone.
+            dt (float): The duration of a step, in seconds.
+        """
+        capacity = max(int(capacity), 1)
+        self.outside_temperature = outside_temperature
+        self.dt = dt
+        self.now = 0.0
+        self.temperature = np.zeros(capacity, dtype=np.float64)
+        self.heat_capacity = np.ones(capacity, dtype=np.float64)
+        self.loss = np.zeros(capacity, dtype=np.float64)
+        self.hvac_power = np.zeros(capacity, dtype=np.float64)
+        self.demand = np.zeros(capacity, dtype=np.float64)
+        self.setpoint = np.zeros(capacity, dtype=np.float64)
+        self.enabled = np.zeros(capacity, dtype=np.bool_)
+        self.energy = np.zeros(capacity, dtype=np.float64)
+        self._coupling = np.zeros(capacity, dtype=np.float64)
+        self._sources = np.zeros(0, dtype=np.intp)
+        self._targets = np.zeros(0, dtype=np.intp)
+        self._conductances = np.zeros(0, dtype=np.float64)
+        self._size = 0
+        self._substeps = None
+
+    def __len__(self):
+        """Return the number of zones."""
+        return self._size
+
+    @property
+    def capacity(self):
+        """int: The number of allocated zones."""
+        return len(self.temperature)
+
+    @property
+    def walls(self):
+        """int: The number of walls between zones."""
+        return len(self._sources) // 2
+
+    def _grow(self, minimum):
+        """Reallocate every column so that at least ``minimum`` zones fit."""
+        capacity = self.capacity
+        while capacity < minimum:
+            capacity *= 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            fill = 1 if name == "heat_capacity" else 0
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add_zones(self, count, temperature=20.0, heat_capacity=DEFAULT_HEAT_CAPACITY, loss=DEFAULT_LOSS,
+                  hvac_power=DEFAULT_HVAC_POWER):
+        """Add zones to the model.
+
+        Every parameter is a scalar shared by the new zones or an array with one value
+        per new zone.
+
+        Args:
+            count (int): The number of zones to add.
+            temperature: The initial temperature, in degrees Celsius.
+            heat_capacity: The heat capacity, in J/K.
+            loss: The heat loss to the outside, in W/K.
+            hvac_power: The power of the HVAC unit, in W.
+
+        Returns:
+            numpy.ndarray: The indices of the new zones.
+        """
+        start = self._size
+        end = start + count
+        if end > self.capacity:
+            self._grow(end)
+        self.temperature[start:end] = temperature
+        self.heat_capacity[start:end] = heat_capacity
+        self.loss[start:end] = loss
+        self.hvac_power[start:end] = hvac_power
+        self.setpoint[start:end] = temperature
+        self._size = end
+        self._substeps = None
+        return np.arange(start, end)
+
+    def connect(self, zones, neighbours, conductance=DEFAULT_CONDUCTANCE):
+        """Add walls exchanging heat between pairs of zones.
+
+        Args:
+            zones: The index of a zone, or an array of indices.
+            neighbours: The index of the zone on the other side of each wall.
+            conductance: The thermal conductance of each wall, in W/K.
+
+        Raises:
+            IndexError: If a zone does not exist.
+        """
+        zones, neighbours, conductance = np.broadcast_arrays(
+            np.asarray(zones, dtype=np.intp), np.asarray(neighbours, dtype=np.intp),
+            np.asarray(conductance, dtype=np.float64))
+        if zones.size and max(zones.max(), neighbours.max()) >= self._size:
+            raise IndexError("Walls can only connect existing zones.")
+        self._sources = np.concatenate((self._sources, zones.ravel(), neighbours.ravel()))
+        self._targets = np.concatenate((self._targets, neighbours.ravel(), zones.ravel()))
+        self._conductances = np.concatenate((self._conductances, conductance.ravel(), conductance.ravel()))
+        np.add.at(self._coupling, zones.ravel(), conductance.ravel())
+        np.add.at(self._coupling, neighbours.ravel(), conductance.ravel())
+        self._substeps = None
+
+    def substeps(self):
+        """Get the number of integration substeps per step.
+
+        Explicit Euler stays stable and monotone while every zone exchanges less than
+        its whole temperature difference in one substep.
+        """
+        if self._substeps is None:
+            size = self._size
+            rate = (self.loss[:size] + self._coupling[:size]) / self.heat_capacity[:size]
+            self._substeps = max(1, math.ceil(self.dt * rate.max())) if size else 1
+        return self._substeps
+
+    def step(self, steps=1):
+        """Advance every zone by a number of steps.
+
+        Args:
+            steps (int): The number of steps.
+        """
+        size = self._size
+        if not size:
+            self.now += steps * self.dt
+            return
+        substeps = self.substeps()
+        dt = self.dt / substeps
+        temperature = self.temperature[:size]
+        energy = self.energy[:size]
+        scale = dt / self.heat_capacity[:size]
+        conductance = self.loss[:size] + self._coupling[:size]
+        outside = self.outside_temperature
+        if np.ndim(outside):
+            outside = np.asarray(outside)[:size]
+        hvac = self.hvac_power[:size] * self.demand[:size]
+        # Heat from the outside and the HVAC units, constant during a step.
+        source = self.loss[:size] * outside + hvac
+        sources, targets, conductances = self._sources, self._targets, self._conductances
+        flux = np.empty(size, dtype=np.float64)
+        for _ in range(steps * substeps):
+            np.multiply(conductance, temperature, out=flux)
+            np.subtract(source, flux, out=flux)
+            if len(sources):
+                flux += np.bincount(sources, conductances * temperature[targets], minlength=size)
+            flux *= scale
+            temperature += flux
+        energy += np.abs(hvac) * (steps * self.dt)
+        self.now += steps * self.dt
+
+
+class HysteresisController:
+    """Bang-bang thermostat control with a dead band around the setpoint.
+
+    Heating starts once a zone falls ``band`` below its setpoint and stops when it
+    reaches the setpoint; cooling, if allowed, mirrors it above the setpoint.
+    """
+
+    def __init__(self, band=0.5, cooling=True):
+        """Initialize a HysteresisController instance.
+
+        Args:
+            band (float): The distance to the setpoint that starts the HVAC, in degrees Celsius.
+            cooling (bool): Whether zones above the band are cooled.
+        """
+        self.band = band
+        self.cooling = cooling
+
+    def update(self, model):
+        """Set the HVAC demand of every zone of a model."""
+        size = len(model)
+        temperature = model.temperature[:size]
+        setpoint = model.setpoint[:size]
+        demand = model.demand[:size]
+        demand[temperature < setpoint - self.band] = 1.0
+        if self.cooling:
+            demand[temperature > setpoint + self.band] = -1.0
+        demand[((demand > 0) & (temperature >= setpoint)) | ((demand < 0) & (temperature <= setpoint))] = 0.0
+        demand[~model.enabled[:size]] = 0.0
+
+
+class PIDController:
+    """Proportional-integral-derivative thermostat control with a modulating HVAC demand.
+
+    The integral only accumulates while the demand is not saturated, so long periods at
+    full power do not wind it up. Its state is kept per zone in arrays.
+    """
+
+    def __init__(self, kp=0.5, ki=0.0002, kd=0.0, cooling=True):
+        """Initialize a PIDController instance.
+
+        Args:
+            kp (float): The demand per degree of error.
+            ki (float): The demand per degree-second of accumulated error.
+            kd (float): The demand per degree per second of error change.
+            cooling (bool): Whether the demand may go negative to cool zones.
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.cooling = cooling
+        self.integral = np.zeros(0, dtype=np.float64)
+        self.error = np.zeros(0, dtype=np.float64)
+
+    def reset(self, zones=None):
+        """Clear the state of some zones, or of all zones."""
+        if zones is None:
+            self.integral[:] = 0.0
+            self.error[:] = 0.0
+        else:
+            zones = np.asarray(zones)
+            zones = zones[zones < len(self.integral)]
+            self.integral[zones] = 0.0
+            self.error[zones] = 0.0
+
+    def update(self, model):
+        """Set the HVAC demand of every zone of a model."""
+        size = len(model)
+        if len(self.integral) < size:
+            self.integral = np.concatenate((self.integral, np.zeros(size - len(self.integral))))
+            self.error = np.concatenate((self.error, np.zeros(size - len(self.error))))
+        enabled = model.enabled[:size]
+        error = np.where(enabled, model.setpoint[:size] - model.temperature[:size], 0.0)
+        integral = self.integral[:size]
+        output = self.kp * error + self.ki * integral + self.kd * (error - self.error[:size]) / model.dt
+        lower = -1.0 if self.cooling else 0.0
+        demand = np.clip(output, lower, 1.0)
+        unsaturated = (demand == output) & enabled
+        integral[unsaturated] += error[unsaturated] * model.dt
+        integral[~enabled] = 0.0
+        self.error[:size] = error
+        model.demand[:size] = demand
+
+
+class ThermostatControl:
+    """Runs the thermostats of an automation system in closed loop against a ThermalModel.
+
+    Every bound thermostat controls one zone: its temperature is the setpoint of the
+    zone and its status turns the control on or off. Changes reach the model through an
+    event bus tap, so the model never polls the devices, and each step runs the
+    controller on all zones before advancing the model. ``start`` steps the model every
+    ``dt`` through a scheduler offering ``call_later`` (the running asyncio loop by
+    default); a Simulation runs it in simulated time.
+    """
+
+    def __init__(self, automation_system, model=None, controller=None, scheduler=None):
+        """Initialize a ThermostatControl instance and start following an automation system.
+
+        Args:
+            automation_system: The central automation system of the thermostats.
+            model (ThermalModel, optional): The model of the zones; a new one by default.
+            controller (optional): A HysteresisController or PIDController; hysteresis by default.
+            scheduler (optional): An object with a ``call_later(delay, callback)`` method.
+        """
+        self.automation_system = automation_system
+        self.model = model if model is not None else ThermalModel()
+        self.controller = controller if controller is not None else HysteresisController()
+        self.scheduler = scheduler
+        self._zones = {}
+        self._running = False
+        self._generation = 0
+        automation_system.add_listener(self)
+        automation_system.event_bus.add_tap(self.on_events)
+
+    def close(self):
+        """Stop stepping and following the automation system."""
+        self.stop()
+        self.automation_system.remove_listener(self)
+        self.automation_system.event_bus.remove_tap(self.on_events)
+
+    def __len__(self):
+        """Return the number of bound thermostats."""
+        return len(self._zones)
+
+    def bind(self, thermostats, zones=None, **zone_options):
+        """Let thermostats control zones of the model.
+
+        Args:
+            thermostats (list): The Thermostat instances.
+            zones (optional): The index of the zone of each thermostat; new zones are
+                added when omitted.
+            **zone_options: Options passed to ThermalModel.add_zones for new zones.
+
+        Returns:
+            numpy.ndarray: The zone of each thermostat.
+        """
+        thermostats = list(thermostats)
+        if zones is None:
+            zone_options.setdefault("temperature", [thermostat.get_temperature() for thermostat in thermostats])
+            zones = self.model.add_zones(len(thermostats), **zone_options)
+        zones = np.asarray(zones, dtype=np.intp)
+        for thermostat, zone in zip(thermostats, zones.tolist()):
+            self._zones[thermostat] = zone
+        self.model.setpoint[zones] = [thermostat.get_temperature() for thermostat in thermostats]
+        self.model.enabled[zones] = [thermostat.get_status() for thermostat in thermostats]
+        return zones
+
+    def unbind(self, thermostats):
+        """Stop thermostats from controlling their zones, which are then left uncontrolled."""
+        for thermostat in thermostats:
+            zone = self._zones.pop(thermostat, None)
+            if zone is not None:
+                self.model.enabled[zone] = False
+                self.model.demand[zone] = 0.0
+
+    def zone(self, thermostat):
+        """Get the zone of a thermostat.
+
+        Raises:
+            KeyError: If the thermostat is not bound.
+        """
+        return self._zones[thermostat]
+
+    def room_temperature(self, thermostat):
+        """Get the simulated temperature of the zone of a thermostat, in degrees Celsius."""
+        return float(self.model.temperature[self._zones[thermostat]])
+
+    def on_events(self, events):
+        """Update the setpoints and the on/off state of zones from thermostat changes."""
+        zones = self._zones
+        model = self.model
+        for event in events:
+            zone = zones.get(event.device)
+            if zone is None:
+                continue
+            if event.attribute == TEMPERATURE:
+                model.setpoint[zone] = event.value
+            elif event.attribute == STATUS:
+                model.enabled[zone] = event.value
+
+    def devices_added(self, devices):
+        """Ignore devices added to the automation system; thermostats are bound explicitly."""
+
+    def devices_removed(self, devices):
+        """Unbind thermostats removed from the automation system."""
+        self.unbind([device for device in devices if device in self._zones])
+
+    def step(self, steps=1):
+        """Run the controller and advance the model, once per step."""
+        for _ in range(steps):
+            self.controller.update(self.model)
+            self.model.step()
+
+    def start(self):
+        """Step the model every ``dt`` seconds.
+
+        Raises:
+            RuntimeError: If there is no scheduler and no running asyncio loop.
+        """
+        if self._running:
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            raise RuntimeError("Thermostat control needs a scheduler or a running event loop.")
+        self._running = True
+        self._generation += 1
+        scheduler.call_later(self.model.dt, self._run_scheduled_step, scheduler, self._generation)
+
+    def stop(self):
+        """Stop stepping the model."""
+        self._running = False
+        # Schedulers may not cancel their calls, so the pending step is ignored instead.
+        self._generation += 1
+
+    def _run_scheduled_step(self, scheduler, generation):
+        """Run a step from the scheduler and schedule the next one."""
+        if generation != self._generation:
+            return
+        self.step()
+        scheduler.call_later(self.model.dt, self._run_scheduled_step, scheduler, generation)
@@ -0,0 +1,485 @@
+import math
+import time
+from datetime import datetime, timedelta
+
+from smart_home.event_bus import running_loop
+from smart_home.rules import set_device, set_devices
+
+
+class Timer:
+    """Callback scheduled on a TimerWheel."""
+
+    __slots__ = ("when", "expires", "callback", "args", "interval", "cron", "bucket", "wheel", "cancelled")
+
+    def __init__(self, wheel, when, callback, args, interval=None, cron=None):
+        """Initialize a Timer instance.
+
+        Args:
+            wheel (TimerWheel): The wheel the timer is scheduled on.
+            when (float): The time at which the callback runs, in seconds.
+            callback (callable): The function to call.
+            args (tuple): The positional arguments passed to the callback.
+            interval (float, optional): The period of a recurring timer, in seconds.
+            cron (CronSchedule, optional): The schedule of a cron-style timer.
+        """
+        self.wheel = wheel
+        self.when = when
+        self.expires = 0
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cron = cron
+        self.bucket = None
+        self.cancelled = False
+
+    @property
+    def active(self):
+        """bool: Whether the timer is still scheduled."""
+        return self.bucket is not None
+
+    def cancel(self):
+        """Prevent the callback from running again; O(1).
+
+        A timer cancelled by another callback of the same tick is skipped as well.
+        """
+        self.cancelled = True
+        if self.bucket is not None:
+            del self.bucket[self]
+            self.bucket = None
+            self.wheel._count -= 1
+
+
+class TimerWheel:
+    """Hierarchical timing wheel holding timers in buckets of increasing width.
+
+    The first level has one bucket per tick of ``resolution`` seconds, and every
+    following level has buckets as wide as a whole turn of the level below. A timer is
+    placed in the narrowest level that reaches its expiry, and moved one level down each
+    time the wheel turns past its bucket, so inserting and cancelling are O(1), firing
+    is amortized O(levels), and idle ticks only look at one bucket. Timers further away
+    than the whole wheel wait in its last level and are placed again as it turns.
+    Timers never fire early, and fire at most one resolution late.
+    """
+
+    def __init__(self, resolution=1.0, bits=8, levels=4, start=None, clock=time.time):
+        """Initialize a TimerWheel instance.
+
+        With the defaults the wheel has 256 one-second buckets per level and reaches
+        about 136 years before timers have to wait in the last level.
+
+        Args:
+            resolution (float): The duration of a tick, in seconds.
+            bits (int): The base-2 logarithm of the number of buckets per level.
+            levels (int): The number of levels.
+            start (float, optional): The time of the first tick; the clock is used when omitted.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.resolution = resolution
+        self.clock = clock
+        self.fired = 0
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._levels = [[{} for _ in range(1 << bits)] for _ in range(levels)]
+        self._span = 1 << (bits * levels)
+        self._count = 0
+        self._current = math.floor((clock() if start is None else start) / resolution)
+
+    def __len__(self):
+        """Return the number of scheduled timers."""
+        return self._count
+
+    def time(self):
+        """Get the current time of the clock, in seconds."""
+        return self.clock()
+
+    def _place(self, timer):
+        """Put a timer in the bucket covering its expiry."""
+        expires = max(timer.expires, self._current)
+        delta = min(expires - self._current, self._span - 1)
+        expires = self._current + delta
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        bucket = self._levels[level][(expires >> (self._bits * level)) & self._mask]
+        bucket[timer] = None
+        timer.bucket = bucket
+
+    def _add(self, timer):
+        """Schedule a timer at its ``when`` time."""
+        timer.expires = math.ceil(timer.when / self.resolution)
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def call_at(self, when, callback, *args):
+        """Schedule a callback at a time.
+
+        Args:
+            when (float): The time at which to run the callback, in seconds.
+            callback (callable): The function to call.
+
+        Returns:
+            Timer: A handle that can cancel the callback.
+        """
+        return self._add(Timer(self, when, callback, args))
+
+    def call_later(self, delay, callback, *args):
+        """Schedule a callback after a delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            callback (callable): The function to call.
+
+        Returns:
+            Timer: A handle that can cancel the callback.
+        """
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def call_every(self, interval, callback, *args, start=None):
+        """Schedule a callback at a fixed period.
+
+        Args:
+            interval (float): The period in seconds.
+            callback (callable): The function to call.
+            start (float, optional): The time of the first call; one period from now by default.
+
+        Returns:
+            Timer: A handle that can cancel every future call.
+
+        Raises:
+            ValueError: If the interval is not positive.
+        """
+        if interval <= 0:
+            raise ValueError("The interval must be positive.")
+        when = self.clock() + interval if start is None else start
+        return self._add(Timer(self, when, callback, args, interval=interval))
+
+    def call_cron(self, schedule, callback, *args):
+        """Schedule a callback on a cron-style schedule.
+
+        Args:
+            schedule (CronSchedule or str): The schedule, such as ``"0 18 * * *"``.
+            callback (callable): The function to call.
+
+        Returns:
+            Timer: A handle that can cancel every future call.
+        """
+        if isinstance(schedule, str):
+            schedule = CronSchedule(schedule)
+        return self._add(Timer(self, schedule.next_time(self.clock()), callback, args, cron=schedule))
+
+    def next_time(self):
+        """Get a time no later than the next timer can fire, or None without timers.
+
+        The time is exact when the next timer is in the first level, and the start of
+        the bucket holding it otherwise, when the wheel must turn to place it again.
+        """
+        if not self._count:
+            return None
+        best = None
+        for level, buckets in enumerate(self._levels):
+            shift = self._bits * level
+            start = self._current >> shift
+            for offset in range(self._mask + 1):
+                if buckets[(start + offset) & self._mask]:
+                    tick = max((start + offset) << shift, self._current)
+                    if best is None or tick < best:
+                        best = tick
+                    break
+        return None if best is None else best * self.resolution
+
+    def _cascade(self, level):
+        """Move the timers of the current bucket of a level down, returning its index."""
+        index = (self._current >> (self._bits * level)) & self._mask
+        bucket = self._levels[level][index]
+        if bucket:
+            self._levels[level][index] = {}
+            for timer in bucket:
+                self._place(timer)
+        return index
+
+    def _tick(self):
+        """Run the timers of the current tick and move to the next one."""
+        index = self._current & self._mask
+        if index == 0:
+            level = 1
+            while level < len(self._levels) and self._cascade(level) == 0:
+                level += 1
+        bucket = self._levels[0][index]
+        self._current += 1
+        if not bucket:
+            return
+        self._levels[0][index] = {}
+        self._count -= len(bucket)
+        for timer in bucket:
+            timer.bucket = None
+        for timer in bucket:
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                timer.when += timer.interval
+            elif timer.cron is not None:
+                timer.when = timer.cron.next_time(timer.when)
+            else:
+                timer.when = None
+            if timer.when is not None:
+                self._add(timer)
+            self.fired += 1
+            timer.callback(*timer.args)
+
+    def advance(self, now=None):
+        """Run every timer due up to a time.
+
+        Args:
+            now (float, optional): The time to advance to; the clock is used when omitted.
+
+        Returns:
+            int: The number of timers run.
+        """
+        fired = self.fired
+        target = math.floor((self.clock() if now is None else now) / self.resolution)
+        first_level = self._levels[0]
+        check = True
+        while self._current <= target:
+            if not self._count:
+                self._current = target + 1
+                break
+            if check:
+                check = False
+                if self._current & self._mask and not any(first_level):
+                    # Nothing can fire before the next turn of the first level.
+                    self._current = min(target + 1, (self._current | self._mask) + 1)
+                    continue
+            check = not self._current & self._mask
+            self._tick()
+        return self.fired - fired
+
+
+class CronSchedule:
+    """Cron-style schedule of minutes, hours, days of the month, months and weekdays.
+
+    Fields accept ``*``, numbers, ranges such as ``1-5``, lists such as ``1,15`` and
+    steps such as ``*/10``. Weekdays go from 0 (Sunday) to 6, and 7 is also Sunday.
+    When both days of the month and weekdays are restricted, matching either is enough,
+    as with cron. Times are evaluated in local time.
+    """
+
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression):
+        """Initialize a CronSchedule instance.
+
+        Args:
+            expression (str): The five fields of the schedule, such as ``"30 22 * * 1-5"``.
+
+        Raises:
+            ValueError: If the expression is malformed.
+        """
+        fields = expression.split()
+        if len(fields) != len(self.FIELDS):
+            raise ValueError(f"Cron expression '{expression}' must have {len(self.FIELDS)} fields.")
+        self.expression = expression
+        values = [self._parse(field, low, high) for field, (_, low, high) in zip(fields, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __repr__(self):
+        """Return the expression of the schedule."""
+        return f"CronSchedule({self.expression!r})"
+
+    @staticmethod
+    def _parse(field, low, high):
+        """Expand one field into the set of values it matches."""
+        values = set()
+        for part in field.split(","):
+            value_range, _, step = part.partition("/")
+            if value_range == "*":
+                first, last = low, high
+            elif "-" in value_range:
+                first, last = (int(value) for value in value_range.split("-", 1))
+            else:
+                first = last = int(value_range)
+            step = int(step) if step else 1
+            if not low <= first <= last <= high or step < 1:
+                raise ValueError(f"Invalid cron field '{field}'.")
+            values.update(range(first, last + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        """Check whether the day of a datetime matches the schedule."""
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_time(self, after):
+        """Get the first time after a given time matching the schedule.
+
+        Args:
+            after (float): A timestamp, in seconds.
+
+        Returns:
+            float: The timestamp of the next matching minute.
+
+        Raises:
+            ValueError: If nothing matches within the next eight years.
+        """
+        moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 8)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Cron expression '{self.expression}' never matches.")
+
+
+class DeviceScheduler:
+    """Schedules actions on the devices of an automation system.
+
+    Jobs live on a TimerWheel, which is advanced through a scheduler offering
+    ``call_later`` (the running asyncio loop by default) when its next job is due, so an
+    idle scheduler sleeps until then instead of polling. Actions look their device up
+    when they run, so a job on a removed device does nothing.
+    """
+
+    def __init__(self, automation_system, resolution=1.0, scheduler=None, clock=time.time):
+        """Initialize a DeviceScheduler instance.
+
+        Args:
+            automation_system: The central automation system whose devices are driven.
+            resolution (float): The precision of the jobs, in seconds.
+            scheduler (optional): An object with a ``call_later(delay, callback)`` method
+                used to advance the wheel; the running asyncio loop is used when omitted.
+                Without either, call ``advance`` to run due jobs.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.automation_system = automation_system
+        self.scheduler = scheduler
+        self.wheel = TimerWheel(resolution=resolution, clock=clock)
+        self._wake_at = None
+        self._generation = 0
+
+    def __len__(self):
+        """Return the number of pending jobs."""
+        return len(self.wheel)
+
+    def _action(self, device_id, method, args, device_type):
+        """Build the action of a job; a None ID targets every device of the type."""
+        if device_id is None:
+            return set_devices(device_type, method, *args)
+        return set_device(device_id, method, *args, device_type=device_type)
+
+    def _job(self, timer):
+        """Start advancing the wheel for a new job and return its timer.
+
+        Only the expiry of the new job is compared with the pending wake, so adding a
+        job stays O(1) however many are pending.
+        """
+        self._schedule(timer.expires * self.wheel.resolution)
+        return timer
+
+    def at(self, when, device_id, method, *args, device_type=None):
+        """Call a device method once at a given time.
+
+        For example ``at(timestamp, "porch", "turn_on", device_type=SmartLight)``.
+
+        Args:
+            when (float): The timestamp of the call, in seconds.
+            device_id (str, optional): The ID of the device; None targets every device of
+                ``device_type``.
+            method (str): The name of the method to call.
+            *args: The arguments passed to the method.
+            device_type (type, optional): The type of the device.
+
+        Returns:
+            Timer: A handle that can cancel the job.
+        """
+        action = self._action(device_id, method, args, device_type)
+        return self._job(self.wheel.call_at(when, action, self.automation_system))
+
+    def every(self, interval, device_id, method, *args, device_type=None, start=None):
+        """Call a device method at a fixed period.
+
+        Args:
+            interval (float): The period in seconds.
+            device_id (str, optional): The ID of the device; None targets every device of
+                ``device_type``.
+            method (str): The name of the method to call.
+            *args: The arguments passed to the method.
+            device_type (type, optional): The type of the device.
+            start (float, optional): The timestamp of the first call; one period from now by default.
+
+        Returns:
+            Timer: A handle that can cancel the job.
+        """
+        action = self._action(device_id, method, args, device_type)
+        return self._job(self.wheel.call_every(interval, action, self.automation_system, start=start))
+
+    def cron(self, schedule, device_id, method, *args, device_type=None):
+        """Call a device method on a cron-style schedule.
+
+        For example ``cron("0 18 * * *", None, "turn_on", device_type=SmartLight)`` turns
+        every light on at 18:00, and ``cron("0 23 * * *", "hall", "set_temperature", 17,
+        device_type=Thermostat)`` sets the hall thermostat back every night.
+
+        Args:
+            schedule (CronSchedule or str): The schedule.
+            device_id (str, optional): The ID of the device; None targets every device of
+                ``device_type``.
+            method (str): The name of the method to call.
+            *args: The arguments passed to the method.
+            device_type (type, optional): The type of the device.
+
+        Returns:
+            Timer: A handle that can cancel the job.
+        """
+        action = self._action(device_id, method, args, device_type)
+        return self._job(self.wheel.call_cron(schedule, action, self.automation_system))
+
+    def advance(self, now=None):
+        """Run the jobs due up to a time.
+
+        Args:
+            now (float, optional): The time to advance to; the clock is used when omitted.
+
+        Returns:
+            int: The number of jobs run.
+        """
+        return self.wheel.advance(now)
+
+    def _schedule(self, wake_at=None):
+        """Schedule an advance of the wheel, unless one is pending by then.
+
+        Args:
+            wake_at (float, optional): The time to wake at; when the next job is due by
+                default, which scans the wheel.
+        """
+        if wake_at is None:
+            wake_at = self.wheel.next_time()
+        if wake_at is None or (self._wake_at is not None and self._wake_at <= wake_at):
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            return
+        # Schedulers may not cancel their calls, so a superseded wake is ignored instead.
+        self._generation += 1
+        self._wake_at = wake_at
+        scheduler.call_later(max(0.0, wake_at - self.wheel.time()), self._run_scheduled_advance, self._generation)
+
+    def _run_scheduled_advance(self, generation):
+        """Advance the wheel from the scheduler and schedule the next advance."""
+        if generation != self._generation:
+            return
+        self._wake_at = None
+        self.advance()
+        self._schedule()
@@ -0,0 +1,168 @@
+from smart_home.event_bus import running_loop
+
+
+class Transition:
+    """Class representing a brightness ramp of a single smart light."""
+
+    __slots__ = ("light", "target", "step", "callback", "active")
+
+    def __init__(self, light, target, step, callback=None):
+        """Initialize a Transition instance.
+
+        Args:
+            light: The smart light whose brightness is ramped.
+            target (int): The brightness level to ramp to (0 to 100).
+            step (int): The brightness change applied on every tick.
+            callback (callable, optional): Called with the light once the target is reached.
+        """
+        self.light = light
+        self.target = target
+        self.step = step
+        self.callback = callback
+        self.active = True
+
+    def advance(self):
+        """Move the brightness of the light one step towards the target.
+
+        Returns:
+            bool: True if the target has been reached.
+        """
+        brightness = self.light.get_brightness()
+        if brightness < self.target:
+            brightness = min(brightness + self.step, self.target)
+        elif brightness > self.target:
+            brightness = max(brightness - self.step, self.target)
+        self.light.set_brightness(brightness)
+        return brightness == self.target
+
+
+class TransitionEngine:
+    """Class ramping the brightness of many smart lights from a single shared timer.
+
+    All running transitions are advanced together on every tick, so fading thousands of
+    lights costs one timer callback per interval rather than one sleeping thread per
+    light. Ticks are scheduled through any object providing ``call_later(delay,
+    callback)``, such as an asyncio event loop; when no scheduler is set the running
+    asyncio loop is used if there is one, otherwise the owner is expected to call
+    ``tick`` itself.
+    """
+
+    def __init__(self, interval=0.1, step=1, scheduler=None):
+        """Initialize a TransitionEngine instance.
+
+        Args:
+            interval (float): The time between two ticks, in seconds.
+            step (int): The default brightness change applied on every tick.
+            scheduler (optional): The object used to schedule ticks.
+        """
+        self.interval = interval
+        self.step = step
+        self.scheduler = scheduler
+        self._transitions = {}
+        self._scheduled = False
+
+    def __len__(self):
+        """Return the number of running transitions."""
+        return len(self._transitions)
+
+    def fade(self, light, target, step=None, callback=None):
+        """Start ramping the brightness of a light towards a target.
+
+        If the light is already fading, the running transition is retargeted instead of
+        starting a new one.
+
+        Args:
+            light: The smart light to fade.
+            target (int): The brightness level to ramp to (0 to 100).
+            step (int, optional): The brightness change applied on every tick.
+            callback (callable, optional): Called with the light once the target is reached.
+
+        Returns:
+            Transition: The transition driving the light.
+        """
+        transition = self._transitions.get(light)
+        if transition is None:
+            transition = Transition(light, target, step or self.step, callback)
+            self._transitions[light] = transition
+        else:
+            transition.target = target
+            if step is not None:
+                transition.step = step
+            if callback is not None:
+                transition.callback = callback
+        self._schedule()
+        return transition
+
+    def cancel(self, light):
+        """Stop the transition of a light, leaving its brightness where it is.
+
+        Args:
+            light: The smart light whose transition should stop.
+
+        Returns:
+            bool: True if a transition was running.
+        """
+        transition = self._transitions.pop(light, None)
+        if transition is None:
+            return False
+        transition.active = False
+        return True
+
+    def is_fading(self, light):
+        """Check whether the brightness of a light is currently being ramped."""
+        return light in self._transitions
+
+    def finish(self, light=None):
+        """Complete transitions immediately by jumping to their targets.
+
+        Args:
+            light (optional): The smart light to complete. All transitions are
+                completed when omitted.
+        """
+        if light is None:
+            transitions = list(self._transitions.values())
+        elif light in self._transitions:
+            transitions = [self._transitions[light]]
+        else:
+            transitions = []
+        for transition in transitions:
+            transition.light.set_brightness(transition.target)
+            self._complete(transition)
+
+    def tick(self):
+        """Advance every running transition by one step.
+
+        Returns:
+            int: The number of transitions still running.
+        """
+        for transition in list(self._transitions.values()):
+            if transition.advance():
+                self._complete(transition)
+        return len(self._transitions)
+
+    def _complete(self, transition):
+        """Remove a finished transition and run its callback."""
+        del self._transitions[transition.light]
+        transition.active = False
+        if transition.callback is not None:
+            transition.callback(transition.light)
+
+    def _schedule(self):
+        """Schedule the next tick if one is not already pending."""
+        if self._scheduled or not self._transitions:
+            return
+        scheduler = self.scheduler if self.scheduler is not None else running_loop()
+        if scheduler is None:
+            return
+        scheduler.call_later(self.interval, self._run_scheduled_tick)
+        self._scheduled = True
+
+    def _run_scheduled_tick(self):
+        """Run a tick from the scheduler and schedule the next one."""
+        self._scheduled = False
+        self.tick()
+        self._schedule()
+
+
+# Engine shared by every smart light unless one is assigned explicitly.
+default_engine = TransitionEngine()